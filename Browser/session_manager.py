@@ -0,0 +1,290 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional, Set
+from playwright.async_api import BrowserContext, Page
+
+from .web_erverywhere_browser import WebErverywhereBrowser
+
+DEFAULT_SESSION_ID = "default"
+
+
+@dataclass
+class ClientSession:
+    session_id: str
+    context: BrowserContext
+    page: Page
+    # The default session rides on Chrome's own profile context, which we must not close
+    owns_context: bool = True
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # open() callers waiting for the lock; a pinned session is never evicted
+    pins: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        try:
+            if self.owns_context:
+                await self.context.close()
+            elif not self.page.is_closed():
+                await self.page.close()
+        except Exception:
+            pass
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when no browser context frees up within the acquire timeout."""
+
+
+class SessionClosedError(RuntimeError):
+    """Raised by use() when the session does not exist or was closed while waiting for it."""
+
+
+class BrowserSessionManager:
+    """
+    One Chrome/CDP connection shared by many API clients.
+
+    Each session id gets its own BrowserContext + page and its own lock, so
+    concurrent /query calls from different clients don't trample each other.
+    Sessions are kept in LRU order; idle ones are evicted after idle_timeout
+    seconds, and when max_contexts is reached new sessions evict the least
+    recently used idle session or wait (up to acquire_timeout) for one to free up.
+    on_close(session_id) is called whenever a session is closed or dropped, so
+    callers can forget what they keep per client.
+    """
+
+    def __init__(
+        self,
+        max_contexts: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+        browser_factory: Callable[[], WebErverywhereBrowser] = WebErverywhereBrowser,
+        on_close: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_contexts = max_contexts or int(os.getenv("WEB_API_MAX_CONTEXTS", "8"))
+        self.idle_timeout = idle_timeout or float(os.getenv("WEB_API_SESSION_IDLE_SECONDS", "900"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("WEB_API_ACQUIRE_TIMEOUT_SECONDS", "30"))
+        self._browser_factory = browser_factory
+        self.on_close = on_close
+        self._browser: Optional[WebErverywhereBrowser] = None
+        self._default_context: Optional[BrowserContext] = None
+        self._sessions: "OrderedDict[str, ClientSession]" = OrderedDict()
+        # Session ids whose context is being created outside self._cond; each holds a slot
+        self._reserved: Set[str] = set()
+        self._connect_lock = asyncio.Lock()
+        self._cond = asyncio.Condition()
+
+    # ---------- browser connection ----------
+    async def _ensure_browser(self) -> WebErverywhereBrowser:
+        async with self._connect_lock:
+            if self._browser is not None and not self._browser.is_connected():
+                # CDP connection dropped: every context on it is gone, reconnect on a fresh wrapper
+                for session_id in list(self._sessions):
+                    self._closed(session_id)
+                self._sessions.clear()
+                self._browser, self._default_context = None, None
+            if self._browser is None:
+                wb = self._browser_factory()
+                _browser, context = await wb.connect_to_chrome()
+                self._browser, self._default_context = wb, context
+            return self._browser
+
+    async def _new_client_session(self, session_id: str) -> ClientSession:
+        wb = await self._ensure_browser()
+        if session_id == DEFAULT_SESSION_ID and self._default_context is not None:
+            page = await self._default_context.new_page()
+            return ClientSession(session_id, self._default_context, page, owns_context=False)
+        context = await wb.new_context()
+        page = await context.new_page()
+        return ClientSession(session_id, context, page)
+
+    def _closed(self, session_id: str) -> None:
+        if self.on_close is not None:
+            try:
+                self.on_close(session_id)
+            except Exception:
+                pass
+
+    # ---------- lookup / eviction ----------
+    def get(self, session_id: str) -> Optional[ClientSession]:
+        sess = self._sessions.get(session_id)
+        if sess is not None and sess.page.is_closed():
+            return None
+        return sess
+
+    def _evictable(self, sess: ClientSession, idle_only: bool) -> bool:
+        if sess.pins or sess.lock.locked():
+            return False
+        return not idle_only or (time.monotonic() - sess.last_used) >= self.idle_timeout
+
+    async def _evict(self, idle_only: bool, limit: Optional[int] = None) -> int:
+        # Caller holds self._cond. Oldest first (OrderedDict is kept in LRU order).
+        victims = [s for s in self._sessions.values() if self._evictable(s, idle_only)]
+        if limit is not None:
+            victims = victims[:limit]
+        for sess in victims:
+            self._sessions.pop(sess.session_id, None)
+            await sess.close()
+            self._closed(sess.session_id)
+        return len(victims)
+
+    async def evict_idle(self) -> int:
+        async with self._cond:
+            n = await self._evict(idle_only=True)
+            if n:
+                self._cond.notify_all()
+            return n
+
+    async def _wait(self, deadline: float) -> None:
+        # Caller holds self._cond
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise SessionLimitError(f"All {self.max_contexts} browser contexts are busy")
+        try:
+            await asyncio.wait_for(self._cond.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise SessionLimitError(f"All {self.max_contexts} browser contexts are busy")
+
+    async def open(self, session_id: str, reset: bool = False) -> ClientSession:
+        """
+        Return the session for session_id, creating it (or replacing it when
+        reset=True), with its lock already held: release it when done, or use
+        acquire() instead. The context is created outside self._cond on a
+        reserved slot, so other sessions are not held up by Chrome.
+        """
+        if reset:
+            # Waits for this session's in-flight request; other sessions are untouched
+            await self.close_session(session_id)
+        deadline = asyncio.get_running_loop().time() + self.acquire_timeout
+        async with self._cond:
+            await self._evict(idle_only=True)
+            while True:
+                if session_id in self._reserved:
+                    # Another open() is creating this very session
+                    await self._wait(deadline)
+                    continue
+                existing = self._sessions.pop(session_id, None)
+                if existing is not None:
+                    if not existing.page.is_closed():
+                        self._sessions[session_id] = existing
+                        existing.touch()
+                        existing.pins += 1
+                        break
+                    await existing.close()
+                    self._closed(session_id)
+                if len(self._sessions) + len(self._reserved) < self.max_contexts:
+                    self._reserved.add(session_id)
+                    existing = None
+                    break
+                if not await self._evict(idle_only=False, limit=1):
+                    await self._wait(deadline)
+
+        if existing is not None:
+            try:
+                await existing.lock.acquire()
+            finally:
+                existing.pins -= 1
+            if self._sessions.get(session_id) is not existing:
+                # Closed while we waited for it: start over
+                existing.lock.release()
+                return await self.open(session_id)
+            return existing
+
+        try:
+            sess = await self._new_client_session(session_id)
+        except BaseException:
+            async with self._cond:
+                self._reserved.discard(session_id)
+                self._cond.notify_all()
+            raise
+        # Locked before anyone else can see it
+        await sess.lock.acquire()
+        async with self._cond:
+            self._reserved.discard(session_id)
+            self._sessions[session_id] = sess
+            self._cond.notify_all()
+        return sess
+
+    @asynccontextmanager
+    async def acquire(self, session_id: str, reset: bool = False) -> AsyncIterator[ClientSession]:
+        """open() for the duration of a block; the lock is released (and waiters woken) on exit."""
+        sess = await self.open(session_id, reset=reset)
+        try:
+            yield sess
+        finally:
+            sess.touch()
+            sess.lock.release()
+            async with self._cond:
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def use(self, session_id: str) -> AsyncIterator[ClientSession]:
+        """Hold the session's lock for the duration of one request (or one SSE stream)."""
+        sess = self.get(session_id)
+        if sess is None:
+            raise SessionClosedError(session_id)
+        async with sess.lock:
+            if self._sessions.get(session_id) is not sess or sess.page.is_closed():
+                # Closed or replaced while this request waited for the lock
+                raise SessionClosedError(session_id)
+            sess.touch()
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+            try:
+                yield sess
+            finally:
+                sess.touch()
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def close_session(self, session_id: str) -> bool:
+        async with self._cond:
+            sess = self._sessions.pop(session_id, None)
+            if sess is None:
+                return False
+        async with sess.lock:
+            await sess.close()
+        self._closed(session_id)
+        async with self._cond:
+            self._cond.notify_all()
+        return True
+
+    async def close_all(self) -> None:
+        async with self._cond:
+            sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        for sess in sessions:
+            await sess.close()
+            self._closed(sess.session_id)
+        async with self._connect_lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+            self._browser, self._default_context = None, None
+
+    async def run_reaper(self, interval: float = 60.0) -> None:
+        """Background loop that closes sessions idle for longer than idle_timeout."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "sessions": len(self._sessions),
+            "max_contexts": self.max_contexts,
+            "busy": sum(1 for s in self._sessions.values() if s.lock.locked()),
+            "idle_seconds": {sid: round(now - s.last_used, 1) for sid, s in self._sessions.items()},
+            "network": self._browser.network.snapshot() if self._browser is not None else None,
+            "http_cache": self._browser.http_cache.stats() if self._browser is not None and self._browser.http_cache else None,
+        }
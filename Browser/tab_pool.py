@@ -0,0 +1,151 @@
+import asyncio
+import os
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from playwright.async_api import BrowserContext, Page
+
+
+class TabPool:
+    """
+    Bounded pool of reusable tabs on one BrowserContext.
+
+    Pages are handed out by acquire()/release() and reset to about:blank between
+    uses, so research queries reuse warm tabs instead of opening/closing one per
+    result. fetch_many() fans a worker out over several URLs with a concurrency
+    limit and a deadline, yielding results in completion order.
+    """
+
+    def __init__(self, context: BrowserContext, size: int = 8):
+        self.context = context
+        self.size = max(1, size)
+        self._idle: List[Page] = []
+        self._total = 0
+        self._cond = asyncio.Condition()
+
+    async def prewarm(self, n: int) -> None:
+        async with self._cond:
+            want = min(n, self.size) - len(self._idle)
+            while want > 0 and self._total < self.size:
+                self._total += 1
+                try:
+                    self._idle.append(await self.context.new_page())
+                except Exception:
+                    self._total -= 1
+                    break
+                want -= 1
+
+    async def acquire(self) -> Page:
+        async with self._cond:
+            while True:
+                while self._idle:
+                    page = self._idle.pop()
+                    if not page.is_closed():
+                        return page
+                    self._total -= 1
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                await self._cond.wait()
+        try:
+            return await self.context.new_page()
+        except Exception:
+            async with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    async def release(self, page: Page) -> None:
+        reusable = not page.is_closed()
+        if reusable:
+            try:
+                await page.goto("about:blank", timeout=5000)
+            except Exception:
+                reusable = False
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+        async with self._cond:
+            if reusable:
+                self._idle.append(page)
+            else:
+                self._total -= 1
+            self._cond.notify()
+
+    async def close(self) -> None:
+        async with self._cond:
+            pages, self._idle = self._idle, []
+            self._total -= len(pages)
+        for page in pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    async def fetch_many(
+        self,
+        items: Sequence[Any],
+        worker: Callable[[Page, Any, float], Awaitable[Any]],
+        concurrency: int = 4,
+        deadline: Optional[float] = None,
+    ) -> AsyncGenerator[Tuple[int, Any, Any, Optional[BaseException]], None]:
+        """
+        Run worker(page, item, remaining_seconds) for each item on pooled tabs.
+        Yields (index, item, result, error) as each one finishes; items still
+        running when the deadline passes are cancelled and yielded with a TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + deadline if deadline else None
+        sem = asyncio.Semaphore(max(1, concurrency))
+        await self.prewarm(min(concurrency, len(items)))
+
+        async def run(idx: int, item: Any):
+            async with sem:
+                page = await self.acquire()
+                try:
+                    remaining = (ends_at - loop.time()) if ends_at else 0.0
+                    return idx, item, await worker(page, item, remaining), None
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    return idx, item, None, e
+                finally:
+                    await self.release(page)
+
+        tasks = [asyncio.create_task(run(i, it)) for i, it in enumerate(items)]
+        pending = set(tasks)
+        try:
+            while pending:
+                timeout = None
+                if ends_at is not None:
+                    timeout = ends_at - loop.time()
+                    if timeout <= 0:
+                        break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    yield task.result()
+            for task in sorted(pending, key=tasks.index):
+                task.cancel()
+                idx = tasks.index(task)
+                yield idx, items[idx], None, asyncio.TimeoutError("deadline exceeded")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+_pools: Dict[int, TabPool] = {}
+
+
+def get_tab_pool(context: BrowserContext) -> TabPool:
+    """Return the shared TabPool for a context, creating it on first use."""
+    key = id(context)
+    pool = _pools.get(key)
+    if pool is None or pool.context is not context:
+        pool = TabPool(context, size=int(os.getenv("WEB_AGENT_TAB_POOL_SIZE", "8")))
+        _pools[key] = pool
+        try:
+            context.on("close", lambda _ctx: _pools.pop(key, None))
+        except Exception:
+            pass
+    return pool
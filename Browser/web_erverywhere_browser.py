@@ -1,22 +1,162 @@
 import asyncio
+import os
 import platform
+import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from playwright.async_api import async_playwright, Browser, BrowserContext
-import re
 import aiohttp
-import socket
+
+from core.blocking import BlockProfile, NetworkStats, ainstall as install_blocking
+from core.http_cache import HttpCache
+
+
+class CDPConnectionManager:
+    """
+    Process-wide Chrome DevTools connection.
+
+    Keeps one Playwright driver, one aiohttp session for /json/version probes and
+    one connect_over_cdp Browser for the whole process. An already-listening
+    debugging endpoint is reused instead of spawning another Chrome; readiness of
+    a freshly spawned Chrome is polled with millisecond backoff. When the CDP
+    connection drops, the next get_browser() call reconnects.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.host = host
+        self.port = port or int(os.getenv("CHROME_CDP_PORT", "9222"))
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+        self.last_connect: Dict[str, Any] = {}
+
+    @property
+    def playwright(self):
+        return self._playwright
+
+    async def _http_session(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession()
+        return self._http
+
+    async def probe(self, timeout: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Return /json/version of the debugging endpoint, or None if nothing is listening."""
+        try:
+            http = await self._http_session()
+            async with http.get(f"http://{self.host}:{self.port}/json/version", timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status != 200:
+                    return None
+                data = await resp.json(content_type=None)
+                return data if data.get("webSocketDebuggerUrl") else None
+        except Exception:
+            return None
+
+    async def wait_ready(self, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.005
+        while True:
+            info = await self.probe()
+            if info or loop.time() >= deadline:
+                return info
+            await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+            delay = min(delay * 1.6, 0.1)
+
+    def is_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def get_browser(self, launcher=None, retries: int = 3) -> Browser:
+        """Connected CDP browser; reuses the live connection, else (re)connects, launching Chrome via launcher() if needed."""
+        async with self._lock:
+            if self.is_connected():
+                self.last_connect = {"reused_connection": True}
+                return self._browser  # type: ignore[return-value]
+            t0 = time.perf_counter()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            info = await self.probe()
+            launched = False
+            if info is None and launcher is not None:
+                await launcher(self.port)
+                launched = True
+                info = await self.wait_ready()
+            for attempt in range(retries):
+                try:
+                    if not info:
+                        raise RuntimeError("Chrome CDP endpoint not found")
+                    browser = await self._playwright.chromium.connect_over_cdp(info["webSocketDebuggerUrl"])
+                    browser.on("disconnected", self._on_disconnected)
+                    self._browser = browser
+                    self.last_connect = {
+                        "reused_connection": False,
+                        "launched_chrome": launched,
+                        "connect_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+                    }
+                    return browser
+                except Exception:
+                    if attempt == retries - 1:
+                        raise RuntimeError("Failed to connect to Chrome via CDP after retries")
+                    info = await self.wait_ready(timeout=2.0 * (attempt + 1))
+            raise RuntimeError("Unexpected get_browser fallthrough")
+
+    def _on_disconnected(self, browser: Browser) -> None:
+        if self._browser is browser:
+            self._browser = None
+
+    async def close(self) -> None:
+        """Disconnect and stop the driver (Chrome itself keeps running for the next warm start)."""
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+                self._browser = None
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+            if self._http is not None:
+                await self._http.close()
+                self._http = None
+
+
+_cdp_managers: Dict[int, CDPConnectionManager] = {}
+
+
+def get_cdp_manager(port: Optional[int] = None) -> CDPConnectionManager:
+    port = port or int(os.getenv("CHROME_CDP_PORT", "9222"))
+    mgr = _cdp_managers.get(port)
+    if mgr is None:
+        mgr = _cdp_managers[port] = CDPConnectionManager(port=port)
+    return mgr
+
+
+async def close_cdp_managers() -> None:
+    for mgr in list(_cdp_managers.values()):
+        await mgr.close()
+    _cdp_managers.clear()
 
 
 class WebErverywhereBrowser:
-    def __init__(self, user_data_dir: Optional[str] = None, headless: bool = False, proxy: Optional[str] = None):
+    def __init__(self, user_data_dir: Optional[str] = None, headless: bool = False, proxy: Optional[str] = None,
+                 block_profile: Optional[BlockProfile] = None):
         self.base_user_dir = self._default_user_dir()
         self.user_data_dir = user_data_dir
         self.headless = headless
         self.proxy = proxy
         self._browser: Optional[Browser] = None
         self._context: Optional[BrowserContext] = None
-        self._playwright = None/
+        self._owns_context = False
+        self._playwright = None
+        # JARVIS_BLOCK_PROFILE / JARVIS_BLOCK_ALLOW, shared with core.browser.BrowserSession
+        self.block_profile = block_profile or BlockProfile.from_env()
+        self.network = NetworkStats(self.block_profile.name)
+        # JARVIS_HTTP_CACHE: on-disk response cache in front of every context (off by default)
+        self.http_cache = HttpCache.from_env()
 
     def _default_user_dir(self) -> str:
         system = platform.system()
@@ -28,63 +168,46 @@ class WebErverywhereBrowser:
             return str(Path.home() / ".config/google-chrome")
 
     async def connect_to_chrome(self, retries: int = 3) -> Tuple[Browser, BrowserContext]:
-        self._playwright = await async_playwright().start()
+        # Shared driver + CDP connection; Chrome is only launched when nothing listens on the port
+        manager = get_cdp_manager()
+        self._browser = await manager.get_browser(self._ensure_chrome_with_rdp, retries=retries)
+        self._playwright = manager.playwright
+        contexts = self._browser.contexts
+        if not contexts:
+            self._context = await self._browser.new_context()
+            self._owns_context = True
+            await self._configure_network(self._context)
+        else:
+            # Chrome's default context is the user's own profile: leave its traffic alone
+            # unless JARVIS_BLOCK_PROFILE is set explicitly, and never cache it
+            self._context = contexts[0]
+            self._owns_context = False
+            if os.getenv("JARVIS_BLOCK_PROFILE"):
+                await install_blocking(self._context, self.block_profile, self.network)
+        return self._browser, self._context
 
-        # Ensure Chrome is launched with remote debugging
-        await self._ensure_chrome_with_rdp()
+    def is_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
 
-        # Try to fetch CDP endpoint and connect
-        for attempt in range(retries):
-            try:
-                ws_endpoint = None
-                async with aiohttp.ClientSession() as session:
-                    async with session.get("http://127.0.0.1:9222/json/version") as resp:
-                        data = await resp.json()
-                        ws_endpoint = data.get("webSocketDebuggerUrl")
-                    if not ws_endpoint:
-                        raise RuntimeError("Chrome CDP endpoint not found")
-                self._browser = await self._playwright.chromium.connect_over_cdp(ws_endpoint)
-                contexts = self._browser.contexts
-                if not contexts:
-                    self._context = await self._browser.new_context()
-                else:
-                    self._context = contexts[0]
-                return self._browser, self._context
-            except Exception:
-                if attempt == retries - 1:
-                    raise RuntimeError("Failed to connect to Chrome via CDP after retries")
-                await asyncio.sleep(2 ** attempt)
-        # Should not reach here
-        raise RuntimeError("Unexpected connect_to_chrome fallthrough")
-
-    async def _ensure_chrome_with_rdp(self):
-        chrome_path = {
+    async def _ensure_chrome_with_rdp(self, port: int = 9222):
+        chrome_path = os.getenv("CHROME_PATH") or {
             "Windows": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
             "Darwin": "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
             "Linux": "/usr/bin/google-chrome",
         }.get(platform.system())
         cmd = [
             chrome_path,
-            "--remote-debugging-port=9222",
+            f"--remote-debugging-port={port}",
             "--no-first-run",
             "--no-default-browser-check",
             "--start-maximized",
         ]
+        if self.user_data_dir:
+            cmd.append(f"--user-data-dir={self.user_data_dir}")
         if self.headless:
             cmd.append("--headless=new")
-        # Launch and wait for port to open
-        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        for _ in range(15):
-            await asyncio.sleep(1)
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                if sock.connect_ex(("127.0.0.1", 9222)) == 0:
-                    sock.close()
-                    return proc
-                sock.close()
-            except Exception:
-                pass
-        return proc
+        # Readiness is polled by CDPConnectionManager.wait_ready; Chrome's output is not read, so don't pipe it
+        return await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
 
     async def create_context(self) -> BrowserContext:
         if not self._browser:
@@ -96,14 +219,29 @@ class WebErverywhereBrowser:
             user_agent=self._modern_user_agent(),
             locale="en-US",
         )
+        self._owns_context = True
         await self._add_anti_detection()
         await self._configure_network()
         return self._context
 
-    async def _add_anti_detection(self):
-        if not self._context:
+    async def new_context(self) -> BrowserContext:
+        """Create an additional isolated context on the connected browser (one per API client)."""
+        if not self._browser:
+            raise RuntimeError("Browser not connected")
+        context = await self._browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent=self._modern_user_agent(),
+            locale="en-US",
+        )
+        await self._add_anti_detection(context)
+        await self._configure_network(context)
+        return context
+
+    async def _add_anti_detection(self, context: Optional[BrowserContext] = None):
+        context = context or self._context
+        if not context:
             return
-        await self._context.add_init_script(
+        await context.add_init_script(
             """
             Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
             Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3] });
@@ -112,11 +250,11 @@ class WebErverywhereBrowser:
             """
         )
 
-    async def _configure_network(self):
-        if not self._context:
+    async def _configure_network(self, context: Optional[BrowserContext] = None):
+        context = context or self._context
+        if not context:
             return
-        await self._context.route("**/*.{png,jpg,jpeg,webp}", lambda route: route.abort())
-        await self._context.route(re.compile(r"(analytics|tracking|beacon)"), lambda route: route.abort())
+        await install_blocking(context, self.block_profile, self.network, self.http_cache)
 
     def _modern_user_agent(self) -> str:
         return f"Mozilla/5.0 ({self._os_info()}) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
@@ -129,9 +267,13 @@ class WebErverywhereBrowser:
         return "X11; Linux x86_64"
 
     async def close(self):
-        if self._context:
-            await self._context.close()
-        if self._browser:
-            await self._browser.close()
-        if self._playwright:
-            await self._playwright.stop()
+        # The CDP connection and driver are shared process-wide (see close_cdp_managers);
+        # only drop the context this wrapper created.
+        if self._context and self._owns_context:
+            try:
+                await self._context.close()
+            except Exception:
+                pass
+        self._context = None
+        self._browser = None
+        self._playwright = None
@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run benchmarks from the project root, e.g. `python benchmarks/bench_amazon_extraction.py`.
+They use a local headless Chromium (`python -m playwright install chromium`) and
+local fixtures only; nothing hits the network.
+"""
+import os
+import sys
+import time
+import statistics
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES, name)
+
+
+def fixture_url(name: str) -> str:
+    return "file://" + fixture_path(name).replace(os.sep, "/")
+
+
+class RoundTripCounter:
+    """Wraps a sync Playwright Page/Locator and counts calls that reach the driver.
+
+    Building locators (`locator`, `nth`, `first`, `get_by_text`, ...) is local and not
+    counted; anything returning a plain value (count, inner_text, evaluate, click, ...) is.
+    """
+
+    def __init__(self, target: Any, counter: Optional[Dict[str, int]] = None):
+        self._target = target
+        self.counter = counter if counter is not None else {"calls": 0}
+
+    def _wrap(self, value: Any) -> Any:
+        from playwright.sync_api import Locator
+        if isinstance(value, Locator):
+            return RoundTripCounter(value, self.counter)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return self._wrap(attr)
+
+        def call(*args, **kwargs):
+            res = attr(*args, **kwargs)
+            from playwright.sync_api import Locator
+            if not isinstance(res, Locator) and name not in ("on", "once", "remove_listener"):
+                self.counter["calls"] += 1
+            return self._wrap(res)
+        return call
+
+
+class BulkCollection:
+    """Test double around a mongomock collection: mongomock's bulk_write does not
+    accept pymongo's UpdateOne, so apply the ops one by one with update_one and,
+    like an ordered bulk_write, stop at the first error with a BulkWriteError."""
+
+    def __init__(self, col: Any):
+        self._col = col
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._col, name)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True) -> None:
+        from pymongo.errors import BulkWriteError, OperationFailure
+        for i, op in enumerate(requests):
+            try:
+                self._col.update_one(op._filter, op._doc, upsert=op._upsert)
+            except OperationFailure as e:
+                raise BulkWriteError({"writeErrors": [{"index": i, "code": e.code, "errmsg": str(e)}]})
+
+
+def time_runs(fn: Callable[[], Any], runs: int = 5) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {"mean_ms": statistics.mean(samples), "min_ms": min(samples), "max_ms": max(samples)}
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    cols = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(_fmt(r.get(c)).ljust(widths[c]) for c in cols))
+
+
+def _fmt(v: Any) -> str:
+    if isinstance(v, float):
+        return f"{v:.1f}"
+    return str(v)
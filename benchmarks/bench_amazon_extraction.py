@@ -0,0 +1,50 @@
+"""
+Amazon listing extraction: per-card locator walk vs single in-page evaluate.
+
+Loads benchmarks/fixtures/amazon_results.html from disk and runs both
+BrowserSession extractors in each mode, reporting Playwright round trips and
+wall time. Results from both modes must match.
+"""
+from _common import RoundTripCounter, fixture_url, print_table, time_runs
+
+from playwright.sync_api import sync_playwright
+from core.browser import BrowserSession
+
+
+def main(runs: int = 5):
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.goto(fixture_url("amazon_results.html"))
+
+        session = BrowserSession()
+        session._p, session._browser = pw, browser
+        rows = []
+        outputs = {}
+        for batched in (False, True):
+            session.amazon_batched = batched
+            for name, call in (
+                ("laptops_top_k", lambda: session.extract_amazon_laptops_top_k(5, max_price=50000)),
+                ("search_results_top_k", lambda: session.extract_amazon_search_results_top_k(5)),
+            ):
+                counted = RoundTripCounter(page)
+                session.page = counted
+                outputs[(name, batched)] = call()
+                trips = counted.counter["calls"]
+                session.page = page
+                timing = time_runs(call, runs)
+                rows.append({
+                    "extractor": name,
+                    "mode": "evaluate" if batched else "locator",
+                    "round_trips": trips,
+                    **timing,
+                })
+        print_table(rows)
+        for name in ("laptops_top_k", "search_results_top_k"):
+            same = outputs[(name, False)] == outputs[(name, True)]
+            print(f"{name}: results identical across modes: {same}")
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Page load per block profile: full vs no-media vs text-only.
+
+Serves benchmarks/fixtures/blocking/index.html from a local HTTP server whose
+/asset/ handler returns synthetic images, a font, a video, a stylesheet and an
+analytics script (sizes below, each delayed by ASSET_DELAY_MS) and loads it in
+a fresh context per run with core.blocking installed, reporting load time, the
+bytes the server actually sent, and what NetworkStats counted as blocked.
+"""
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import fixture_path, print_table
+
+from playwright.sync_api import sync_playwright
+from core.blocking import BlockProfile, NetworkStats, install
+
+ASSET_DELAY_MS = int(os.getenv("BENCH_ASSET_DELAY_MS", "40"))
+ASSETS = {
+    ".jpg": ("image/jpeg", 180_000),
+    ".webp": ("image/webp", 120_000),
+    ".gif": ("image/gif", 43),
+    ".woff2": ("font/woff2", 90_000),
+    ".mp4": ("video/mp4", 2_000_000),
+    ".css": ("text/css", 20_000),
+    ".js": ("application/javascript", 60_000),
+}
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    sent = {"bytes": 0}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if not self.path.startswith("/asset/"):
+            return super().do_GET()
+        name = self.path.split("?", 1)[0]
+        ctype, size = ASSETS.get(os.path.splitext(name)[1], ("application/octet-stream", 1000))
+        time.sleep(ASSET_DELAY_MS / 1000.0)
+        # Spaces: valid (empty) CSS/JS, opaque bytes for the media types
+        body = b" " * size
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.lock:
+            self.sent["bytes"] += len(body)
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        outputfile.write(data)
+        with self.lock:
+            self.sent["bytes"] += len(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(runs: int = 3):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_Handler, directory=fixture_path("blocking")))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    rows = []
+    try:
+        with sync_playwright() as pw:
+            browser = pw.chromium.launch(headless=True)
+            for name in ("full", "no-media", "text-only"):
+                # The analytics script is served locally, so it is only caught by the path rule
+                profile = BlockProfile.named(name, tracker_paths=True)
+                load_ms, sent, blocked = [], [], {}
+                for _ in range(runs):
+                    stats = NetworkStats(name)
+                    context = browser.new_context()
+                    install(context, profile, stats)
+                    page = context.new_page()
+                    _Handler.sent["bytes"] = 0
+                    t0 = time.perf_counter()
+                    page.goto(url, wait_until="load")
+                    load_ms.append((time.perf_counter() - t0) * 1000.0)
+                    sent.append(_Handler.sent["bytes"])
+                    blocked = stats.snapshot()["blocked_by_reason"]
+                    assert page.locator(".price").count() == 6
+                    context.close()
+                rows.append({
+                    "profile": name,
+                    "load_ms": sum(load_ms) / runs,
+                    "kb_sent": sum(sent) / runs / 1024.0,
+                    "blocked": ", ".join(f"{k}={v}" for k, v in sorted(blocked.items())) or "-",
+                })
+            browser.close()
+    finally:
+        server.shutdown()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Fan-out over pages: one worker (serial) vs the ThreadedBrowserSession pool.
+
+Serves benchmarks/fixtures/amazon_results.html as 10 different local pages,
+each delayed by BENCH_PAGE_DELAY_MS (default 250) to stand in for network time,
+and extracts the top results of every page with map_extract. Reports wall
+time with the browsers already started ("warm") and including their launch
+("cold"), and checks that both modes extracted the same items.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import fixture_path, print_table
+
+from core.browser import ThreadedBrowserSession
+
+PAGES = int(os.getenv("BENCH_PAGES", "10"))
+DELAY_MS = int(os.getenv("BENCH_PAGE_DELAY_MS", "250"))
+
+with open(fixture_path("amazon_results.html"), "rb") as _f:
+    _BODY = _f.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(DELAY_MS / 1000.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _run(pool_size: int, urls) -> dict:
+    os.environ["JARVIS_SITE_PROFILES"] = "0"
+    session = ThreadedBrowserSession(pool_size=pool_size)
+    try:
+        t0 = time.perf_counter()
+        session.map_extract(urls[:pool_size], "extract_amazon_search_results_top_k", 5)
+        launch_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        results = session.map_extract(urls, "extract_amazon_search_results_top_k", 5)
+        warm_s = time.perf_counter() - t0
+    finally:
+        session.close()
+    return {
+        "mode": "serial" if pool_size == 1 else f"pool x{pool_size}",
+        "pages": len(urls),
+        "warm_s": warm_s,
+        "cold_s": warm_s + launch_s,
+        "pages_per_s": len(urls) / warm_s,
+        "errors": sum(1 for r in results if r["error"]),
+        "_items": [[it.get("title") for it in (r["value"] or [])] for r in results],
+    }
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/s?k=laptop&page={i}" for i in range(PAGES)]
+    try:
+        rows = [_run(1, urls), _run(int(os.getenv("BENCH_POOL", "5")), urls)]
+    finally:
+        server.shutdown()
+    same = rows[0].pop("_items") == rows[1].pop("_items")
+    print_table(rows)
+    print(f"same items extracted: {same}")
+
+
+if __name__ == "__main__":
+    main()
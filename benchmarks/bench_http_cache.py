@@ -0,0 +1,100 @@
+"""
+Repeated navigations with and without the on-disk HTTP cache (core.http_cache).
+
+A local server plays a documentation site: DOCS pages (max-age=300), an
+ETag-only search page that must be revalidated, and a stylesheet; each
+response is delayed by ORIGIN_DELAY_MS. Every URL is visited VISITS times in
+a fresh context per mode:
+- off:        no cache (every visit goes to the origin)
+- cache:      HttpCache, conditional revalidation of stale entries
+- cache+swr:  HttpCache with stale_while_revalidate
+reporting mean navigation time, origin requests and the cache hit ratio.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import print_table
+
+from playwright.sync_api import sync_playwright
+from core.blocking import BlockProfile, NetworkStats, install
+from core.http_cache import HttpCache
+
+ORIGIN_DELAY_MS = int(os.getenv("BENCH_ORIGIN_DELAY_MS", "120"))
+VISITS = 4
+DOCS = [f"/docs/page{i}.html" for i in range(6)]
+
+
+class _Origin(BaseHTTPRequestHandler):
+    hits = {"n": 0}
+
+    def do_GET(self):
+        self.hits["n"] += 1
+        time.sleep(ORIGIN_DELAY_MS / 1000.0)
+        if self.path == "/style.css":
+            self._send(200, b"body { font-family: sans-serif; }" * 200, "text/css", {"Cache-Control": "max-age=3600"})
+        elif self.path.startswith("/search"):
+            if self.headers.get("If-None-Match") == '"results-v1"':
+                self._send(304, b"", "text/html", {"ETag": '"results-v1"'})
+            else:
+                body = b"<link rel=stylesheet href=/style.css><ul>" + b"<li class=result>hit</li>" * 50 + b"</ul>"
+                self._send(200, body, "text/html", {"ETag": '"results-v1"', "Cache-Control": "no-cache"})
+        else:
+            body = b"<link rel=stylesheet href=/style.css><h1>Docs</h1>" + b"<p>Lorem ipsum dolor sit amet.</p>" * 400
+            self._send(200, body, "text/html", {"Cache-Control": "max-age=300", "Vary": "Accept-Encoding"})
+
+    def _send(self, status, body, ctype, headers):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [base + p for p in DOCS] + [base + "/search?q=playwright"]
+    rows = []
+    try:
+        with sync_playwright() as pw:
+            browser = pw.chromium.launch(headless=True)
+            for mode in ("off", "cache", "cache+swr"):
+                directory = tempfile.mkdtemp(prefix="bench-http-cache-")
+                cache = None if mode == "off" else HttpCache(directory, stale_while_revalidate=mode.endswith("swr"))
+                _Origin.hits["n"] = 0
+                timings = []
+                for _ in range(VISITS):
+                    # Fresh context per round so Chromium's own memory cache doesn't hide the difference
+                    context = browser.new_context()
+                    install(context, BlockProfile.named("full"), NetworkStats("full"), cache)
+                    page = context.new_page()
+                    for url in urls:
+                        t0 = time.perf_counter()
+                        page.goto(url, wait_until="load")
+                        timings.append((time.perf_counter() - t0) * 1000.0)
+                    context.close()
+                rows.append({
+                    "mode": mode,
+                    "nav_mean_ms": sum(timings) / len(timings),
+                    "origin_requests": _Origin.hits["n"],
+                    "hit_ratio": cache.stats()["hit_ratio"] if cache else 0.0,
+                })
+                shutil.rmtree(directory, ignore_errors=True)
+            browser.close()
+    finally:
+        server.shutdown()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time-to-first-action: plan_actions (wait for the full reply) vs plan_actions_stream.
+
+A local stub of Ollama's /api/chat emits a fixed 4-action plan token by token
+(TOKEN_DELAY seconds apart). With "stream": true it writes NDJSON lines as the
+tokens are produced; otherwise it replies once the whole plan is "generated",
+like a real model would.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ["JARVIS_LLM_CACHE"] = "0"
+
+from _common import print_table  # noqa: E402
+from core.llm import LLMProvider  # noqa: E402
+
+TOKEN_DELAY = float(os.getenv("BENCH_TOKEN_DELAY", "0.01"))
+PLAN = json.dumps([
+    {"type": "goto", "url": "https://duckduckgo.com/"},
+    {"type": "fill", "selector": "input[name='q']", "text": "best budget laptops 2024"},
+    {"type": "press", "key": "Enter"},
+    {"type": "wait", "duration": 3000},
+])
+# Roughly word-sized tokens
+TOKENS = [PLAN[i:i + 4] for i in range(0, len(PLAN), 4)]
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b'{"models": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not payload.get("stream"):
+            time.sleep(TOKEN_DELAY * len(TOKENS))
+            body = json.dumps({"message": {"role": "assistant", "content": PLAN}, "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for tok in TOKENS + [None]:
+            time.sleep(TOKEN_DELAY if tok is not None else 0)
+            line = {"message": {"role": "assistant", "content": tok or ""}, "done": tok is None}
+            data = (json.dumps(line) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def main(runs: int = 5):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    llm = LLMProvider()
+    llm._ollama_available()  # warm the connection and health state for both modes
+    rows = []
+    try:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            actions = json.loads(llm.plan_actions("search for best budget laptops 2024"))
+            full = (time.perf_counter() - t0) * 1000.0
+            rows.append({"mode": "plan_actions", "first_action_ms": full, "all_actions_ms": full, "actions": len(actions)})
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            first = None
+            n = 0
+            for _action in llm.plan_actions_stream("search for best budget laptops 2024"):
+                n += 1
+                if first is None:
+                    first = (time.perf_counter() - t0) * 1000.0
+            rows.append({"mode": "plan_actions_stream", "first_action_ms": first, "all_actions_ms": (time.perf_counter() - t0) * 1000.0, "actions": n})
+    finally:
+        server.shutdown()
+        server.server_close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+annotate_all / annotate_changes on a synthetic 20k-element page.
+
+Loads benchmarks/fixtures/marking/index.html (rows of 10 elements, 4 of them
+interactive, in one container) and times, per run:
+- legacy full:        the old script inlined into an f-string evaluate on every
+                      call, getXPath walking every sibling at each level
+- full:               annotate_all (script registered once per context, one-pass XPath)
+- legacy after edit:  the old full capture again after appending ROWS rows
+- incremental:        annotate_changes after appending ROWS rows
+- incremental (top):  annotate_changes after inserting ROWS rows at the top,
+                      which shifts the XPath of every row below them
+- budgeted:           annotate_all as the task agent's dom_update calls it
+                      (near-viewport, visible only, JARVIS_ANNOTATE_MAX, columnar)
+reporting mean milliseconds, how many elements came back and the JSON payload size.
+"""
+import asyncio
+import json
+import os
+import time
+
+from _common import fixture_url, print_table
+
+from web_agents import ANNOTATE_MAX, ANNOTATE_SCOPE, ANNOTATE_TEXT, annotate_all, annotate_changes, wait_dom_quiet
+
+ELEMENTS = int(os.getenv("BENCH_MARKING_ELEMENTS", "20000"))
+ROWS = int(os.getenv("BENCH_MARKING_ROWS", "50"))
+
+# marking.js as it was before incremental capture
+LEGACY_MARKING_JS = r"""
+function captureInteractiveElements() {
+  const results = [];
+  const pushEl = (el, type, description) => {
+    const r = el.getBoundingClientRect();
+    const x = r.left + r.width/2;
+    const y = r.top + r.height/2;
+    results.push({
+      index: results.length,
+      text: (el.innerText || el.value || '').trim().slice(0,200),
+      type,
+      xpath: getXPath(el),
+      x, y,
+      description: description || el.getAttribute('aria-label') || el.getAttribute('title') || '',
+      inViewport: !!(r.top >= 0 && r.left >= 0 && r.bottom <= (window.innerHeight||document.documentElement.clientHeight) && r.right <= (window.innerWidth||document.documentElement.clientWidth))
+    });
+  };
+  document.querySelectorAll('a,button,input,textarea,[role="button"],[contenteditable="true"]').forEach(el => {
+    const tag = el.tagName.toLowerCase();
+    let type = tag;
+    if (tag === 'a') type = 'link';
+    if (el.isContentEditable) type = 'text_editor';
+    pushEl(el, type, undefined);
+  });
+  return results;
+}
+
+function getXPath(element) {
+  if (element.id) return `//*[@id='${element.id}']`;
+  const parts = [];
+  while (element && element.nodeType === Node.ELEMENT_NODE) {
+    let nb = 0, idx = 0;
+    const siblings = element.parentNode ? element.parentNode.children : [];
+    for (let i=0;i<siblings.length;i++) {
+      const sib = siblings[i];
+      if (sib.nodeName === element.nodeName) {
+        nb++;
+        if (sib === element) idx = nb;
+      }
+    }
+    const tagName = element.nodeName.toLowerCase();
+    const nth = idx > 1 ? `[${idx}]` : '';
+    parts.unshift(`${tagName}${nth}`);
+    element = element.parentNode;
+  }
+  return '//' + parts.join('/');
+}
+"""
+
+
+async def _legacy(page):
+    # The old annotate_all: same quiet wait, script re-read and inlined every call
+    await wait_dom_quiet(page, quiet_ms=100, timeout_ms=200)
+    return await page.evaluate(f"""
+        (function() {{
+            {LEGACY_MARKING_JS}
+            return captureInteractiveElements();
+        }})()
+    """)
+
+
+async def _timed(fn):
+    t0 = time.perf_counter()
+    res = await fn()
+    return (time.perf_counter() - t0) * 1000.0, res
+
+
+def _count(res) -> int:
+    if isinstance(res, dict):
+        if "n" in res:
+            return res["n"]
+        return len(res["added"]) + len(res["removed"]) + len(res["moved"])
+    return len(res)
+
+
+async def main(runs: int = 3):
+    from playwright.async_api import async_playwright
+    url = fixture_url("marking/index.html") + f"?n={ELEMENTS}"
+    samples = {}
+
+    def record(name, ms, res):
+        ms_list, _, _ = samples.get(name, ([], 0, 0))
+        ms_list.append(ms)
+        samples[name] = (ms_list, _count(res), len(json.dumps(res, ensure_ascii=False).encode("utf-8")))
+
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        context = await browser.new_context()
+        page = await context.new_page()
+        for _ in range(runs):
+            await page.goto(url, wait_until="load")
+            record("legacy full", *await _timed(lambda: _legacy(page)))
+            record("full", *await _timed(lambda: annotate_all(page)))
+            await page.evaluate(f"addRows({ROWS})")
+            record("legacy after edit", *await _timed(lambda: _legacy(page)))
+            await page.evaluate(f"addRows({ROWS})")
+            record("incremental", *await _timed(lambda: annotate_changes(page)))
+            await page.evaluate(f"addRows({ROWS}, true)")
+            record("incremental (top)", *await _timed(lambda: annotate_changes(page)))
+            record("budgeted", *await _timed(lambda: annotate_all(
+                page, scope=ANNOTATE_SCOPE, max_elements=ANNOTATE_MAX, skip_hidden=True,
+                max_text=ANNOTATE_TEXT, columnar=True)))
+        await browser.close()
+
+    print_table([
+        {"capture": name, "mean_ms": sum(ms) / len(ms), "elements": count, "payload_kb": size / 1024.0}
+        for name, (ms, count, size) in samples.items()
+    ])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
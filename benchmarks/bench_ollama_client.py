@@ -0,0 +1,123 @@
+"""
+Ollama client overhead: per-call probe + fresh connection vs pooled session + cached health.
+
+Runs a local stub of the Ollama API (HTTP/1.1 keep-alive, no model) and counts
+TCP connections and /api/tags probes while LLMProvider answers N chat calls.
+"Legacy" replays the old request pattern (requests.get probe + requests.post
+per call). Also times how fast a dead backend is skipped once the breaker is open.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("JARVIS_LLM_CACHE", "0")
+
+import requests  # noqa: E402
+
+from _common import print_table  # noqa: E402
+from core.llm import LLMProvider  # noqa: E402
+
+COUNTS = {"connections": 0, "probes": 0, "chats": 0}
+COUNTS_LOCK = threading.Lock()
+
+
+def _bump(key: str) -> None:
+    with COUNTS_LOCK:
+        COUNTS[key] += 1
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        _bump("connections")
+        super().setup()
+        # Headers and body go out as separate writes; avoid Nagle/delayed-ACK stalls on keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, obj):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            _bump("probes")
+        self._send({"models": []})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        _bump("chats")
+        self._send({"message": {"role": "assistant", "content": "[]"}})
+
+
+def _reset():
+    with COUNTS_LOCK:
+        for k in COUNTS:
+            COUNTS[k] = 0
+
+
+def _legacy_chat(base: str, messages):
+    # Pre-pooling behaviour: probe on every call, new connection for each request
+    requests.get(base + "/api/tags", timeout=0.8)
+    r = requests.post(base + "/api/chat", json={"model": "stub", "messages": messages, "stream": False}, timeout=60)
+    return r.json().get("message", {}).get("content")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(calls: int = 200):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    messages = [{"role": "user", "content": "ping"}]
+    rows = []
+    try:
+        _reset()
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            _legacy_chat(base, messages)
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        rows.append({"client": "legacy", "calls": calls, "ms_per_call": elapsed / calls, **COUNTS})
+
+        os.environ["OLLAMA_BASE_URL"] = base
+        llm = LLMProvider()
+        _reset()
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            llm._ollama_chat(messages)
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        rows.append({"client": "pooled", "calls": calls, "ms_per_call": elapsed / calls, **COUNTS})
+    finally:
+        server.shutdown()
+        server.server_close()
+    print_table(rows)
+
+    # Dead backend: first call pays the connect failure, the rest are short-circuited
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{_free_port()}"
+    llm = LLMProvider()
+    samples = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        llm._ollama_chat(messages)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    print(f"\ndead backend: first call {samples[0]:.1f} ms, next {len(samples) - 1} calls avg "
+          f"{sum(samples[1:]) / (len(samples) - 1):.3f} ms, probes={llm.ollama_probes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+PDF ingestion for the research agents: extraction and the text cache.
+
+Serves benchmarks/fixtures/pdf (report.pdf: 60 pages, note.pdf: 2 pages) from a
+stand-in HTTP server, also under /mirror/ so the same bytes have a second URL,
+and reports mean milliseconds per:
+- sequential:   every page of report.pdf extracted in this process
+- pool:         extract_pdf_text with no budget (page tasks on the process pool)
+- budget 4000:  extract_pdf_text stopping once 4000 characters are in hand
+- fetch cold:   fetch_pdf_text through a Playwright APIRequestContext, empty cache
+- fetch url:    the same URL again (answered from the URL index, no download)
+- fetch mirror: the same document under another URL (downloaded, hash hit)
+Only Playwright's request API is used, so no browser binary is needed.
+Before timing, checks that note.pdf read with a 5000-character budget (both
+pages read, text cut) is cached as partial: it answers a smaller budget but
+not a larger one or a request for the whole document.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import fixture_path, print_table
+
+from core.pdf_text import PdfTextCache, _extract_pages, extract_pdf_text, fetch_pdf_text
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        if path.startswith("/mirror/"):
+            path = path[len("/mirror"):]
+        return super().translate_path(path)
+
+    def log_message(self, *args):
+        pass
+
+
+def _ms(fn, runs: int) -> float:
+    total = 0.0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        total += (time.perf_counter() - t0) * 1000.0
+    return total / runs
+
+
+def _check_truncated_cache() -> None:
+    note = os.path.join(fixture_path("pdf"), "note.pdf")
+    full = extract_pdf_text(note, 0)
+    res = extract_pdf_text(note, 5000)
+    assert res.pages_read == res.page_count and res.truncated and not res.complete, res
+    directory = tempfile.mkdtemp(prefix="bench-pdf-")
+    try:
+        cache = PdfTextCache(os.path.join(directory, "pdf_text.sqlite3"))
+        url = "http://bench.invalid/note.pdf"
+        res.sha256 = "note"
+        cache.put(url, res)
+        assert cache.by_url(url, 0) is None, "budget-cut text served as the whole document"
+        assert cache.by_url(url, len(full.text)) is None, "budget-cut text served for a larger budget"
+        hit = cache.by_url(url, 4000)
+        assert hit is not None and hit.text == full.text[:4000] and hit.truncated, hit
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def _fetch_rows(base: str, runs: int) -> list:
+    from playwright.async_api import async_playwright
+    cold, by_url, mirror = [], [], []
+    async with async_playwright() as pw:
+        request = await pw.request.new_context()
+        for i in range(runs):
+            directory = tempfile.mkdtemp(prefix="bench-pdf-")
+            cache = PdfTextCache(os.path.join(directory, "pdf_text.sqlite3"))
+            for samples, url in ((cold, base + "report.pdf"), (by_url, base + "report.pdf"), (mirror, base + "mirror/report.pdf")):
+                t0 = time.perf_counter()
+                res = await fetch_pdf_text(request, url, budget=4000, cache=cache)
+                samples.append(((time.perf_counter() - t0) * 1000.0, res.get("cached")))
+            shutil.rmtree(directory, ignore_errors=True)
+        await request.dispose()
+    return [
+        {"case": name, "mean_ms": sum(ms for ms, _ in s) / runs, "cached": s[-1][1]}
+        for name, s in (("fetch cold", cold), ("fetch url", by_url), ("fetch mirror", mirror))
+    ]
+
+
+def main(runs: int = 3):
+    _check_truncated_cache()
+    report = os.path.join(fixture_path("pdf"), "report.pdf")
+    extract_pdf_text(report, 0)  # start the pool's worker processes outside the timings
+    rows = [
+        {"case": "sequential", "mean_ms": _ms(lambda: _extract_pages(report, 0, 10 ** 6), runs), "cached": "-"},
+        {"case": "pool", "mean_ms": _ms(lambda: extract_pdf_text(report, 0), runs), "cached": "-"},
+        {"case": "budget 4000", "mean_ms": _ms(lambda: extract_pdf_text(report, 4000), runs), "cached": "-"},
+    ]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_Handler, directory=fixture_path("pdf")))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        rows += asyncio.run(_fetch_rows(f"http://127.0.0.1:{server.server_address[1]}/", runs))
+    finally:
+        server.shutdown()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Deep-research page read: scroll loop + innerText vs one readable-text extraction.
+
+Loads benchmarks/fixtures/readable/article.html (a long article with a large
+link-heavy sidebar, nav/footer/cookie boilerplate, and sections that lazy-load
+when the bottom scrolls into view) from a local file and times, per run:
+- legacy:   the old deep-research visit, three rounds of
+            document.body.innerText.slice(0, 4000) + mouse.wheel + wait_dom_quiet
+- readable: trigger_lazy_load then iter_readable_text (budget 4500, 1500-char chunks)
+reporting mean milliseconds, evaluate round trips, characters kept, and how
+many of them are boilerplate (sidebar/nav/footer/cookie text).
+"""
+import asyncio
+import os
+import time
+
+from _common import fixture_url, print_table
+
+from web_agents import iter_readable_text, trigger_lazy_load, wait_dom_quiet
+
+SECTIONS = int(os.getenv("BENCH_READABLE_SECTIONS", "60"))
+BOILERPLATE = ("Related story", "Sign in", "Copyright", "cookies", "Privacy")
+
+
+async def _legacy(page) -> list:
+    chunks = []
+    for _ in range(3):
+        txt = await page.evaluate("() => document.body ? document.body.innerText.slice(0, 4000) : ''")
+        if txt:
+            chunks.append(txt[:1500])
+        await page.mouse.wheel(0, 1200)
+        await wait_dom_quiet(page, quiet_ms=200, timeout_ms=600)
+    return chunks
+
+
+async def _readable(page) -> list:
+    await trigger_lazy_load(page)
+    return ["\n".join(b["text"] for b in blocks) async for blocks in iter_readable_text(page, budget=4500, chunk_chars=1500)]
+
+
+def _boilerplate_chars(chunks) -> int:
+    return sum(len(line) for c in chunks for line in c.splitlines() if any(b in line for b in BOILERPLATE))
+
+
+async def main(runs: int = 3):
+    from playwright.async_api import async_playwright
+    url = fixture_url("readable/article.html") + f"?sections={SECTIONS}"
+    rows = []
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for name, visit in (("legacy", _legacy), ("readable", _readable)):
+            ms, calls, chunks = [], [], []
+            for _ in range(runs):
+                await page.goto(url, wait_until="domcontentloaded")
+                counter = {"n": 0}
+                evaluate = page.evaluate
+
+                async def counted(*args, **kwargs):
+                    counter["n"] += 1
+                    return await evaluate(*args, **kwargs)
+                page.evaluate = counted
+                t0 = time.perf_counter()
+                chunks = await visit(page)
+                ms.append((time.perf_counter() - t0) * 1000.0)
+                page.evaluate = evaluate
+                calls.append(counter["n"])
+            rows.append({
+                "visit": name,
+                "mean_ms": sum(ms) / runs,
+                "evaluates": sum(calls) / runs,
+                "chars": sum(len(c) for c in chunks),
+                "boilerplate_chars": _boilerplate_chars(chunks),
+            })
+        await browser.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+Action-script validation cost: compiling every call vs the ScriptCompiler cache.
+
+Uses the built-in intent scripts from core.navigator.web_navigator and a 40-action
+planner-style script, both as Python lists and as the JSON text the planner
+cache hands back. No browser needed.
+"""
+import json
+import time
+
+from _common import print_table
+
+from core.actions import ScriptCompiler, compile_action
+
+INTENT = [
+    {"type": "goto", "url": "https://duckduckgo.com/"},
+    {"type": "fill", "selector": "input[name='q']", "text": "laptops under 50000"},
+    {"type": "press", "key": "Enter"},
+    {"type": "wait_for_navigation", "timeout": 2500},
+    {"type": "wait_for_text", "text": "Amazon", "timeout": 2500},
+    {"type": "click_text", "text": "Amazon"},
+    {"type": "wait_for_navigation", "timeout": 2500},
+]
+LONG = (INTENT + [{"type": "scroll", "deltaY": 800}, {"type": "wait", "duration": 500},
+                  {"type": "extract_tables", "max_rows": "200"}]) * 4
+
+
+def _time(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def main(n: int = 20000):
+    rows = []
+    for name, script in (("intent (7 actions)", INTENT), ("planner (40 actions)", LONG)):
+        text = json.dumps(script)
+        comp = ScriptCompiler()
+        rows.append({
+            "script": name,
+            "validate_every_call_us": _time(lambda: [compile_action(a, i) for i, a in enumerate(script)], n),
+            "cached_list_us": _time(lambda: tuple(comp.compile(script)[0]), n),
+            "json_parse+validate_us": _time(lambda: [compile_action(a, i) for i, a in enumerate(json.loads(text))], n),
+            "cached_json_text_us": _time(lambda: tuple(comp.compile(text)[0]), n),
+        })
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
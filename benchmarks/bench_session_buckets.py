@@ -0,0 +1,87 @@
+"""
+Bucketed session storage with a synthetic 1M-event session (mongomock).
+
+Writes BENCH_EVENTS events (default 1,000,000) through SessionStore's batched
+writer, then reports the largest document size against the 16 MB BSON limit,
+what the same events would weigh as one legacy `events` array, full and paged
+read-back times, and the cost of migrating a legacy session.
+"""
+import os
+import tempfile
+import time
+
+import bson
+import mongomock
+
+from _common import BulkCollection, print_table
+
+os.environ["MONGO_URI"] = "mongodb://127.0.0.1:1"  # no real server; mongomock is attached below
+os.environ["JARVIS_SESSIONS_FILE"] = os.path.join(tempfile.mkdtemp(prefix="bench-buckets-"), "sessions.jsonl")
+
+from core.history import SessionStore  # noqa: E402
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "1000000"))
+BSON_LIMIT = 16 * 1024 * 1024
+
+
+def _store() -> SessionStore:
+    store = SessionStore()
+    db = mongomock.MongoClient()["jarvis"]
+    store._col, store._buckets = BulkCollection(db["sessions"]), BulkCollection(db["sessions_events"])
+    store.ensure_indexes()
+    return store
+
+
+def main():
+    store = _store()
+    sid = store.start_session({"app": "bench"})
+    event = {"type": "action", "script": [{"type": "goto", "url": "https://example.com/"}], "result": "ok"}
+
+    t0 = time.perf_counter()
+    for i in range(EVENTS):
+        store.append_event(sid, {**event, "i": i})
+    store.end_session(sid)
+    write_s = time.perf_counter() - t0
+
+    header = store.get_session(sid)
+    largest = 0
+    legacy_bytes = 0
+    for doc in store._buckets.find({"sessionId": sid}):
+        largest = max(largest, len(bson.encode(doc)))
+        legacy_bytes += sum(len(bson.encode(ev)) for ev in doc["events"])
+
+    t0 = time.perf_counter()
+    n = sum(1 for _ in store.iter_events(sid))
+    read_all_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    page, _cursor = store.events_page(sid, after_seq=EVENTS // 2, limit=100)
+    page_ms = (time.perf_counter() - t0) * 1000.0
+
+    # Legacy document with 100k events (already too big to insert at 1M)
+    legacy_n = min(EVENTS, 100000)
+    store._col.insert_one({"_id": "legacy", "createdAt": "2020-01-01T00:00:00Z",
+                           "events": [{**event, "i": i, "ts": "2020-01-01T00:00:00Z"} for i in range(legacy_n)]})
+    t0 = time.perf_counter()
+    migrated = store.migrate_legacy()
+    migrate_s = time.perf_counter() - t0
+
+    print_table([
+        {"metric": "events written", "value": header["eventCount"]},
+        {"metric": "write rate (events/s)", "value": EVENTS / write_s},
+        {"metric": "bucket docs", "value": header["bucketCount"]},
+        {"metric": "largest bucket (KB)", "value": largest / 1024.0},
+        {"metric": "header doc (bytes)", "value": len(bson.encode(header))},
+        {"metric": "single-doc equivalent (MB)", "value": legacy_bytes / 1048576.0},
+        {"metric": "over 16 MB BSON limit as one doc", "value": legacy_bytes > BSON_LIMIT},
+        {"metric": "iter_events all (s)", "value": read_all_s},
+        {"metric": "events read", "value": n},
+        {"metric": "events_page mid-session (ms)", "value": page_ms},
+        {"metric": "page size", "value": len(page)},
+        {"metric": f"migrate {legacy_n} legacy events (s)", "value": migrate_s},
+        {"metric": "migrated", "value": migrated},
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+sessions.jsonl read side: full-file scan vs SessionLogReader's sidecar index.
+
+Generates a synthetic log (BENCH_LINES lines, default 500,000, spread over
+BENCH_SESSIONS sessions) in a temp dir, then times one-session lookup, a
+type + time-range query and tail for both approaches, plus the one-off index
+build and an incremental refresh after appending 1,000 lines.
+"""
+import json
+import os
+import random
+import tempfile
+import time
+
+from _common import print_table
+from core.session_log import SessionLogReader
+
+LINES = int(os.getenv("BENCH_LINES", "500000"))
+SESSIONS = int(os.getenv("BENCH_SESSIONS", "200"))
+
+
+def _ts(i: int) -> str:
+    return "2026-01-01T%02d:%02d:%02d.%06dZ" % (i // 3600000 % 24, i // 60000 % 60, i // 1000 % 60, i % 1000 * 1000)
+
+
+def _write(path: str, start: int, n: int) -> None:
+    rnd = random.Random(start)
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            sid = "s%04d" % rnd.randrange(SESSIONS)
+            kind = rnd.choice(("user", "action", "action", "extraction", "debug"))
+            f.write(json.dumps({"type": "event", "sessionId": sid, "ts": _ts(i), "seq": i, "kind": kind,
+                                "script": [{"type": "goto", "url": f"https://example.com/{i}"}], "result": "ok"}) + "\n")
+
+
+def _scan(path: str, pred):
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            obj = json.loads(line)
+            if pred(obj):
+                out.append(obj)
+    return out
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    res = fn()
+    return (time.perf_counter() - t0) * 1000.0, res
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="bench-sessionlog-")
+    path = os.path.join(tmp, "sessions.jsonl")
+    _write(path, 0, LINES)
+    reader = SessionLogReader(path)
+    build_ms, _ = _timed(reader.refresh)
+    _write(path, LINES, 1000)
+    incr_ms, added = _timed(reader.refresh)
+    noop_ms, _ = _timed(reader.refresh)
+
+    since, until = _ts(LINES // 2), _ts(LINES // 2 + 20000)
+    rows = [
+        {"step": "index build", "scan_ms": "-", "indexed_ms": build_ms, "matches": LINES},
+        {"step": "refresh (+1000 lines)", "scan_ms": "-", "indexed_ms": incr_ms, "matches": added},
+        {"step": "refresh (no change)", "scan_ms": "-", "indexed_ms": noop_ms, "matches": 0},
+    ]
+    scan_ms, scanned = _timed(lambda: _scan(path, lambda o: o.get("sessionId") == "s0007"))
+    idx_ms, found = _timed(lambda: reader.session("s0007"))
+    assert len(scanned) == len(found)
+    rows.append({"step": "one session", "scan_ms": scan_ms, "indexed_ms": idx_ms, "matches": len(found)})
+
+    scan_ms, scanned = _timed(lambda: _scan(path, lambda o: o.get("type") == "event" and since <= o.get("ts", "") <= until))
+    idx_ms, found = _timed(lambda: list(reader.events(types=["event"], since=since, until=until)))
+    assert len(scanned) == len(found)
+    rows.append({"step": "type + time range", "scan_ms": scan_ms, "indexed_ms": idx_ms, "matches": len(found)})
+
+    scan_ms, scanned = _timed(lambda: _scan(path, lambda o: True)[-50:])
+    idx_ms, found = _timed(lambda: reader.tail(50))
+    assert scanned == found
+    rows.append({"step": "tail 50", "scan_ms": scan_ms, "indexed_ms": idx_ms, "matches": len(found)})
+    print_table(rows)
+    print(f"\nlog {os.path.getsize(path) / 1048576:.1f} MB, index {os.path.getsize(reader.index_path) / 1048576:.1f} MB")
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
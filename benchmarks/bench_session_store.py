@@ -0,0 +1,64 @@
+"""
+SessionStore.append_event throughput and latency: synchronous vs batched writer.
+
+Both modes write to a temp sessions.jsonl and a mongomock collection
+(pip install mongomock). "sync" is JARVIS_SESSIONS_ASYNC=0, i.e. one
+set of Mongo upserts + one file append per event; "batched" queues events for the
+background writer and includes the final flush in the events/sec figure.
+"""
+import os
+import tempfile
+import time
+
+import mongomock
+
+from _common import BulkCollection, print_table
+from core.history import SessionStore
+
+
+def _store(async_mode: bool, path: str) -> SessionStore:
+    os.environ["JARVIS_SESSIONS_ASYNC"] = "1" if async_mode else "0"
+    os.environ["JARVIS_SESSIONS_FILE"] = path
+    os.environ["MONGO_URI"] = "mongodb://127.0.0.1:1"  # no real server; mongomock is attached below
+    store = SessionStore()
+    db = mongomock.MongoClient()["jarvis"]
+    store._col, store._buckets = BulkCollection(db["sessions"]), BulkCollection(db["sessions_events"])
+    return store
+
+
+def _run(async_mode: bool, events: int) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench-sessions-")
+    path = os.path.join(tmp, "sessions.jsonl")
+    store = _store(async_mode, path)
+    sid = store.start_session({"app": "bench"})
+    lat = []
+    payload = {"type": "action", "script": [{"type": "goto", "url": "https://example.com/"}], "result": "ok"}
+    t0 = time.perf_counter()
+    for i in range(events):
+        t = time.perf_counter()
+        store.append_event(sid, {**payload, "i": i})
+        lat.append((time.perf_counter() - t) * 1e6)
+    store.end_session(sid)
+    elapsed = time.perf_counter() - t0
+    lat.sort()
+    doc = store._col.find_one({"_id": sid})
+    with open(path, encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+    return {
+        "mode": "batched" if async_mode else "sync",
+        "events": events,
+        "events_per_s": events / elapsed,
+        "p50_us": lat[len(lat) // 2],
+        "p99_us": lat[int(len(lat) * 0.99)],
+        "mongo_events": doc.get("eventCount", 0) if doc else 0,
+        "file_lines": lines,
+        **({"batches": store.writer_stats().get("batches")} if async_mode else {"batches": "-"}),
+    }
+
+
+def main(events: int = 2000):
+    print_table([_run(False, events), _run(True, events)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+/setup-browser latency: cold start vs warm reuse of the Chrome/CDP connection.
+
+Uses Playwright's bundled Chromium as CHROME_PATH (headless, temp profile, its
+own debugging port) and calls the web_api endpoint coroutine directly:
+
+- cold:           nothing listening on the port, Chrome is spawned
+- warm (conn):    same process, live CDP connection reused
+- warm (restart): fresh connection manager (as after an API restart), Chrome
+                  still listening, so the endpoint is reused without a spawn
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from _common import print_table
+
+PORT = int(os.getenv("BENCH_CDP_PORT", "9333"))
+
+
+async def main(runs: int = 3):
+    from playwright.async_api import async_playwright
+    async with async_playwright() as pw:
+        os.environ["CHROME_PATH"] = pw.chromium.executable_path
+    os.environ["CHROME_CDP_PORT"] = str(PORT)
+    profile = tempfile.mkdtemp(prefix="bench-cdp-")
+
+    import web_api
+    from Browser import web_erverywhere_browser as wbmod
+    from Browser.session_manager import BrowserSessionManager
+
+    def factory():
+        return wbmod.WebErverywhereBrowser(user_data_dir=profile, headless=True)
+
+    async def setup(session_id: str) -> float:
+        t0 = time.perf_counter()
+        await web_api.setup_browser_endpoint(web_api.BrowserSetupRequest(url="about:blank", session_id=session_id), None)
+        return (time.perf_counter() - t0) * 1000.0
+
+    rows = []
+    try:
+        web_api.sessions = BrowserSessionManager(browser_factory=factory)
+        rows.append({"case": "cold", "ms": await setup("bench-0"), **wbmod.get_cdp_manager().last_connect})
+        for i in range(runs):
+            rows.append({"case": "warm (conn)", "ms": await setup(f"bench-conn-{i}"), **wbmod.get_cdp_manager().last_connect})
+        for i in range(runs):
+            # Simulate an API process restart: drop the driver/connection, keep Chrome running
+            await web_api.sessions.close_all()
+            for mgr in wbmod._cdp_managers.values():
+                await mgr.close()
+            wbmod._cdp_managers.clear()
+            web_api.sessions = BrowserSessionManager(browser_factory=factory)
+            rows.append({"case": "warm (restart)", "ms": await setup(f"bench-restart-{i}"), **wbmod.get_cdp_manager().last_connect})
+        print_table(rows)
+    finally:
+        # Stop the Chrome we spawned via the browser-level CDP command, then clean up
+        try:
+            mgr = wbmod.get_cdp_manager()
+            browser = await mgr.get_browser()
+            cdp = await browser.new_browser_cdp_session()
+            await cdp.send("Browser.close")
+        except Exception:
+            pass
+        await web_api.sessions.close_all()
+        await wbmod.close_cdp_managers()
+        shutil.rmtree(profile, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
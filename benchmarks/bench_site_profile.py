@@ -0,0 +1,60 @@
+"""
+SiteProfile inference: locator probes vs one in-page script.
+
+Loads the playground fixtures in benchmarks/fixtures/playgrounds (Monaco,
+CodeMirror 5/6, Ace, plain textarea) and runs
+- probes:    SiteProfile.infer_probes (one round trip per check)
+- script:    SiteProfile.infer on a page without the init script (defines + calls)
+- preloaded: SiteProfile.infer with SITE_PROFILE_INIT_JS installed on the context
+reporting round trips, wall time and what each one learned.
+"""
+from _common import RoundTripCounter, fixture_url, print_table, time_runs
+
+from playwright.sync_api import sync_playwright
+from core.page_scripts import SITE_PROFILE_INIT_JS
+from core.site_profile import SiteProfile
+
+FIXTURES = {
+    "monaco": ("playgrounds/monaco.html", "monaco"),
+    "cm5": ("playgrounds/cm5.html", "cm5"),
+    "cm6": ("playgrounds/cm6.html", "cm6"),
+    "ace": ("playgrounds/ace.html", "ace"),
+    "textarea": ("playgrounds/textarea.html", "textarea"),
+}
+
+
+def main(runs: int = 5):
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch(headless=True)
+        plain = browser.new_context().new_page()
+        preloaded_ctx = browser.new_context()
+        preloaded_ctx.add_init_script(script=SITE_PROFILE_INIT_JS)
+        preloaded = preloaded_ctx.new_page()
+        rows = []
+        for name, (path, expected) in FIXTURES.items():
+            plain.goto(fixture_url(path))
+            preloaded.goto(fixture_url(path))
+            for mode, page, fn in (
+                ("probes", plain, lambda pg: SiteProfile.infer_probes(pg)),
+                ("script", plain, lambda pg: SiteProfile.infer(pg)),
+                ("preloaded", preloaded, lambda pg: SiteProfile.infer(pg, preloaded=True)),
+            ):
+                counted = RoundTripCounter(page)
+                prof = fn(counted)
+                timing = time_runs(lambda: fn(page), runs)
+                assert prof.editor_kind == expected, (name, mode, prof.editor_kind)
+                rows.append({
+                    "fixture": name,
+                    "mode": mode,
+                    "round_trips": counted.counter["calls"],
+                    **timing,
+                    "editor": prof.editor_kind,
+                    "run": prof.run_selector or prof.run_texts[0],
+                    "output": prof.output_selectors[0] if prof.output_selectors else "",
+                })
+        browser.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Idle time per built-in intent: fixed sleeps vs condition-based waits.
+
+Serves benchmarks/fixtures/waits from a local HTTP server (search form,
+client-rendered results, a listing page and a code playground whose /run
+endpoint answers after RUN_DELAY_MS) and runs each core.navigator.web_navigator intent
+twice through BrowserSession.apply_script:
+- fixed:     the old scripts, {"type": "wait", "duration": N} with JARVIS_ADAPTIVE_WAIT=0
+- condition: the current scripts (wait_for_selector / wait_for_navigation /
+             wait_for_network_idle, adaptive "wait")
+reporting the milliseconds spent in wait actions (idle_stats) and whether the
+intent ended in the expected state.
+"""
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import fixture_path, print_table
+
+from core.browser import BrowserSession
+from core.navigator import DDG_RESULTS
+
+RUN_DELAY_MS = int(os.getenv("BENCH_RUN_DELAY_MS", "600"))
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(RUN_DELAY_MS / 1000.0)
+        body = b"1\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _intents(base: str):
+    """(name, setup script, fixed script, condition script, check) per intent."""
+    search = [{"type": "goto", "url": base + "search.html"},
+              {"type": "fill", "selector": "input[name='q']", "text": "laptops"},
+              {"type": "press", "key": "Enter"}]
+    return [
+        ("search", [], search + [{"type": "wait", "duration": 2000}],
+         search + [{"type": "wait_for_selector", "selector": DDG_RESULTS, "timeout": 2000}],
+         lambda p: p.locator(DDG_RESULTS).count() > 0),
+        ("laptops", [],
+         search + [{"type": "wait", "duration": 2500}, {"type": "click_text", "text": "Amazon"},
+                   {"type": "wait", "duration": 2500}],
+         search + [{"type": "wait_for_navigation", "timeout": 2500},
+                   {"type": "wait_for_text", "text": "Amazon", "timeout": 2500},
+                   {"type": "click_text", "text": "Amazon"},
+                   {"type": "wait_for_navigation", "timeout": 2500}],
+         lambda p: p.url.endswith("listing.html")),
+        ("gather", [], search + [{"type": "wait", "duration": 3000}],
+         search + [{"type": "wait_for_selector", "selector": DDG_RESULTS, "timeout": 3000}],
+         lambda p: p.locator(DDG_RESULTS).count() > 0),
+        ("click", search + [{"type": "wait_for_selector", "selector": DDG_RESULTS}],
+         [{"type": "click_text", "text": "Docs for"}, {"type": "wait", "duration": 1500}],
+         [{"type": "click_text", "text": "Docs for"}, {"type": "wait", "duration": 1500}],
+         lambda p: p.url.endswith("docs.html")),
+        ("select_language", [{"type": "goto", "url": base + "playground.html"}],
+         [{"type": "click_text", "text": "Python"}, {"type": "wait", "duration": 800}],
+         [{"type": "click_text", "text": "Python"}, {"type": "wait", "duration": 800}],
+         lambda p: p.inner_text("#lang") == "Python"),
+        ("run_code", [{"type": "goto", "url": base + "playground.html"}],
+         [{"type": "run_code"}, {"type": "wait", "duration": 3000}],
+         [{"type": "run_code"}, {"type": "wait_for_network_idle", "timeout": 3000}],
+         lambda p: p.inner_text("#output").strip() != ""),
+    ]
+
+
+def _run(session: BrowserSession, setup, script, check) -> tuple:
+    if setup:
+        session.apply_script(setup)
+    trace = session.apply_script(script)
+    return trace.idle_ms, check(session.page) and not trace.message.startswith("Error"), trace
+
+
+def main(runs: int = 3):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_Handler, directory=fixture_path("waits")))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    session = BrowserSession()
+    session.profiles = None
+    session.ensure_open = _headless(session)
+    rows = []
+    total_fixed = total_cond = 0.0
+    try:
+        for name, setup, fixed, cond, check in _intents(base):
+            fixed_ms, cond_ms, ok = [], [], True
+            for _ in range(runs):
+                session.adaptive_wait = False
+                ms, good, _ = _run(session, setup, fixed, check)
+                fixed_ms.append(ms)
+                ok = ok and good
+                session.adaptive_wait = True
+                ms, good, _ = _run(session, setup, cond, check)
+                cond_ms.append(ms)
+                ok = ok and good
+            f, c = sum(fixed_ms) / runs, sum(cond_ms) / runs
+            total_fixed += f
+            total_cond += c
+            rows.append({"intent": name, "fixed_idle_ms": f, "condition_idle_ms": c, "saved_ms": f - c, "ok": ok})
+    finally:
+        session.close()
+        server.shutdown()
+    rows.append({"intent": "TOTAL", "fixed_idle_ms": total_fixed, "condition_idle_ms": total_cond,
+                 "saved_ms": total_fixed - total_cond, "ok": all(r["ok"] for r in rows)})
+    print_table(rows)
+
+
+def _headless(session: BrowserSession):
+    # Same as BrowserSession.ensure_open, but headless for benchmarking
+    from playwright.sync_api import sync_playwright
+
+    def ensure_open():
+        if session.page is None:
+            session._p = sync_playwright().start()
+            session._browser = session._p.chromium.launch(headless=True)
+            session.page = session._browser.new_page()
+        return session.page
+    return ensure_open
+
+
+if __name__ == "__main__":
+    main()
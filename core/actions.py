@@ -0,0 +1,249 @@
+from __future__ import annotations
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Field specs per action type: name -> (type, default). REQUIRED fields must be present and non-empty.
+# Every action also accepts 'retries' (extra attempts after an error).
+REQUIRED = object()
+
+ACTION_SPECS: Dict[str, Dict[str, Tuple[type, Any]]] = {
+    "goto": {"url": (str, "about:blank")},
+    "click": {"selector": (str, REQUIRED)},
+    "click_text": {"text": (str, REQUIRED)},
+    "fill": {"selector": (str, None), "text": (str, "")},
+    "type": {"text": (str, "")},
+    "type_code": {"text": (str, ""), "delay": (int, 0)},
+    "clear_editor": {},
+    "set_code": {"text": (str, "")},
+    "press": {"key": (str, "Enter"), "selector": (str, None)},
+    "wait": {"duration": (int, 1000), "fixed": (bool, False), "quiet_ms": (int, None)},
+    "wait_for_navigation": {"url": (str, None), "state": (str, "domcontentloaded"), "timeout": (int, 10000)},
+    "wait_for_selector": {"selector": (str, REQUIRED), "state": (str, "visible"), "timeout": (int, 10000)},
+    # Resolves at once on a document that already went idle: only useful right after a navigation
+    "wait_for_network_idle": {"timeout": (int, 10000)},
+    "wait_for_text": {"text": (str, REQUIRED), "timeout": (int, 10000)},
+    # Output container changed after the last run_code, then stayed quiet for quiet_ms
+    "wait_for_output": {"timeout": (int, 10000), "quiet_ms": (int, 300)},
+    "hover": {"selector": (str, REQUIRED)},
+    "scroll": {"deltaY": (int, 800)},
+    "screenshot": {"path": (str, "screenshot.png")},
+    "learn_site": {},
+    "focus_editor": {},
+    "write_code": {"text": (str, ""), "delay": (int, 0)},
+    "run_code": {},
+    "get_output": {},
+    "extract_tables": {"max_tables": (int, 10), "max_rows": (int, 200), "max_cols": (int, 50)},
+}
+
+WAIT_ACTIONS = ("wait", "wait_for_navigation", "wait_for_selector", "wait_for_network_idle", "wait_for_text", "wait_for_output")
+
+
+class ScriptError(ValueError):
+    """A script action failed validation (unknown type, missing or mistyped field)."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"action {index}: {message}")
+        self.index = index
+
+
+class SoftFailure(Exception):
+    """The action ran but didn't achieve its goal; the script carries on and the first message is reported."""
+
+
+class ScriptAborted(Exception):
+    """Stop the script here and report this message (e.g. an unsolved CAPTCHA)."""
+
+
+@dataclass(frozen=True)
+class Action:
+    type: str
+    args: Dict[str, Any]
+    retries: int = 0
+    # Validation error of an action that is recorded as 'skipped' instead of run (lenient compiles)
+    skip: Optional[str] = None
+
+
+@dataclass
+class ActionResult:
+    index: int
+    type: str
+    outcome: str = "ok"  # 'ok' | 'timeout' (wait_* hit its timeout) | 'soft_fail' | 'failed' | 'aborted' | 'skipped'
+    started_at: float = 0.0
+    ended_at: float = 0.0
+    duration_ms: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    value: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in ("ok", "timeout")
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {
+            "index": self.index,
+            "type": self.type,
+            "outcome": self.outcome,
+            "startedAt": self.started_at,
+            "durationMs": round(self.duration_ms, 2),
+            "attempts": self.attempts,
+        }
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+@dataclass
+class ScriptTrace:
+    """Structured result of one apply_script call; str() gives the user-facing message."""
+    message: str = ""
+    results: List[ActionResult] = field(default_factory=list)
+    started_at: float = 0.0
+    duration_ms: float = 0.0
+    idle_ms: float = 0.0
+    compiled_from_cache: bool = False
+
+    @classmethod
+    def from_message(cls, message: str) -> "ScriptTrace":
+        """A trace for a script that never ran (planning failed, invalid JSON, ...)."""
+        return cls(message=message, started_at=time.time())
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.results) and all(r.ok for r in self.results)
+
+    def slowest(self, n: int = 3) -> List[ActionResult]:
+        return sorted(self.results, key=lambda r: r.duration_ms, reverse=True)[:n]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "message": self.message,
+            "ok": self.ok,
+            "startedAt": self.started_at,
+            "durationMs": round(self.duration_ms, 2),
+            "idleMs": round(self.idle_ms, 2),
+            "cached": self.compiled_from_cache,
+            "actions": [r.to_dict() for r in self.results],
+        }
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def _coerce(index: int, name: str, kind: type, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind is bool:
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ScriptError(index, f"field '{name}' must be {kind.__name__}, got {value!r}")
+
+
+def compile_action(raw: Any, index: int = 0, lenient: bool = False) -> Action:
+    """
+    Validate one action dict against ACTION_SPECS and return it with defaults filled in.
+    With lenient (LLM-written scripts) an invalid action comes back as a skip
+    placeholder rather than raising, so the rest of the script still runs.
+    """
+    if not lenient:
+        return _compile_action(raw, index)
+    try:
+        return _compile_action(raw, index)
+    except ScriptError as e:
+        atype = raw.get("type") if isinstance(raw, dict) else None
+        return Action(type=atype if isinstance(atype, str) and atype else "invalid", args={}, skip=str(e))
+
+
+def _compile_action(raw: Any, index: int) -> Action:
+    if not isinstance(raw, dict):
+        raise ScriptError(index, f"expected an object, got {type(raw).__name__}")
+    atype = raw.get("type")
+    spec = ACTION_SPECS.get(atype)
+    if spec is None:
+        raise ScriptError(index, f"unknown action type {atype!r}")
+    args: Dict[str, Any] = {}
+    for name, (kind, default) in spec.items():
+        value = raw.get(name)
+        if value is None or value == "":
+            if default is REQUIRED:
+                raise ScriptError(index, f"'{atype}' needs '{name}'")
+            args[name] = default
+        else:
+            args[name] = _coerce(index, name, kind, value)
+    retries = _coerce(index, "retries", int, raw.get("retries")) or 0
+    return Action(type=atype, args=args, retries=max(0, retries))
+
+
+class ScriptCompiler:
+    """
+    Compiles scripts into tuples of Actions. Whole scripts (a list, or the JSON
+    text the planner cache returns) are memoised in a small LRU keyed by their
+    JSON, so repeated plans and built-in intents are validated only once.
+    Generators (streamed plans) are compiled lazily, one action at a time.
+    lenient compiles (LLM plans) turn invalid actions into skip placeholders
+    and are cached apart from strict ones.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[Action, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, script: Union[str, Iterable[Dict[str, Any]]], lenient: bool = False) -> Tuple[Iterator[Action], bool]:
+        """
+        Return (actions, from_cache). Raises ScriptError for invalid JSON, a script
+        that is not a list, or (unless lenient) an invalid action.
+        """
+        prefix = "lenient:" if lenient else ""
+        if isinstance(script, str):
+            key = prefix + script
+            cached = self._get(key)
+            if cached is not None:
+                return iter(cached), True
+            try:
+                parsed = json.loads(script)
+            except ValueError as e:
+                raise ScriptError(0, f"invalid JSON: {e}")
+            if not isinstance(parsed, list):
+                raise ScriptError(0, "script must be a JSON array")
+            return iter(self._put(key, parsed, lenient)), False
+        if isinstance(script, (list, tuple)):
+            try:
+                key = prefix + json.dumps(script, sort_keys=True, default=str)
+            except (TypeError, ValueError):
+                return iter(tuple(compile_action(a, i, lenient) for i, a in enumerate(script))), False
+            cached = self._get(key)
+            if cached is not None:
+                return iter(cached), True
+            return iter(self._put(key, script, lenient)), False
+        return (compile_action(a, i, lenient) for i, a in enumerate(script)), False
+
+    def _get(self, key: str) -> Optional[Tuple[Action, ...]]:
+        with self._lock:
+            actions = self._cache.get(key)
+            if actions is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return actions
+
+    def _put(self, key: str, script: List[Any], lenient: bool = False) -> Tuple[Action, ...]:
+        actions = tuple(compile_action(a, i, lenient) for i, a in enumerate(script))
+        with self._lock:
+            self._cache[key] = actions
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return actions
+
+
+compiler = ScriptCompiler()
@@ -0,0 +1,667 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from .actions import Action, ActionResult, ScriptAborted, ScriptError, ScriptTrace, SoftFailure, WAIT_ACTIONS, compiler
+from .browser import (
+    AMAZON_CARD_SELECTOR, AMAZON_PRICE_SELECTORS, BrowserSessionBase, _absolute_href, amazon_laptops_top_k,
+    amazon_matching_records, amazon_price_record, amazon_search_results_top_k, guess_language, top_k_with_prices,
+)
+from .blocking import BlockProfile, ainstall as install_blocking
+from .site_profile import SiteProfile, SiteProfileStore
+from .page_scripts import (
+    AMAZON_CARDS_JS, CAPTCHA_CHECK_JS, CAPTCHA_GONE_JS, DOM_QUIET_JS, SITE_PROFILE_INIT_JS, SUMMARIZE_PAGE_JS, TABLES_JS,
+    OUTPUT_SETTLED_JS, OUTPUT_WATCH_JS, SET_ACE_JS, SET_CM5_JS, SET_CM6_JS, SET_CONTENTEDITABLE_JS, SET_MONACO_JS, SET_TEXTAREA_JS,
+)
+
+_END = object()
+
+
+class AsyncBrowserSession(BrowserSessionBase):
+    """
+    BrowserSession on playwright.async_api: same public surface (apply_script,
+    summarize_page, the extractors and editor helpers) as coroutines, so an
+    event loop drives the page directly instead of hopping to a worker thread
+    per call, and independent reads can be overlapped with asyncio.gather.
+
+    Pass an existing async page (e.g. a web_api client session) to drive it;
+    otherwise ensure_open() launches a browser, and close() only closes what
+    this session launched.
+    """
+
+    def __init__(self, page: Optional[Page] = None, headless: Optional[bool] = None,
+                 profiles: Optional[SiteProfileStore] = None, block_profile: Optional[BlockProfile] = None):
+        super().__init__(headless, profiles, block_profile)
+        self._p = None
+        self._browser: Optional[Browser] = None
+        self.page: Optional[Page] = page
+        self._owns_page = page is None
+
+    async def ensure_open(self) -> Page:
+        if self.page is not None:
+            return self.page
+        if self._p is None:
+            self._p = await async_playwright().start()
+        if self._browser is None:
+            self._browser = await self._p.chromium.launch(headless=self.headless)
+        self.page = await self._browser.new_page()
+        self._owns_page = True
+        self._site_script_ready = False
+        try:
+            await install_blocking(self.page.context, self.block_profile, self.network, self.http_cache)
+        except Exception:
+            pass
+        try:
+            # Site inference script lives on the context, so learn_site only sends a short call
+            await self.page.context.add_init_script(script=SITE_PROFILE_INIT_JS)
+            self._site_script_ready = True
+        except Exception:
+            pass
+        return self.page
+
+    async def close(self):
+        try:
+            if self._browser:
+                await self._browser.close()
+        finally:
+            self._browser = None
+            if self._owns_page:
+                self.page = None
+            if self._p is not None:
+                try:
+                    await self._p.stop()
+                except Exception:
+                    pass
+                self._p = None
+
+    async def __aenter__(self) -> "AsyncBrowserSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # ---------- helpers ----------
+    async def _handle_google_consent(self, page: Page):
+        for sel in (
+            "button:has-text('I agree')",
+            "button:has-text('Accept all')",
+            "button:has-text('Accept')",
+            "//button[.='I agree']",
+            "//button[.='Accept all']",
+        ):
+            try:
+                await page.locator(sel).first.wait_for(state="visible", timeout=1500)
+                await page.locator(sel).first.click()
+                break
+            except Exception:
+                continue
+
+    async def _captcha_signal(self, page: Page) -> Optional[str]:
+        try:
+            return await page.evaluate(CAPTCHA_CHECK_JS)
+        except Exception:
+            return None
+
+    async def _wait_out_captcha(self, page: Page, max_ms: Optional[int] = None) -> bool:
+        """See BrowserSession._wait_out_captcha."""
+        max_ms = self.captcha_max_ms if max_ms is None else max_ms
+        url = page.url
+        t0 = time.perf_counter()
+        try:
+            await page.wait_for_function(CAPTCHA_GONE_JS, timeout=max_ms, polling=250)
+            solved = True
+        except PlaywrightTimeoutError:
+            solved = False
+        except Exception:
+            solved = not await self._captcha_signal(page)
+        self.captcha.record_wait(url, (time.perf_counter() - t0) * 1000.0, solved)
+        return solved
+
+    # ---------- waits ----------
+    async def _wait_dom_quiet(self, page: Page, timeout_ms: int, quiet_ms: Optional[int] = None) -> None:
+        quiet = self.dom_quiet_ms if quiet_ms is None else quiet_ms
+        if timeout_ms <= quiet:
+            await page.wait_for_timeout(timeout_ms)
+            return
+        self._wait_token += 1
+        await page.wait_for_function(DOM_QUIET_JS, arg={"quietMs": quiet, "token": self._wait_token}, timeout=timeout_ms, polling=50)
+
+    async def _wait_for_navigation(self, page: Page, args: Dict[str, Any]) -> None:
+        nav_from = self._nav_from
+        state, url, timeout_ms = args["state"], args["url"], args["timeout"]
+        if url:
+            await page.wait_for_url(url, wait_until=state, timeout=timeout_ms)
+        elif page.url == nav_from:
+            await page.wait_for_url(lambda u: u != nav_from, wait_until=state, timeout=timeout_ms)
+        else:
+            await page.wait_for_load_state(state, timeout=timeout_ms)
+
+    async def _smart_fill(self, page: Page, selector: Optional[str], text: str) -> bool:
+        candidates = [selector] if selector else []
+        normalized = selector.replace('"', "'") if selector else ""
+        if normalized in ("input[name='q']", "input[name=q]"):
+            candidates += ["textarea[name='q']", "#APjFqb"]
+        candidates += ["input[name='q']"]
+        for sel in [c for c in candidates if c]:
+            try:
+                await page.locator(sel).first.wait_for(state="visible", timeout=4000)
+                await page.fill(sel, text)
+                return True
+            except Exception:
+                continue
+        try:
+            await page.keyboard.type(text)
+            return True
+        except Exception:
+            return False
+
+    # ---------- editor helpers ----------
+    async def _focus_editor(self, page: Page) -> bool:
+        for sel in (
+            ".monaco-editor .view-lines",
+            ".CodeMirror",
+            ".cm-content",
+            ".cm-editor",
+            ".ace_editor",
+            "[contenteditable='true']",
+            "textarea",
+        ):
+            try:
+                loc = page.locator(sel).first
+                if await loc.count() > 0:
+                    # For hidden inputs like Ace's textarea, click the visible container
+                    if sel == "textarea" and "ace_text-input" in (await loc.get_attribute("class") or ""):
+                        try:
+                            await page.locator(".ace_editor").first.click()
+                        except Exception:
+                            pass
+                    else:
+                        await loc.click()
+                    return True
+            except Exception:
+                continue
+        return False
+
+    async def _eval_setter(self, page: Page, js: str, text: str) -> bool:
+        try:
+            return bool(await page.evaluate(js, text))
+        except Exception:
+            return False
+
+    async def _set_textarea_value(self, page: Page, text: str) -> bool:
+        try:
+            if await page.locator("textarea").count() > 0:
+                return bool(await page.eval_on_selector("textarea", SET_TEXTAREA_JS, text))
+        except Exception:
+            pass
+        return False
+
+    async def _set_editor_value(self, page: Page, text: str) -> bool:
+        # Same order as BrowserSession.set_code: Monaco, CodeMirror 5/6, Ace, textarea, contenteditable
+        for js in (SET_MONACO_JS, SET_CM5_JS, SET_CM6_JS, SET_ACE_JS):
+            if await self._eval_setter(page, js, text):
+                return True
+        if await self._set_textarea_value(page, text):
+            return True
+        return await self._eval_setter(page, SET_CONTENTEDITABLE_JS, text)
+
+    async def clear_editor(self) -> bool:
+        p = await self.ensure_open()
+        if await self._set_editor_value(p, ""):
+            return True
+        ok = await self._focus_editor(p)
+        try:
+            await p.keyboard.press("Control+A")
+            await p.keyboard.press("Delete")
+            return True
+        except Exception:
+            return ok
+
+    async def type_code(self, text: str, delay_ms: int = 0) -> bool:
+        p = await self.ensure_open()
+        await self._focus_editor(p)
+        try:
+            await p.keyboard.type(text, delay=delay_ms)
+            return True
+        except Exception:
+            return False
+
+    async def set_code(self, text: str) -> bool:
+        p = await self.ensure_open()
+        if await self._set_editor_value(p, text):
+            return True
+        ok = await self.clear_editor()
+        typed = await self.type_code(text)
+        return ok or typed
+
+    async def _auto_find_and_focus_editor(self, page: Page) -> bool:
+        for attempt in range(2):
+            if attempt:
+                try:
+                    await page.evaluate("window.scrollTo(0,0)")
+                except Exception:
+                    pass
+            for _ in range(0, 4000, 400):
+                try:
+                    await page.mouse.wheel(0, 400)
+                except Exception:
+                    pass
+                if await self._focus_editor(page):
+                    return True
+        return False
+
+    async def get_code(self) -> str:
+        p = await self.ensure_open()
+        try:
+            val = await p.eval_on_selector("textarea", "e => e && e.value")
+            if val:
+                return str(val)
+        except Exception:
+            pass
+        for sel in (".cm-content", ".monaco-editor .view-lines"):
+            try:
+                if await p.locator(sel).count() > 0:
+                    return await p.locator(sel).inner_text()
+            except Exception:
+                pass
+        try:
+            return await p.locator("body").inner_text()
+        except Exception:
+            return ""
+
+    # ---------- public API ----------
+    async def summarize_page(self, max_links: int = 30, max_chars: int = 3000, max_headings: int = 30, max_fields: int = 30) -> Dict[str, Any]:
+        """See BrowserSession.summarize_page."""
+        p = await self.ensure_open()
+        try:
+            res = await p.evaluate(SUMMARIZE_PAGE_JS, self._summary_opts(p.url, max_links, max_chars, max_headings, max_fields))
+        except Exception:
+            res = None
+        return self._summary_result(p.url, res)
+
+    async def apply_script(self, script: Union[str, Iterable[Dict[str, Any]]], lenient: bool = False) -> ScriptTrace:
+        """
+        BrowserSession.apply_script as a coroutine. A generator script (a streamed
+        LLM plan) is advanced on the default executor so the loop keeps running
+        while the next action is being generated.
+        """
+        trace = ScriptTrace(started_at=time.time())
+        t0 = time.perf_counter()
+        self.idle["last_ms"] = 0.0
+        try:
+            actions, trace.compiled_from_cache = compiler.compile(script, lenient)
+            p = await self.ensure_open()
+            blocking = not isinstance(script, (str, list, tuple))
+            trace.message = await self._execute(p, actions, trace, blocking)
+        except ScriptError as e:
+            trace.message = f"Invalid browser script: {e}"
+        except Exception as e:
+            trace.message = f"Error during browser automation: {e}"
+        trace.duration_ms = (time.perf_counter() - t0) * 1000.0
+        trace.idle_ms = self.idle["last_ms"]
+        return trace
+
+    async def _execute(self, p: Page, actions: Iterator[Action], trace: ScriptTrace, blocking: bool = False) -> str:
+        loop = asyncio.get_running_loop()
+        error_msg = None
+        last_text: Optional[str] = None
+        self._nav_from = p.url
+        i = -1
+        while True:
+            action = (await loop.run_in_executor(None, next, actions, _END)) if blocking else next(actions, _END)
+            if action is _END:
+                break
+            i += 1
+            if action.skip is not None:
+                now = time.time()
+                trace.results.append(ActionResult(index=i, type=action.type, outcome="skipped",
+                                                  started_at=now, ended_at=now, error=action.skip))
+                continue
+            handler = self._ACTION_HANDLERS[action.type]
+            is_wait = action.type in WAIT_ACTIONS
+            if not is_wait:
+                self._nav_from = p.url
+            res = ActionResult(index=i, type=action.type, started_at=time.time())
+            trace.results.append(res)
+            t0 = time.perf_counter()
+            try:
+                while True:
+                    res.attempts += 1
+                    try:
+                        res.value = await handler(self, p, action.args)
+                        break
+                    except (SoftFailure, ScriptAborted):
+                        raise
+                    except PlaywrightTimeoutError:
+                        if is_wait or res.attempts > action.retries:
+                            raise
+                    except Exception:
+                        if res.attempts > action.retries:
+                            raise
+            except SoftFailure as e:
+                res.outcome, res.error = "soft_fail", str(e)
+                error_msg = error_msg or str(e)
+            except ScriptAborted as e:
+                res.outcome, res.error = "aborted", str(e)
+                return str(e)
+            except PlaywrightTimeoutError as e:
+                if not is_wait:
+                    res.outcome, res.error = "failed", str(e)
+                    raise
+                res.outcome = "timeout"
+                self.idle["timeouts"] += 1
+            except Exception as e:
+                res.outcome, res.error = "failed", str(e)
+                raise
+            finally:
+                res.ended_at = time.time()
+                res.duration_ms = (time.perf_counter() - t0) * 1000.0
+                if is_wait:
+                    self.idle["last_ms"] += res.duration_ms
+                    self.idle["total_ms"] += res.duration_ms
+            if action.type == "get_output":
+                last_text = res.value
+        return error_msg or (last_text if (last_text is not None and last_text != "") else "I have completed the browsing task.")
+
+    # ---------- action handlers (same semantics as BrowserSession's) ----------
+    async def _act_goto(self, p: Page, args: Dict[str, Any]):
+        await p.goto(args["url"], wait_until="domcontentloaded")
+        self._load_site_profile(p)
+        if "google." in p.url:
+            await self._handle_google_consent(p)
+        signal = await self._captcha_signal(p)
+        if signal:
+            self.captcha.record_detect(p.url, signal)
+            if not await self._wait_out_captcha(p):
+                raise ScriptAborted("CAPTCHA detected. Please solve it in the browser and try again.")
+
+    async def _act_click(self, p: Page, args: Dict[str, Any]):
+        sel = args["selector"]
+        await p.locator(sel).first.wait_for(state="visible", timeout=5000)
+        await p.click(sel)
+
+    async def _act_click_text(self, p: Page, args: Dict[str, Any]):
+        await p.get_by_text(args["text"], exact=False).first.click()
+
+    async def _act_fill(self, p: Page, args: Dict[str, Any]):
+        await self._smart_fill(p, args["selector"], args["text"])
+
+    async def _act_type(self, p: Page, args: Dict[str, Any]):
+        await p.keyboard.type(args["text"])
+
+    async def _act_type_code(self, p: Page, args: Dict[str, Any]):
+        if not await self.type_code(args["text"], delay_ms=args["delay"]):
+            raise SoftFailure("Couldn't type into the editor.")
+
+    async def _act_clear_editor(self, p: Page, args: Dict[str, Any]):
+        if not await self.clear_editor():
+            raise SoftFailure("Couldn't find an editor to clear on this page.")
+
+    async def _act_set_code(self, p: Page, args: Dict[str, Any]):
+        if not await self.set_code(args["text"]):
+            raise SoftFailure("Couldn't find an editor to set code on this page.")
+
+    async def _act_press(self, p: Page, args: Dict[str, Any]):
+        key, sel = args["key"], args["selector"]
+        try:
+            if sel:
+                await p.locator(sel).first.wait_for(state="visible", timeout=3000)
+                await p.press(sel, key)
+            else:
+                await p.keyboard.press(key)
+        except Exception:
+            await p.keyboard.press(key)
+
+    async def _act_wait(self, p: Page, args: Dict[str, Any]):
+        if self.adaptive_wait and not args["fixed"]:
+            await self._wait_dom_quiet(p, args["duration"], args["quiet_ms"])
+        else:
+            await p.wait_for_timeout(args["duration"])
+
+    async def _act_wait_for_navigation(self, p: Page, args: Dict[str, Any]):
+        await self._wait_for_navigation(p, args)
+
+    async def _act_wait_for_selector(self, p: Page, args: Dict[str, Any]):
+        await p.wait_for_selector(args["selector"], state=args["state"], timeout=args["timeout"])
+
+    async def _act_wait_for_network_idle(self, p: Page, args: Dict[str, Any]):
+        await p.wait_for_load_state("networkidle", timeout=args["timeout"])
+
+    async def _act_wait_for_output(self, p: Page, args: Dict[str, Any]):
+        await p.wait_for_function(OUTPUT_SETTLED_JS, arg={"quietMs": args["quiet_ms"]}, timeout=args["timeout"], polling=50)
+
+    async def _act_wait_for_text(self, p: Page, args: Dict[str, Any]):
+        await p.get_by_text(args["text"], exact=False).first.wait_for(state="visible", timeout=args["timeout"])
+
+    async def _act_hover(self, p: Page, args: Dict[str, Any]):
+        await p.locator(args["selector"]).first.hover()
+
+    async def _act_scroll(self, p: Page, args: Dict[str, Any]):
+        await p.mouse.wheel(0, args["deltaY"])
+
+    async def _act_screenshot(self, p: Page, args: Dict[str, Any]):
+        await p.screenshot(path=args["path"])
+
+    async def _act_learn_site(self, p: Page, args: Dict[str, Any]):
+        self._profile = await SiteProfile.ainfer(p, preloaded=self._site_script_ready)
+        if self.profiles is not None:
+            self.profiles.put(self._profile)
+
+    async def _act_focus_editor(self, p: Page, args: Dict[str, Any]):
+        if not await self._auto_find_and_focus_editor(p):
+            raise SoftFailure("Couldn't find an editor on this page.")
+
+    async def _act_write_code(self, p: Page, args: Dict[str, Any]):
+        text, delay = args["text"], args["delay"]
+        if delay > 0:
+            await self._auto_find_and_focus_editor(p)
+            if not await self.type_code(text, delay_ms=delay) and not await self.set_code(text):
+                raise SoftFailure("Couldn't type or set code into the editor.")
+            return
+        if await self.set_code(text):
+            return
+        await self._auto_find_and_focus_editor(p)
+        if not await self.type_code(text):
+            raise SoftFailure("Couldn't type or set code into the editor.")
+
+    async def _act_run_code(self, p: Page, args: Dict[str, Any]):
+        try:
+            await p.evaluate(OUTPUT_WATCH_JS, self._output_watch_selectors())
+        except Exception:
+            pass
+        await self._click_run(p)
+
+    async def _act_get_output(self, p: Page, args: Dict[str, Any]):
+        return await self._read_output(p)
+
+    async def _act_extract_tables(self, p: Page, args: Dict[str, Any]):
+        return await self.extract_tables(args["max_tables"], args["max_rows"], args["max_cols"])
+
+    _ACTION_HANDLERS = {
+        "goto": _act_goto,
+        "click": _act_click,
+        "click_text": _act_click_text,
+        "fill": _act_fill,
+        "type": _act_type,
+        "type_code": _act_type_code,
+        "clear_editor": _act_clear_editor,
+        "set_code": _act_set_code,
+        "press": _act_press,
+        "wait": _act_wait,
+        "wait_for_navigation": _act_wait_for_navigation,
+        "wait_for_selector": _act_wait_for_selector,
+        "wait_for_network_idle": _act_wait_for_network_idle,
+        "wait_for_text": _act_wait_for_text,
+        "wait_for_output": _act_wait_for_output,
+        "hover": _act_hover,
+        "scroll": _act_scroll,
+        "screenshot": _act_screenshot,
+        "learn_site": _act_learn_site,
+        "focus_editor": _act_focus_editor,
+        "write_code": _act_write_code,
+        "run_code": _act_run_code,
+        "get_output": _act_get_output,
+        "extract_tables": _act_extract_tables,
+    }
+
+    async def _click_text(self, p: Page, txt: str) -> bool:
+        try:
+            await p.get_by_text(txt, exact=False).first.click()
+            return True
+        except Exception:
+            return False
+
+    async def _click_run(self, p: Page) -> bool:
+        prof = self._profile
+        if prof:
+            # Known winners first; a winner that no longer matches counts as a miss
+            for key, loc in (
+                ("run_selector", p.locator(prof.run_selector).first if prof.run_selector else None),
+                ("run_text", p.get_by_text(prof.run_text, exact=False).first if prof.run_text else None),
+            ):
+                if loc is None:
+                    continue
+                try:
+                    if await loc.count() > 0:
+                        await loc.click()
+                        self._profile_win(p, key, getattr(prof, key))
+                        return True
+                    self._profile_miss(key)
+                except Exception:
+                    pass
+            for txt in prof.run_texts:
+                if await self._click_text(p, txt):
+                    self._profile_win(p, "run_text", txt)
+                    return True
+        for txt in self._RUN_TEXTS:
+            if await self._click_text(p, txt):
+                self._profile_win(p, "run_text", txt)
+                return True
+        for sel in self._RUN_SELECTORS:
+            try:
+                await p.locator(sel).first.click()
+                self._profile_win(p, "run_selector", sel)
+                return True
+            except Exception:
+                continue
+        return False
+
+    async def _read_output(self, p: Page) -> str:
+        prof = self._profile
+        if prof and prof.output_selector:
+            try:
+                loc = p.locator(prof.output_selector).first
+                if await loc.count() > 0:
+                    text = await loc.inner_text()
+                    if text:
+                        self._profile_win(p, "output_selector", prof.output_selector)
+                        return text
+                else:
+                    self._profile_miss("output_selector")
+            except Exception:
+                pass
+        candidates = list(prof.output_selectors) if prof else []
+        candidates += [sel for sel in self._OUTPUT_SELECTORS if sel not in candidates]
+        for sel in candidates:
+            try:
+                loc = p.locator(sel).first
+                if await loc.count() > 0:
+                    text = await loc.inner_text()
+                    if text:
+                        self._profile_win(p, "output_selector", sel)
+                        return text
+            except Exception:
+                continue
+        return ""
+
+    # ---------- language heuristics ----------
+    async def detect_language(self) -> str:
+        p = await self.ensure_open()
+        try:
+            title = await p.title() or ""
+        except Exception:
+            title = ""
+        return guess_language(title, await self.extract_text(), p.url or "")
+
+    async def extract_text(self) -> str:
+        p = await self.ensure_open()
+        try:
+            return await p.locator("body").inner_text()
+        except Exception:
+            return ""
+
+    async def extract_top_k_with_prices(self, k: int = 5) -> List[Dict[str, Any]]:
+        return top_k_with_prices(await self.extract_text(), k)
+
+    # ---------- Amazon listing extraction ----------
+    async def _amazon_card_records(self, page: Page, limit: int = 60) -> List[Dict[str, Any]]:
+        # Always the single-evaluate path; the per-card locator walk only exists for the sync benchmark
+        try:
+            return await page.evaluate(AMAZON_CARDS_JS, limit) or []
+        except Exception:
+            return []
+
+    async def extract_amazon_laptops_top_k(self, k: int = 5, max_price: Optional[float] = None, currency: str = "INR") -> List[Dict[str, Any]]:
+        p = await self.ensure_open()
+        try:
+            return amazon_laptops_top_k(await self._amazon_card_records(p, 60), p.url, k, max_price, currency)
+        except Exception:
+            return []
+
+    async def extract_amazon_search_results_top_k(self, k: int = 5, max_price: Optional[float] = None, currency_hint: str = "INR", only_with_price: bool = False) -> List[Dict[str, Any]]:
+        p = await self.ensure_open()
+        try:
+            return amazon_search_results_top_k(await self._amazon_card_records(p, 60), p.url, k, max_price, currency_hint, only_with_price)
+        except Exception:
+            return []
+
+    async def amazon_click_first_matching(self, query: str, skip_first: int = 0) -> Optional[Dict[str, Any]]:
+        p = await self.ensure_open()
+        records = await self._amazon_card_records(p, 10_000)
+        for rec, name in amazon_matching_records(records, query, skip_first):
+            try:
+                await p.locator(AMAZON_CARD_SELECTOR).nth(rec["index"]).locator("h2 a").first.click()
+                return {"name": name, "url": _absolute_href(p.url, rec.get("href") or "")}
+            except Exception:
+                continue
+        return None
+
+    async def extract_amazon_product_price(self, currency_hint: str = "INR") -> Dict[str, Optional[Any]]:
+        p = await self.ensure_open()
+        price_text = ""
+        for sel in AMAZON_PRICE_SELECTORS:
+            try:
+                if await p.locator(sel).count() > 0:
+                    price_text = (await p.locator(sel).first.inner_text()).strip()
+                    if price_text:
+                        break
+            except Exception:
+                continue
+        return amazon_price_record(price_text, currency_hint)
+
+    # ---------- table extraction ----------
+    async def extract_tables(self, max_tables: int = 10, max_rows: int = 200, max_cols: int = 50) -> List[Dict[str, Any]]:
+        p = await self.ensure_open()
+        try:
+            return await p.evaluate(TABLES_JS, {"maxTables": max_tables, "maxRows": max_rows, "maxCols": max_cols}) or []
+        except Exception:
+            return []
+
+    async def extract_table_chunk(self, index: int, offset: int = 0, limit: int = 500, max_cols: int = 50) -> Optional[Dict[str, Any]]:
+        p = await self.ensure_open()
+        try:
+            return await p.evaluate(TABLES_JS, {"tableIndex": index, "offset": offset, "limit": limit, "maxCols": max_cols})
+        except Exception:
+            return None
+
+    async def iter_table_chunks(self, index: int, chunk_rows: int = 500, offset: int = 0, max_cols: int = 50) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            chunk = await self.extract_table_chunk(index, offset, chunk_rows, max_cols)
+            if not chunk or not chunk.get("row_count"):
+                return
+            yield chunk
+            offset += chunk["row_count"]
+            if not chunk.get("truncated"):
+                return
@@ -0,0 +1,227 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional
+from urllib.parse import urlsplit
+
+from . import http_cache
+
+# Resource types (Playwright request.resource_type) each profile refuses to load
+_PROFILE_TYPES: Dict[str, FrozenSet[str]] = {
+    "full": frozenset(),
+    "no-media": frozenset({"image", "media", "font"}),
+    "text-only": frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource"}),
+}
+
+# Analytics/ads hosts; blocked by every profile except "full"
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com", "segment.io",
+    "scorecardresearch.com", "amazon-adsystem.com", "criteo.com", "taboola.com", "outbrain.com",
+)
+# Path keywords; only with JARVIS_BLOCK_TRACKER_PATHS=1, as first-party URLs use them too
+_TRACKER_PATH = re.compile(r"(analytics|tracking|beacon)", re.I)
+
+# CAPTCHA widgets must render for the user to solve them, whatever the profile
+DEFAULT_ALLOW: Dict[str, FrozenSet[str]] = {
+    "recaptcha.net": frozenset({"*"}),
+    "www.google.com/recaptcha": frozenset({"*"}),
+    "gstatic.com/recaptcha": frozenset({"*"}),
+    "hcaptcha.com": frozenset({"*"}),
+    "challenges.cloudflare.com": frozenset({"*"}),
+    "arkoselabs.com": frozenset({"*"}),
+}
+
+
+def _host_matches(host: str, domain: str) -> bool:
+    return host == domain or host.endswith("." + domain)
+
+
+def parse_allowlist(spec: str) -> Dict[str, FrozenSet[str]]:
+    """'amazon.in:image|font, docs.python.org' -> {'amazon.in': {'image', 'font'}, 'docs.python.org': {'*'}}."""
+    allow: Dict[str, FrozenSet[str]] = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        domain, _, types = entry.partition(":")
+        allow[domain.strip().lower()] = frozenset(t.strip() for t in types.split("|") if t.strip()) or frozenset({"*"})
+    return allow
+
+
+@dataclass(frozen=True)
+class BlockProfile:
+    """
+    Which requests a browser context refuses to load. Top-level documents are
+    never blocked. `allow` maps a domain (optionally with a path prefix) to the
+    resource types still loaded from it ('*' = everything, trackers included).
+    Trackers are matched by host (TRACKER_HOSTS); block_tracker_paths also
+    matches analytics/tracking/beacon in the path, on any host.
+    """
+    name: str = "full"
+    resource_types: FrozenSet[str] = frozenset()
+    block_trackers: bool = False
+    allow: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    block_tracker_paths: bool = False
+
+    @classmethod
+    def named(cls, name: str, allow: Optional[Dict[str, FrozenSet[str]]] = None,
+              tracker_paths: bool = False) -> "BlockProfile":
+        if name not in _PROFILE_TYPES:
+            raise ValueError(f"unknown block profile {name!r} (expected one of {', '.join(_PROFILE_TYPES)})")
+        return cls(
+            name=name,
+            resource_types=_PROFILE_TYPES[name],
+            block_trackers=name != "full",
+            allow={**DEFAULT_ALLOW, **(allow or {})},
+            block_tracker_paths=tracker_paths and name != "full",
+        )
+
+    @classmethod
+    def from_env(cls, default: str = "no-media") -> "BlockProfile":
+        """
+        JARVIS_BLOCK_PROFILE (full | no-media | text-only), JARVIS_BLOCK_ALLOW (see
+        parse_allowlist) and JARVIS_BLOCK_TRACKER_PATHS (default off, '1' enables).
+        """
+        name = os.getenv("JARVIS_BLOCK_PROFILE", default).strip().lower()
+        tracker_paths = os.getenv("JARVIS_BLOCK_TRACKER_PATHS", "0") in ("1", "true", "True")
+        try:
+            return cls.named(name, parse_allowlist(os.getenv("JARVIS_BLOCK_ALLOW", "")), tracker_paths)
+        except ValueError:
+            return cls.named(default, tracker_paths=tracker_paths)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.resource_types) or self.block_trackers
+
+    def _allowed(self, host: str, path: str, resource_type: str) -> bool:
+        for domain, types in self.allow.items():
+            dom, _, prefix = domain.partition("/")
+            if _host_matches(host, dom) and (not prefix or path.lstrip("/").startswith(prefix)):
+                if "*" in types or resource_type in types:
+                    return True
+        return False
+
+    def block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        """The resource type (or 'tracker') this request is blocked as, or None to let it through."""
+        if resource_type == "document" or not self.active:
+            return None
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return None
+        host = (parts.hostname or "").lower()
+        if self.allow and self._allowed(host, parts.path, resource_type):
+            return None
+        if resource_type in self.resource_types:
+            return resource_type
+        if self.block_trackers and any(_host_matches(host, t) for t in TRACKER_HOSTS):
+            return "tracker"
+        if self.block_tracker_paths and _TRACKER_PATH.search(parts.path):
+            return "tracker"
+        return None
+
+
+class NetworkStats:
+    """Requests seen/blocked (by reason) and response bytes (Content-Length) loaded, for one browser stack."""
+
+    def __init__(self, profile: str = "full"):
+        self._lock = threading.Lock()
+        self.profile = profile
+        self.requests = 0
+        self.blocked: Dict[str, int] = {}
+        self.responses = 0
+        self.bytes_loaded = 0
+
+    def record_request(self, reason: Optional[str]) -> None:
+        with self._lock:
+            self.requests += 1
+            if reason:
+                self.blocked[reason] = self.blocked.get(reason, 0) + 1
+
+    def record_response(self, content_length: Optional[str]) -> None:
+        try:
+            size = int(content_length or 0)
+        except ValueError:
+            size = 0
+        with self._lock:
+            self.responses += 1
+            self.bytes_loaded += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "profile": self.profile,
+                "requests": self.requests,
+                "blocked": sum(self.blocked.values()),
+                "blocked_by_reason": dict(self.blocked),
+                "responses": self.responses,
+                "bytes_loaded": self.bytes_loaded,
+            }
+
+
+# Contexts already carrying our handlers; a reused context (e.g. Chrome's default one over CDP) is routed once
+_installed: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def _on_response(stats: NetworkStats):
+    def handler(response) -> None:
+        try:
+            stats.record_response(response.headers.get("content-length"))
+        except Exception:
+            pass
+    return handler
+
+
+def install(context, profile: BlockProfile, stats: NetworkStats, cache: Optional[http_cache.HttpCache] = None) -> bool:
+    """
+    Route a playwright.sync_api BrowserContext through profile, and through cache
+    for what gets past it. False if it was already set up.
+    """
+    if context in _installed:
+        return False
+    _installed.add(context)
+    context.on("response", _on_response(stats))
+    if cache is not None:
+        # Routes run last-registered first: blocking decides, then fallback() reaches the cache
+        http_cache.install(context, cache)
+    if not profile.active:
+        return True
+
+    def handler(route) -> None:
+        req = route.request
+        reason = profile.block_reason(req.url, req.resource_type)
+        stats.record_request(reason)
+        if reason:
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    context.route("**/*", handler)
+    return True
+
+
+async def ainstall(context, profile: BlockProfile, stats: NetworkStats, cache: Optional[http_cache.HttpCache] = None) -> bool:
+    """install() for a playwright.async_api BrowserContext."""
+    if context in _installed:
+        return False
+    _installed.add(context)
+    context.on("response", _on_response(stats))
+    if cache is not None:
+        await http_cache.ainstall(context, cache)
+    if not profile.active:
+        return True
+
+    async def handler(route) -> None:
+        req = route.request
+        reason = profile.block_reason(req.url, req.resource_type)
+        stats.record_request(reason)
+        if reason:
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    await context.route("**/*", handler)
+    return True
@@ -2,26 +2,429 @@ from __future__ import annotations
 import os
 import re
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import time
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from playwright.sync_api import sync_playwright, Page, Browser
-from .site_profile import SiteProfile
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from .actions import Action, ActionResult, ScriptAborted, ScriptError, ScriptTrace, SoftFailure, WAIT_ACTIONS, compiler
+from .blocking import BlockProfile, NetworkStats, install as install_blocking
+from .http_cache import HttpCache
+from .site_profile import SiteProfile, SiteProfileStore, origin_of
+from .page_scripts import (
+    AMAZON_CARDS_JS, CAPTCHA_CHECK_JS, CAPTCHA_GONE_JS, DOM_QUIET_JS, SITE_PROFILE_INIT_JS, SUMMARIZE_PAGE_JS, TABLES_JS,
+    OUTPUT_SETTLED_JS, OUTPUT_WATCH_JS, SET_ACE_JS, SET_CM5_JS, SET_CM6_JS, SET_CONTENTEDITABLE_JS, SET_MONACO_JS, SET_TEXTAREA_JS,
+)
+import queue
 from concurrent.futures import ThreadPoolExecutor
 
 
-class BrowserSession:
+def _parse_price(text: str) -> Optional[float]:
+    if not text:
+        return None
+    s = text
+    for sym in ["₹", "Rs.", "$", "£", "€"]:
+        s = s.replace(sym, "")
+    s = s.replace(",", "").strip()
+    try:
+        return float(s)
+    except Exception:
+        m = re.search(r"\d+[\d,]*", text)
+        if m:
+            try:
+                return float(m.group(0).replace(",", ""))
+            except Exception:
+                return None
+        return None
+
+
+def _detect_currency(text: str, fallback: str) -> str:
+    if not text:
+        return fallback
+    if "₹" in text or "Rs" in text:
+        return "INR"
+    if "$" in text:
+        return "USD"
+    if "£" in text:
+        return "GBP"
+    if "€" in text:
+        return "EUR"
+    return fallback
+
+
+def _card_price_text(rec: Dict[str, Any]) -> str:
+    """Price string for an Amazon card record: offscreen price, else whole.fraction."""
+    if rec.get("price_offscreen"):
+        return rec["price_offscreen"]
+    if rec.get("price_whole"):
+        return f"{rec['price_whole']}.{rec.get('price_fraction') or '00'}"
+    return ""
+
+
+def _absolute_href(base_url: str, href: str) -> str:
+    if href and href.startswith("/"):
+        from urllib.parse import urljoin
+        return urljoin(base_url, href)
+    return href
+
+
+AMAZON_CARD_SELECTOR = "div.s-main-slot [data-component-type='s-search-result']"
+AMAZON_PRICE_SELECTORS = [
+    "#corePrice_feature_div span.a-offscreen",
+    "#apex_desktop span.a-offscreen",
+    "span.priceToPay span.a-offscreen",
+    "span.a-price > span.a-offscreen",
+    ".reinventPricePriceToPayMargin priceToPay span.a-offscreen",
+]
+
+
+def amazon_price_record(price_text: str, currency_hint: str = "INR") -> Dict[str, Optional[Any]]:
+    curr = _detect_currency(price_text, currency_hint)
+    val = _parse_price(price_text)
+    return {"price": price_text or (f"{curr} {val:.0f}" if val is not None else None), "price_value": val, "currency": curr}
+
+
+def amazon_laptops_top_k(records: List[Dict[str, Any]], base_url: str, k: int = 5, max_price: Optional[float] = None, currency: str = "INR") -> List[Dict[str, Any]]:
+    """Laptop results from Amazon card records (AMAZON_CARDS_JS shape), cheapest first."""
+    results: List[Dict[str, Any]] = []
+    # Blind rule: skip the first 3 cards on Amazon listings (ads/labels)
+    start_index = 3 if len(records) > 3 else 0
+
+    for rec in records[start_index:]:
+        # Skip sponsored placements explicitly
+        if rec.get("sponsored"):
+            continue
+        name = (rec.get("title") or "").strip()
+        if not name:
+            continue
+        # Only consider laptop-like items
+        lower = name.lower()
+        if not ("laptop" in lower or "notebook" in lower or "macbook" in lower):
+            continue
+        price_text = _card_price_text(rec)
+        price_val = _parse_price(price_text)
+        # Ensure it's a product link (exclude navigational/browse/label links)
+        href = _absolute_href(base_url, rec.get("href") or "")
+        if href and ("/dp/" not in href and "/gp/" not in href):
+            continue
+
+        # Skip out-of-budget items if max_price provided and price known
+        if max_price is not None and price_val is not None and price_val > max_price:
+            continue
+
+        results.append({
+            "name": name,
+            "price": price_text or (f"{currency} {price_val:.0f}" if price_val is not None else None),
+            "price_value": price_val,
+            "currency": currency,
+            "url": href,
+        })
+
+    # Sort by price when available, otherwise keep order
+    results_sorted = sorted(results, key=lambda x: (x.get("price_value") is None, x.get("price_value") or 0))
+    return results_sorted[:k]
+
+
+def amazon_search_results_top_k(records: List[Dict[str, Any]], base_url: str, k: int = 5, max_price: Optional[float] = None,
+                                currency_hint: str = "INR", only_with_price: bool = False) -> List[Dict[str, Any]]:
+    """Generic Amazon search results extractor.
+    - Skips first 3 cards (ads/labels), and sponsored results.
+    - Requires product-like links (/dp/ or /gp/).
+    - Returns list of {name, price, price_value, currency, url} sorted by price when available.
+    """
+    start_index = 3 if len(records) > 3 else 0
+
+    def collect(cards: List[Dict[str, Any]], product_links_only: bool) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for rec in cards:
+            # Skip sponsored
+            if rec.get("sponsored"):
+                continue
+            name = (rec.get("title") or "").strip()
+            if not name:
+                continue
+            price_text = _card_price_text(rec)
+            price_val = _parse_price(price_text)
+            curr = _detect_currency(price_text, currency_hint)
+            href = _absolute_href(base_url, rec.get("href") or "")
+            if product_links_only and href and ("/dp/" not in href and "/gp/" not in href):
+                continue
+            if only_with_price and price_val is None:
+                continue
+            if max_price is not None and price_val is not None and price_val > max_price:
+                continue
+            out.append({
+                "name": name,
+                "price": price_text or (f"{curr} {price_val:.0f}" if price_val is not None else None),
+                "price_value": price_val,
+                "currency": curr,
+                "url": href,
+            })
+        return out
+
+    results = collect(records[start_index:], product_links_only=True)
+    # If nothing found, relax constraints: start from first card and allow non-product links
+    if not results:
+        results = collect(records, product_links_only=False)
+    results_sorted = sorted(results, key=lambda x: (x.get("price_value") is None, x.get("price_value") or 0))
+    return results_sorted[:k]
+
+
+def amazon_matching_records(records: List[Dict[str, Any]], query: str, skip_first: int = 0) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """(record, title) for non-sponsored Amazon cards whose title contains a token of query, in page order."""
+    tokens = [t for t in re.sub(r"[^a-z0-9+]+", " ", query.lower()).split() if t and t not in {"on", "in", "the", "for", "and", "with"}]
+    start = min(max(skip_first, 0), max(len(records) - 1, 0))
+    for rec in records[start:]:
+        # skip sponsored
+        if rec.get("sponsored"):
+            continue
+        name = (rec.get("title") or "").strip()
+        if name and any(tok in name.lower() for tok in tokens):
+            yield rec, name
+
+
+def top_k_with_prices(text: str, k: int = 5) -> List[Dict[str, Any]]:
+    """Heuristic laptop name/price pairs from page text (any site)."""
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    items: List[Tuple[str, Optional[str]]] = []
+    price_re = re.compile(r"(₹\s?\d[\d,]*|\$\s?\d[\d,]*|Rs\.?\s?\d[\d,]*)")
+    for i, l in enumerate(lines):
+        if re.search(r"laptop", l, re.IGNORECASE):
+            price = None
+            # search nearby lines for a price
+            for off in range(0, 3):
+                if price:
+                    break
+                for idx in (i+off, i-off):
+                    if 0 <= idx < len(lines):
+                        m = price_re.search(lines[idx])
+                        if m:
+                            price = m.group(1)
+                            break
+            items.append((l[:200], price))
+            if len(items) >= k * 2:  # gather more, dedup later
+                break
+    # dedup by name
+    seen = set()
+    result: List[Dict[str, Any]] = []
+    for name, price in items:
+        key = name.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append({"name": name, "price": price})
+        if len(result) >= k:
+            break
+    return result
+
+
+def guess_language(title: str, body: str, url: str) -> str:
+    """Programming language of a coding page from its title, body text and URL (simple heuristics)."""
+    text = f"{title.lower()}\n{body.lower()}"
+    url = url.lower()
+    checks = [
+        ("python", ["python", "print(", "def ", "pip "]),
+        ("javascript", ["javascript", "js", "console.log", "node.js", ".js"]),
+        ("java", ["java", "public static void main", ".java"]),
+        ("c++", ["c++", "cpp", "#include <iostream>", ".cpp"]),
+        ("c#", ["c#", ".cs", "using system;"]),
+        ("typescript", ["typescript", "ts", ".ts"]),
+        ("go", ["golang", "go ", "package main"]),
+        ("php", ["php", "<?php"]),
+        ("ruby", ["ruby", "puts "]),
+    ]
+    for lang, needles in checks:
+        for n in needles:
+            if n in text or n in url:
+                return lang
+    return "python"
+
+
+class CaptchaStats:
+    """Per-origin CAPTCHA counters plus a histogram of how long each wait took."""
+
+    # Upper bounds (seconds) of the wait-time histogram buckets; the last bucket is open-ended
+    BUCKETS = (1, 5, 15, 30, 60, 120, 180)
+
     def __init__(self):
+        self.origins: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, origin: str) -> Dict[str, Any]:
+        e = self.origins.get(origin)
+        if e is None:
+            e = self.origins[origin] = {
+                "detected": 0,
+                "solved": 0,
+                "timed_out": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0,
+                "histogram": {self._label(i): 0 for i in range(len(self.BUCKETS) + 1)},
+                "signals": {},
+                "last_url": None,
+            }
+        return e
+
+    def _label(self, i: int) -> str:
+        if i < len(self.BUCKETS):
+            return f"<{self.BUCKETS[i]}s"
+        return f">={self.BUCKETS[-1]}s"
+
+    def record_detect(self, url: str, signal: Optional[str]) -> None:
+        e = self._entry(origin_of(url))
+        e["detected"] += 1
+        e["last_url"] = url
+        if signal:
+            e["signals"][signal] = e["signals"].get(signal, 0) + 1
+
+    def record_wait(self, url: str, wait_ms: float, solved: bool) -> None:
+        e = self._entry(origin_of(url))
+        e["solved" if solved else "timed_out"] += 1
+        e["wait_ms_total"] += wait_ms
+        e["wait_ms_max"] = max(e["wait_ms_max"], wait_ms)
+        secs = wait_ms / 1000.0
+        i = next((i for i, b in enumerate(self.BUCKETS) if secs < b), len(self.BUCKETS))
+        e["histogram"][self._label(i)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return json.loads(json.dumps(self.origins))
+
+
+class BrowserSessionBase:
+    """
+    Page-independent state shared by BrowserSession (sync API) and
+    AsyncBrowserSession (core.async_browser): env configuration, CAPTCHA and
+    idle-time stats, and the learned site-profile bookkeeping.
+    """
+
+    def __init__(self, headless: Optional[bool] = None, profiles: Optional[SiteProfileStore] = None,
+                 block_profile: Optional[BlockProfile] = None):
+        # Headed by default so the user can watch (and solve CAPTCHAs); JARVIS_HEADLESS=1 hides the window
+        self.headless: bool = headless if headless is not None else os.getenv("JARVIS_HEADLESS", "0") in ("1", "true", "True")
+        self._profile: Optional[SiteProfile] = None
+        self._site_script_ready = False
+        # Learned per-origin profiles persisted across runs (JARVIS_SITE_PROFILES=0 disables)
+        self.profiles: Optional[SiteProfileStore] = profiles if profiles is not None else SiteProfileStore.from_env()
+        # Pull every Amazon result card in one evaluate instead of walking locators per card
+        self.amazon_batched: bool = os.getenv("JARVIS_AMAZON_BATCHED", "1") not in ("0", "false", "False")
+        # How long to wait for a human to clear a CAPTCHA before giving up
+        self.captcha_max_ms: int = int(os.getenv("JARVIS_CAPTCHA_MAX_MS", "180000"))
+        self.captcha = CaptchaStats()
+        # {"type": "wait"} waits until the DOM is quiet (capped at its duration) instead of sleeping it out;
+        # JARVIS_ADAPTIVE_WAIT=0 restores fixed sleeps
+        self.adaptive_wait: bool = os.getenv("JARVIS_ADAPTIVE_WAIT", "1") not in ("0", "false", "False")
+        self.dom_quiet_ms: int = int(os.getenv("JARVIS_DOM_QUIET_MS", "300"))
+        # Time spent in wait actions: last apply_script, running total, and waits that hit their timeout
+        self.idle = {"last_ms": 0.0, "total_ms": 0.0, "timeouts": 0}
+        self._wait_token = 0
+        self._nav_from = "about:blank"
+        # Images/media/fonts (and trackers) the context refuses to load; JARVIS_BLOCK_PROFILE=full loads everything
+        self.block_profile: BlockProfile = block_profile or BlockProfile.from_env()
+        self.network = NetworkStats(self.block_profile.name)
+        # Opt-in on-disk response cache (JARVIS_HTTP_CACHE), shared by every session on the same directory
+        self.http_cache: Optional[HttpCache] = HttpCache.from_env()
+        # Last summarize_page result; the page reports (by token) whether it still matches the DOM
+        self._summary: Optional[Dict[str, Any]] = None
+
+    def captcha_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-origin CAPTCHA counts, signals and wait-time histogram for this session."""
+        return self.captcha.snapshot()
+
+    def idle_stats(self) -> Dict[str, Any]:
+        """Milliseconds spent in wait actions (last script and total) and how many of them timed out."""
+        return dict(self.idle)
+
+    def network_stats(self) -> Dict[str, Any]:
+        """Requests blocked by the block profile (per reason), response bytes loaded and HTTP cache hit ratio."""
+        stats = self.network.snapshot()
+        if self.http_cache is not None:
+            stats["cache"] = self.http_cache.stats()
+        return stats
+
+    # ---------- page summary memo ----------
+    def _summary_opts(self, url: str, max_links: int, max_chars: int, max_headings: int, max_fields: int) -> Dict[str, Any]:
+        memo = self._summary
+        return {
+            "maxLinks": max_links,
+            "maxChars": max_chars,
+            "maxHeadings": max_headings,
+            "maxFields": max_fields,
+            "token": memo["token"] if memo is not None and memo.get("url") == url else 0,
+        }
+
+    def _summary_result(self, url: str, res: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if res and res.get("same") and self._summary is not None:
+            data = self._summary
+        elif res and res.get("token"):
+            data = self._summary = res
+        else:
+            self._summary = None
+            data = {"url": url, "title": "", "links": [], "headings": [], "fields": [], "body": ""}
+        return {k: v for k, v in data.items() if k != "token"}
+
+    # ---------- learned site profiles ----------
+    _RUN_TEXTS = ["Run", "Run Code", "Execute", "Compile", "▶", "Play", "Submit", "Start"]
+    _RUN_SELECTORS = ["button.run", "#run", ".run-btn", "[aria-label='Run']"]
+    _OUTPUT_SELECTORS = [
+        ".output", "#output", "pre.output", "pre", ".terminal", ".console",
+        "#console", ".result", "#result", "textarea[readonly]", ".output-window"
+    ]
+
+    def _load_site_profile(self, p) -> None:
+        if self.profiles is None:
+            return
+        origin = origin_of(p.url)
+        if self._profile is not None and self._profile.origin == origin:
+            return
+        self._profile = self.profiles.get(origin)
+
+    def _profile_win(self, p, key: str, value: str) -> None:
+        if self._profile is None or self._profile.origin != origin_of(p.url):
+            if self.profiles is None:
+                return
+            self._profile = self.profiles.get(origin_of(p.url)) or SiteProfile(origin=origin_of(p.url))
+        if self.profiles is not None:
+            self.profiles.record_win(self._profile, key, value)
+        else:
+            setattr(self._profile, key, value)
+
+    def _profile_miss(self, key: str) -> None:
+        if self.profiles is not None and self._profile is not None:
+            self.profiles.record_miss(self._profile, key)
+
+    def _output_watch_selectors(self) -> List[str]:
+        """Where run output is expected: the learned selector first, then the generic ones."""
+        prof = self._profile
+        out = [prof.output_selector] if prof and prof.output_selector else []
+        out += [sel for sel in (list(prof.output_selectors) if prof else []) + self._OUTPUT_SELECTORS if sel not in out]
+        return out
+
+
+class BrowserSession(BrowserSessionBase):
+    def __init__(self, headless: Optional[bool] = None, profiles: Optional[SiteProfileStore] = None,
+                 block_profile: Optional[BlockProfile] = None):
+        super().__init__(headless, profiles, block_profile)
         self._p = None
         self._browser: Optional[Browser] = None
         self.page: Optional[Page] = None
-        self._profile: Optional[SiteProfile] = None
 
     def ensure_open(self):
         if self._p is None:
             self._p = sync_playwright().start()
         if self._browser is None:
-            self._browser = self._p.chromium.launch(headless=False)
+            self._browser = self._p.chromium.launch(headless=self.headless)
         if self.page is None:
             self.page = self._browser.new_page()
+            self._site_script_ready = False
+            try:
+                install_blocking(self.page.context, self.block_profile, self.network, self.http_cache)
+            except Exception:
+                pass
+            try:
+                # Site inference script lives on the context, so learn_site only sends a short call
+                self.page.context.add_init_script(script=SITE_PROFILE_INIT_JS)
+                self._site_script_ready = True
+            except Exception:
+                pass
         return self.page
 
     def close(self):
@@ -58,41 +461,57 @@ class BrowserSession:
         except Exception:
             pass
 
+    def _captcha_signal(self, page: Page) -> Optional[str]:
+        """The first CAPTCHA selector/text signal on the page (one evaluate), or None."""
+        try:
+            return page.evaluate(CAPTCHA_CHECK_JS)
+        except Exception:
+            return None
+
     def _captcha_present(self, page: Page) -> bool:
+        return bool(self._captcha_signal(page))
+
+    def _wait_out_captcha(self, page: Page, max_ms: Optional[int] = None) -> bool:
+        """
+        Block until the challenge disappears or max_ms passes. The page watches
+        itself with a MutationObserver; when solving navigates away the predicate
+        is re-installed on the new document, so a redirect after solving counts.
+        """
+        max_ms = self.captcha_max_ms if max_ms is None else max_ms
+        url = page.url
+        t0 = time.perf_counter()
+        solved = False
         try:
-            text_signals = [
-                r"text=/I'm not a robot/i",
-                r"text=/unusual traffic/i",
-                r"text=/verify you are human/i",
-                r"text=/complete a quick verification/i",
-                r"text=/Press & hold/i",
-            ]
-            for t in text_signals:
-                if page.locator(t).count() > 0:
-                    return True
-            sels = [
-                "iframe[title*='reCAPTCHA']",
-                "iframe[src*='recaptcha']",
-                "iframe[src*='challenges']",
-                "#g-recaptcha",
-                ".hcaptcha-box",
-            ]
-            for s in sels:
-                if page.locator(s).count() > 0:
-                    return True
+            page.wait_for_function(CAPTCHA_GONE_JS, timeout=max_ms, polling=250)
+            solved = True
+        except PlaywrightTimeoutError:
+            solved = False
         except Exception:
-            pass
-        return False
+            # Page/context went away mid-wait: trust a final check
+            solved = not self._captcha_present(page)
+        self.captcha.record_wait(url, (time.perf_counter() - t0) * 1000.0, solved)
+        return solved
+
+    # ---------- waits ----------
+    def _wait_dom_quiet(self, page: Page, timeout_ms: int, quiet_ms: Optional[int] = None) -> None:
+        """Return once no DOM mutation happened for quiet_ms, or after timeout_ms."""
+        quiet = self.dom_quiet_ms if quiet_ms is None else quiet_ms
+        if timeout_ms <= quiet:
+            page.wait_for_timeout(timeout_ms)
+            return
+        self._wait_token += 1
+        page.wait_for_function(DOM_QUIET_JS, arg={"quietMs": quiet, "token": self._wait_token}, timeout=timeout_ms, polling=50)
 
-    def _wait_out_captcha(self, page: Page, max_ms=180000) -> bool:
-        waited = 0
-        step = 1000
-        did_wait = False
-        while self._captcha_present(page) and waited < max_ms:
-            did_wait = True
-            page.wait_for_timeout(step)
-            waited += step
-        return did_wait and not self._captcha_present(page)
+    def _wait_for_navigation(self, page: Page, args: Dict[str, Any]) -> None:
+        nav_from = self._nav_from
+        state, url, timeout_ms = args["state"], args["url"], args["timeout"]
+        if url:
+            page.wait_for_url(url, wait_until=state, timeout=timeout_ms)
+        elif page.url == nav_from:
+            # The triggering action (press/click) may not have started the navigation yet
+            page.wait_for_url(lambda u: u != nav_from, wait_until=state, timeout=timeout_ms)
+        else:
+            page.wait_for_load_state(state, timeout=timeout_ms)
 
     def _smart_fill(self, page: Page, selector: Optional[str], text: str) -> bool:
         candidates = [selector] if selector else []
@@ -142,112 +561,33 @@ class BrowserSession:
                 continue
         return False
 
+    def _eval_setter(self, page: Page, js: str, text: str) -> bool:
+        try:
+            return bool(page.evaluate(js, text))
+        except Exception:
+            return False
+
     def _set_textarea_value(self, page: Page, text: str) -> bool:
         try:
-            # Prefer the largest textarea (by rows/cols/size)
-            textareas = page.locator('textarea')
-            if textareas.count() > 0:
+            if page.locator('textarea').count() > 0:
                 # Use first for simplicity; many editors have only one
-                return bool(page.eval_on_selector(
-                    'textarea',
-                    "(el, t) => { el.value = t; el.dispatchEvent(new Event('input', {bubbles:true})); return true; }",
-                    text,
-                ))
+                return bool(page.eval_on_selector('textarea', SET_TEXTAREA_JS, text))
         except Exception:
             pass
         return False
 
     def _set_monaco_value(self, page: Page, text: str) -> bool:
-        try:
-            return bool(page.evaluate("""
-                (t) => {
-                  if (window.monaco && monaco.editor) {
-                    const models = monaco.editor.getModels();
-                    if (models && models.length) { models[0].setValue(t); return true; }
-                  }
-                  // Some sites attach editor instance to window.editor
-                  if (window.editor && typeof window.editor.setValue === 'function') {
-                    window.editor.setValue(t); return true;
-                  }
-                  return false;
-                }
-            """, text))
-        except Exception:
-            return False
+        return self._eval_setter(page, SET_MONACO_JS, text)
 
     def _set_codemirror_value(self, page: Page, text: str) -> bool:
-        # CodeMirror 5
-        try:
-            ok = page.evaluate("""
-                (t) => {
-                  const cmEl = document.querySelector('.CodeMirror');
-                  if (cmEl && cmEl.CodeMirror) { cmEl.CodeMirror.setValue(t); return true; }
-                  return false;
-                }
-            """, text)
-            if ok:
-                return True
-        except Exception:
-            pass
-        # CodeMirror 6
-        try:
-            ok = page.evaluate("""
-                (t) => {
-                  const root = document.querySelector('.cm-editor');
-                  if (!root) return false;
-                  const view = root.cmView || root.view || root.__cmView || root.editorView || (root.cm && root.cm.view) || null;
-                  if (view && view.state) {
-                    view.dispatch({ changes: { from: 0, to: view.state.doc.length, insert: t } });
-                    return true;
-                  }
-                  // fallback to contenteditable area
-                  const editable = root.querySelector('.cm-content[contenteditable="true"]') || document.querySelector('.cm-content[contenteditable="true"]');
-                  if (editable) {
-                    editable.innerText = t;
-                    editable.dispatchEvent(new InputEvent('input', { bubbles: true }));
-                    return true;
-                  }
-                  return false;
-                }
-            """, text)
-            if ok:
-                return True
-        except Exception:
-            pass
-        return False
+        # CodeMirror 5, then CodeMirror 6
+        return self._eval_setter(page, SET_CM5_JS, text) or self._eval_setter(page, SET_CM6_JS, text)
 
     def _set_ace_value(self, page: Page, text: str) -> bool:
-        try:
-            ok = page.evaluate("""
-                (t) => {
-                  const aceEl = document.querySelector('.ace_editor');
-                  if (!aceEl) return false;
-                  const e = aceEl.env && aceEl.env.editor ? aceEl.env.editor : (window.ace && window.ace.edit ? window.ace.edit(aceEl) : null);
-                  if (e && e.session && typeof e.setValue === 'function') {
-                    e.setValue(t, -1);
-                    return true;
-                  }
-                  return false;
-                }
-            """, text)
-            return bool(ok)
-        except Exception:
-            return False
+        return self._eval_setter(page, SET_ACE_JS, text)
 
     def _set_contenteditable_value(self, page: Page, text: str) -> bool:
-        try:
-            ok = page.evaluate("""
-                (t) => {
-                  const el = document.querySelector('[contenteditable="true"]');
-                  if (!el) return false;
-                  el.innerText = t;
-                  el.dispatchEvent(new InputEvent('input', { bubbles: true }));
-                  return true;
-                }
-            """, text)
-            return bool(ok)
-        except Exception:
-            return False
+        return self._eval_setter(page, SET_CONTENTEDITABLE_JS, text)
 
     def clear_editor(self) -> bool:
         p = self.ensure_open()
@@ -359,241 +699,344 @@ class BrowserSession:
             return ""
 
     # ---------- public API ----------
-    def summarize_page(self, max_links: int = 30, max_chars: int = 3000) -> Dict[str, Any]:
+    def summarize_page(self, max_links: int = 30, max_chars: int = 3000, max_headings: int = 30, max_fields: int = 30) -> Dict[str, Any]:
+        """
+        {url, title, body, links, headings, fields} in one evaluate. Calling again
+        before the page navigates or its DOM changes returns the memoised summary
+        (the round trip only carries a token check).
+        """
         p = self.ensure_open()
-        url = p.url
-        title = p.title()
-        # Collect some clickable texts
-        links = []
         try:
-            for l in p.locator("a").all()[:max_links]:
-                try:
-                    t = l.inner_text().strip()
-                    href = l.get_attribute("href")
-                    if t or href:
-                        links.append({"text": t[:200], "href": href})
-                except Exception:
-                    continue
+            res = p.evaluate(SUMMARIZE_PAGE_JS, self._summary_opts(p.url, max_links, max_chars, max_headings, max_fields))
         except Exception:
-            pass
-        # Visible body text (truncate)
-        body_text = ""
+            res = None
+        return self._summary_result(p.url, res)
+
+    def apply_script(self, script: Union[str, Iterable[Dict[str, Any]]], lenient: bool = False) -> ScriptTrace:
+        """
+        Validate and compile script (a list, the planner's JSON text, or a generator
+        such as LLMProvider.plan_actions_stream) and run it action by action.
+        Returns a ScriptTrace with per-action timing, outcome and value (get_output,
+        extract_tables); str(trace) is the message for the user.
+        Pass lenient=True for LLM-written scripts: an invalid action is recorded as
+        'skipped' and the script carries on, instead of rejecting the whole script.
+        """
+        trace = ScriptTrace(started_at=time.time())
+        t0 = time.perf_counter()
+        self.idle["last_ms"] = 0.0
         try:
-            body_text = p.locator("body").inner_text()[:max_chars]
+            actions, trace.compiled_from_cache = compiler.compile(script, lenient)
+            p = self.ensure_open()
+            trace.message = self._execute(p, actions, trace)
+        except ScriptError as e:
+            trace.message = f"Invalid browser script: {e}"
+        except Exception as e:
+            trace.message = f"Error during browser automation: {e}"
+        trace.duration_ms = (time.perf_counter() - t0) * 1000.0
+        trace.idle_ms = self.idle["last_ms"]
+        return trace
+
+    def _execute(self, p: Page, actions: Iterable[Action], trace: ScriptTrace) -> str:
+        error_msg = None
+        last_text: Optional[str] = None
+        self._nav_from = p.url
+        for i, action in enumerate(actions):
+            if action.skip is not None:
+                now = time.time()
+                trace.results.append(ActionResult(index=i, type=action.type, outcome="skipped",
+                                                  started_at=now, ended_at=now, error=action.skip))
+                continue
+            handler = self._ACTION_HANDLERS[action.type]
+            is_wait = action.type in WAIT_ACTIONS
+            if not is_wait:
+                # URL before the action; wait_for_navigation compares against it
+                self._nav_from = p.url
+            res = ActionResult(index=i, type=action.type, started_at=time.time())
+            trace.results.append(res)
+            t0 = time.perf_counter()
+            try:
+                while True:
+                    res.attempts += 1
+                    try:
+                        res.value = handler(self, p, action.args)
+                        break
+                    except (SoftFailure, ScriptAborted):
+                        raise
+                    except PlaywrightTimeoutError:
+                        if is_wait or res.attempts > action.retries:
+                            raise
+                    except Exception:
+                        if res.attempts > action.retries:
+                            raise
+            except SoftFailure as e:
+                res.outcome, res.error = "soft_fail", str(e)
+                error_msg = error_msg or str(e)
+            except ScriptAborted as e:
+                res.outcome, res.error = "aborted", str(e)
+                return str(e)
+            except PlaywrightTimeoutError as e:
+                if not is_wait:
+                    res.outcome, res.error = "failed", str(e)
+                    raise
+                # A wait that runs out is not an error: the script carries on as after a plain sleep
+                res.outcome = "timeout"
+                self.idle["timeouts"] += 1
+            except Exception as e:
+                res.outcome, res.error = "failed", str(e)
+                raise
+            finally:
+                res.ended_at = time.time()
+                res.duration_ms = (time.perf_counter() - t0) * 1000.0
+                if is_wait:
+                    self.idle["last_ms"] += res.duration_ms
+                    self.idle["total_ms"] += res.duration_ms
+            if action.type == "get_output":
+                last_text = res.value
+        return error_msg or (last_text if (last_text is not None and last_text != "") else "I have completed the browsing task.")
+
+    # ---------- action handlers (dispatched by _ACTION_HANDLERS; args are validated by core.actions) ----------
+    def _act_goto(self, p: Page, args: Dict[str, Any]):
+        p.goto(args["url"], wait_until="domcontentloaded")
+        self._load_site_profile(p)
+        if "google." in p.url:
+            self._handle_google_consent(p)
+        signal = self._captcha_signal(p)
+        if signal:
+            self.captcha.record_detect(p.url, signal)
+            if not self._wait_out_captcha(p):
+                raise ScriptAborted("CAPTCHA detected. Please solve it in the browser and try again.")
+
+    def _act_click(self, p: Page, args: Dict[str, Any]):
+        sel = args["selector"]
+        p.locator(sel).first.wait_for(state="visible", timeout=5000)
+        p.click(sel)
+
+    def _act_click_text(self, p: Page, args: Dict[str, Any]):
+        p.get_by_text(args["text"], exact=False).first.click()
+
+    def _act_fill(self, p: Page, args: Dict[str, Any]):
+        self._smart_fill(p, args["selector"], args["text"])
+
+    def _act_type(self, p: Page, args: Dict[str, Any]):
+        p.keyboard.type(args["text"])
+
+    def _act_type_code(self, p: Page, args: Dict[str, Any]):
+        if not self.type_code(args["text"], delay_ms=args["delay"]):
+            raise SoftFailure("Couldn't type into the editor.")
+
+    def _act_clear_editor(self, p: Page, args: Dict[str, Any]):
+        if not self.clear_editor():
+            raise SoftFailure("Couldn't find an editor to clear on this page.")
+
+    def _act_set_code(self, p: Page, args: Dict[str, Any]):
+        if not self.set_code(args["text"]):
+            raise SoftFailure("Couldn't find an editor to set code on this page.")
+
+    def _act_press(self, p: Page, args: Dict[str, Any]):
+        key, sel = args["key"], args["selector"]
+        try:
+            if sel:
+                p.locator(sel).first.wait_for(state="visible", timeout=3000)
+                p.press(sel, key)
+            else:
+                p.keyboard.press(key)
         except Exception:
-            pass
-        return {"url": url, "title": title, "links": links, "body": body_text}
+            p.keyboard.press(key)
 
-    def apply_script(self, script: List[Dict[str, Any]]) -> str:
-        p = self.ensure_open()
+    def _act_wait(self, p: Page, args: Dict[str, Any]):
+        if self.adaptive_wait and not args["fixed"]:
+            self._wait_dom_quiet(p, args["duration"], args["quiet_ms"])
+        else:
+            p.wait_for_timeout(args["duration"])
+
+    def _act_wait_for_navigation(self, p: Page, args: Dict[str, Any]):
+        self._wait_for_navigation(p, args)
+
+    def _act_wait_for_selector(self, p: Page, args: Dict[str, Any]):
+        p.wait_for_selector(args["selector"], state=args["state"], timeout=args["timeout"])
+
+    def _act_wait_for_network_idle(self, p: Page, args: Dict[str, Any]):
+        p.wait_for_load_state("networkidle", timeout=args["timeout"])
+
+    def _act_wait_for_output(self, p: Page, args: Dict[str, Any]):
+        p.wait_for_function(OUTPUT_SETTLED_JS, arg={"quietMs": args["quiet_ms"]}, timeout=args["timeout"], polling=50)
+
+    def _act_wait_for_text(self, p: Page, args: Dict[str, Any]):
+        p.get_by_text(args["text"], exact=False).first.wait_for(state="visible", timeout=args["timeout"])
+
+    def _act_hover(self, p: Page, args: Dict[str, Any]):
+        p.locator(args["selector"]).first.hover()
+
+    def _act_scroll(self, p: Page, args: Dict[str, Any]):
+        p.mouse.wheel(0, args["deltaY"])
+
+    def _act_screenshot(self, p: Page, args: Dict[str, Any]):
+        p.screenshot(path=args["path"])
+
+    def _act_learn_site(self, p: Page, args: Dict[str, Any]):
+        self._profile = SiteProfile.infer(p, preloaded=self._site_script_ready)
+        if self.profiles is not None:
+            self.profiles.put(self._profile)
+
+    def _act_focus_editor(self, p: Page, args: Dict[str, Any]):
+        if not self._auto_find_and_focus_editor(p):
+            raise SoftFailure("Couldn't find an editor on this page.")
+
+    def _act_write_code(self, p: Page, args: Dict[str, Any]):
+        # Prefer manual typing effect if 'delay' provided, else try set_code first
+        text, delay = args["text"], args["delay"]
+        if delay > 0:
+            try:
+                self._auto_find_and_focus_editor(p)
+                if not self.type_code(text, delay_ms=delay):
+                    raise Exception("type failed")
+            except Exception:
+                # fallback to programmatic set
+                if not self.set_code(text):
+                    raise SoftFailure("Couldn't type or set code into the editor.")
+            return
+        try:
+            ok = self.set_code(text)
+        except Exception:
+            ok = False
+        if not ok:
+            try:
+                self._auto_find_and_focus_editor(p)
+                ok2 = self.type_code(text)
+            except Exception:
+                return
+            if not ok2:
+                raise SoftFailure("Couldn't type or set code into the editor.")
+
+    def _act_run_code(self, p: Page, args: Dict[str, Any]):
         try:
-            error_msg = None
-            last_text: Optional[str] = None
-            for action in script:
-                atype = action.get("type")
-                if atype == "goto":
-                    url = action.get("url") or "about:blank"
-                    p.goto(str(url), wait_until="domcontentloaded")
-                    if "google." in p.url:
-                        self._handle_google_consent(p)
-                    if self._captcha_present(p):
-                        solved = self._wait_out_captcha(p)
-                        if not solved:
-                            return "CAPTCHA detected. Please solve it in the browser and try again."
-                elif atype == "click":
-                    sel = action.get("selector")
-                    if sel:
-                        p.locator(sel).first.wait_for(state="visible", timeout=5000)
-                        p.click(sel)
-                elif atype == "click_text":
-                    text = action.get("text")
+            p.evaluate(OUTPUT_WATCH_JS, self._output_watch_selectors())
+        except Exception:
+            pass
+        self._click_run(p)
+
+    def _act_get_output(self, p: Page, args: Dict[str, Any]):
+        # Returned as the action's value and as the script's message
+        return self._read_output(p)
+
+    def _act_extract_tables(self, p: Page, args: Dict[str, Any]):
+        return self.extract_tables(args["max_tables"], args["max_rows"], args["max_cols"])
+
+    _ACTION_HANDLERS = {
+        "goto": _act_goto,
+        "click": _act_click,
+        "click_text": _act_click_text,
+        "fill": _act_fill,
+        "type": _act_type,
+        "type_code": _act_type_code,
+        "clear_editor": _act_clear_editor,
+        "set_code": _act_set_code,
+        "press": _act_press,
+        "wait": _act_wait,
+        "wait_for_navigation": _act_wait_for_navigation,
+        "wait_for_selector": _act_wait_for_selector,
+        "wait_for_network_idle": _act_wait_for_network_idle,
+        "wait_for_text": _act_wait_for_text,
+        "wait_for_output": _act_wait_for_output,
+        "hover": _act_hover,
+        "scroll": _act_scroll,
+        "screenshot": _act_screenshot,
+        "learn_site": _act_learn_site,
+        "focus_editor": _act_focus_editor,
+        "write_code": _act_write_code,
+        "run_code": _act_run_code,
+        "get_output": _act_get_output,
+        "extract_tables": _act_extract_tables,
+    }
+
+    def _click_run(self, p: Page) -> bool:
+        prof = self._profile
+        if prof:
+            # Known winners first; a winner that no longer matches counts as a miss
+            if prof.run_selector:
+                try:
+                    loc = p.locator(prof.run_selector).first
+                    if loc.count() > 0:
+                        loc.click()
+                        self._profile_win(p, "run_selector", prof.run_selector)
+                        return True
+                    self._profile_miss("run_selector")
+                except Exception:
+                    pass
+            if prof.run_text:
+                try:
+                    loc = p.get_by_text(prof.run_text, exact=False).first
+                    if loc.count() > 0:
+                        loc.click()
+                        self._profile_win(p, "run_text", prof.run_text)
+                        return True
+                    self._profile_miss("run_text")
+                except Exception:
+                    pass
+            for txt in prof.run_texts:
+                try:
+                    p.get_by_text(txt, exact=False).first.click()
+                    self._profile_win(p, "run_text", txt)
+                    return True
+                except Exception:
+                    continue
+        # Generic fallbacks
+        for txt in self._RUN_TEXTS:
+            try:
+                p.get_by_text(txt, exact=False).first.click()
+                self._profile_win(p, "run_text", txt)
+                return True
+            except Exception:
+                continue
+        for sel in self._RUN_SELECTORS:
+            try:
+                p.locator(sel).first.click()
+                self._profile_win(p, "run_selector", sel)
+                return True
+            except Exception:
+                continue
+        return False
+
+    def _read_output(self, p: Page) -> str:
+        prof = self._profile
+        if prof and prof.output_selector:
+            try:
+                loc = p.locator(prof.output_selector).first
+                if loc.count() > 0:
+                    text = loc.inner_text()
                     if text:
-                        p.get_by_text(text, exact=False).first.click()
-                elif atype == "fill":
-                    self._smart_fill(p, action.get("selector"), action.get("text", ""))
-                elif atype == "type":
-                    p.keyboard.type(action.get("text", ""))
-                elif atype == "type_code":
-                    ok = self.type_code(action.get("text", ""), delay_ms=int(action.get("delay", 0)))
-                    if not ok:
-                        error_msg = error_msg or "Couldn't type into the editor."
-                elif atype == "clear_editor":
-                    ok = self.clear_editor()
-                    if not ok:
-                        error_msg = error_msg or "Couldn't find an editor to clear on this page."
-                elif atype == "set_code":
-                    ok = self.set_code(action.get("text", ""))
-                    if not ok:
-                        error_msg = error_msg or "Couldn't find an editor to set code on this page."
-                elif atype == "press":
-                    key = action.get("key", "Enter")
-                    sel = action.get("selector")
-                    try:
-                        if sel:
-                            p.locator(sel).first.wait_for(state="visible", timeout=3000)
-                            p.press(sel, key)
-                        else:
-                            p.keyboard.press(key)
-                    except Exception:
-                        p.keyboard.press(key)
-                elif atype == "wait":
-                    p.wait_for_timeout(action.get("duration", 1000))
-                elif atype == "hover":
-                    sel = action.get("selector")
-                    if sel:
-                        p.locator(sel).first.hover()
-                elif atype == "scroll":
-                    p.mouse.wheel(0, action.get("deltaY", 800))
-                elif atype == "screenshot":
-                    p.screenshot(path=action.get("path", "screenshot.png"))
-                elif atype == "learn_site":
-                    self._profile = SiteProfile.infer(p)
-                elif atype == "focus_editor":
-                    ok = self._auto_find_and_focus_editor(p)
-                    if not ok:
-                        error_msg = error_msg or "Couldn't find an editor on this page."
-                elif atype == "write_code":
-                    # Prefer manual typing effect if 'delay' provided, else try set_code first
-                    text = action.get("text", "")
-                    delay = int(action.get("delay", 0))
-                    if delay > 0:
-                        try:
-                            self._auto_find_and_focus_editor(p)
-                            ok = self.type_code(text, delay_ms=delay)
-                            if not ok:
-                                raise Exception("type failed")
-                        except Exception:
-                            # fallback to programmatic set
-                            ok = self.set_code(text)
-                            if not ok:
-                                error_msg = error_msg or "Couldn't type or set code into the editor."
-                    else:
-                        ok = False
-                        try:
-                            ok = self.set_code(text)
-                        except Exception:
-                            ok = False
-                        if not ok:
-                            try:
-                                self._auto_find_and_focus_editor(p)
-                                ok2 = self.type_code(text)
-                                if not ok2:
-                                    error_msg = error_msg or "Couldn't type or set code into the editor."
-                            except Exception:
-                                pass
-                elif atype == "run_code":
-                    # Use learned profile if available
-                    used = False
-                    if self._profile:
-                        if self._profile.run_selector:
-                            try:
-                                p.locator(self._profile.run_selector).first.click()
-                                used = True
-                            except Exception:
-                                used = False
-                        if not used:
-                            for txt in self._profile.run_texts:
-                                try:
-                                    p.get_by_text(txt, exact=False).first.click()
-                                    used = True
-                                    break
-                                except Exception:
-                                    continue
-                    if not used:
-                        # Generic fallbacks
-                        for txt in ["Run", "Run Code", "Execute", "Compile", "▶", "Play", "Submit", "Start"]:
-                            try:
-                                p.get_by_text(txt, exact=False).first.click()
-                                used = True
-                                break
-                            except Exception:
-                                continue
-                        if not used:
-                            for sel in ["button.run", "#run", ".run-btn", "[aria-label='Run']"]:
-                                try:
-                                    p.locator(sel).first.click()
-                                    used = True
-                                    break
-                                except Exception:
-                                    continue
-                elif atype == "get_output":
-                    # Return output text via value field in result
-                    out_text = ""
-                    if self._profile:
-                        for sel in self._profile.output_selectors:
-                            try:
-                                if p.locator(sel).count() > 0:
-                                    out_text = p.locator(sel).first.inner_text()
-                                    break
-                            except Exception:
-                                continue
-                    if not out_text:
-                        for sel in [
-                            ".output", "#output", "pre.output", "pre", ".terminal", ".console",
-                            "#console", ".result", "#result", "textarea[readonly]", ".output-window"
-                        ]:
-                            try:
-                                if p.locator(sel).count() > 0:
-                                    out_text = p.locator(sel).first.inner_text()
-                                    break
-                            except Exception:
-                                continue
-                    action["value"] = out_text
-                    last_text = out_text
-                elif atype == "extract_tables":
-                    # Extract visible HTML tables into list of rows
-                    try:
-                        tables = p.locator('table')
-                        n = min(tables.count(), 10)
-                        extracted = []
-                        for i in range(n):
-                            try:
-                                table = tables.nth(i)
-                                rows = table.locator('tr')
-                                row_count = min(rows.count(), 200)
-                                for r in range(row_count):
-                                    cells = rows.nth(r).locator('th,td')
-                                    cols = min(cells.count(), 50)
-                                    extracted.append([cells.nth(c).inner_text() for c in range(cols)])
-                            except Exception:
-                                continue
-                        action["value"] = extracted
-                    except Exception:
-                        action["value"] = []
-            return error_msg or (last_text if (last_text is not None and last_text != "") else "I have completed the browsing task.")
-        except Exception as e:
-            return f"Error during browser automation: {e}"
+                        self._profile_win(p, "output_selector", prof.output_selector)
+                        return text
+                else:
+                    self._profile_miss("output_selector")
+            except Exception:
+                pass
+        candidates = list(prof.output_selectors) if prof else []
+        candidates += [sel for sel in self._OUTPUT_SELECTORS if sel not in candidates]
+        for sel in candidates:
+            try:
+                loc = p.locator(sel).first
+                if loc.count() > 0:
+                    text = loc.inner_text()
+                    if text:
+                        self._profile_win(p, "output_selector", sel)
+                        return text
+            except Exception:
+                continue
+        return ""
 
     # ---------- language heuristics ----------
     def detect_language(self) -> str:
         p = self.ensure_open()
         try:
-            title = (p.title() or "").lower()
+            title = p.title() or ""
         except Exception:
             title = ""
         try:
-            body = (p.locator('body').inner_text() or "").lower()
+            body = p.locator('body').inner_text() or ""
         except Exception:
             body = ""
-        text = f"{title}\n{body}"
-        url = (p.url or "").lower()
-        # simple heuristics
-        checks = [
-            ("python", ["python", "print(", "def ", "pip "]),
-            ("javascript", ["javascript", "js", "console.log", "node.js", ".js"]),
-            ("java", ["java", "public static void main", ".java"]),
-            ("c++", ["c++", "cpp", "#include <iostream>", ".cpp"]),
-            ("c#", ["c#", ".cs", "using system;"]),
-            ("typescript", ["typescript", "ts", ".ts"]),
-            ("go", ["golang", "go ", "package main"]),
-            ("php", ["php", "<?php"]),
-            ("ruby", ["ruby", "puts "]),
-        ]
-        for lang, needles in checks:
-            for n in needles:
-                if n in text or n in url:
-                    return lang
-        return "python"
+        return guess_language(title, body, p.url or "")
 
     def extract_text(self) -> str:
         p = self.ensure_open()
@@ -603,288 +1046,63 @@ class BrowserSession:
             return ""
 
     def extract_top_k_with_prices(self, k: int = 5) -> List[Dict[str, Any]]:
-        text = self.extract_text()
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        items: List[Tuple[str, Optional[str]]] = []
-        price_re = re.compile(r"(₹\s?\d[\d,]*|\$\s?\d[\d,]*|Rs\.?\s?\d[\d,]*)")
-        for i, l in enumerate(lines):
-            if re.search(r"laptop", l, re.IGNORECASE):
-                price = None
-                # search nearby lines for a price
-                for off in range(0, 3):
-                    if price:
-                        break
-                    for idx in (i+off, i-off):
-                        if 0 <= idx < len(lines):
-                            m = price_re.search(lines[idx])
-                            if m:
-                                price = m.group(1)
-                                break
-                items.append((l[:200], price))
-                if len(items) >= k * 2:  # gather more, dedup later
-                    break
-        # dedup by name
-        seen = set()
-        result: List[Dict[str, Any]] = []
-        for name, price in items:
-            key = name.lower()
-            if key in seen:
-                continue
-            seen.add(key)
-            result.append({"name": name, "price": price})
-            if len(result) >= k:
-                break
-        return result
+        return top_k_with_prices(self.extract_text(), k)
 
-    def extract_amazon_laptops_top_k(self, k: int = 5, max_price: Optional[float] = None, currency: str = "INR") -> List[Dict[str, Any]]:
-        p = self.ensure_open()
-        try:
-            cards = p.locator("div.s-main-slot [data-component-type='s-search-result']")
-            count = min(cards.count(), 60)
-            results: List[Dict[str, Any]] = []
-            # Blind rule: skip the first 3 cards on Amazon listings (ads/labels)
-            start_index = 3 if count > 3 else 0
-
-            def parse_price(text: str) -> Optional[float]:
-                if not text:
-                    return None
-                s = text
-                s = s.replace("₹", "").replace("Rs.", "").replace("$", "")
-                s = s.replace(",", "").strip()
-                try:
-                    return float(s)
-                except Exception:
-                    # Try to extract digits only
-                    import re as _re
-                    m = _re.search(r"\d+[\d,]*", text)
-                    if m:
-                        try:
-                            return float(m.group(0).replace(",", ""))
-                        except Exception:
-                            return None
-                    return None
+    # ---------- Amazon listing extraction ----------
+    def _amazon_card_records(self, page: Page, limit: int = 60) -> List[Dict[str, Any]]:
+        """Return plain records for the search result cards on the current listing.
+        Uses a single in-page evaluate when `amazon_batched` is set, else the per-card locator walk.
+        """
+        if self.amazon_batched:
+            try:
+                return page.evaluate(AMAZON_CARDS_JS, limit) or []
+            except Exception:
+                pass
+        return self._amazon_card_records_locator(page, limit)
 
-            for i in range(start_index, count):
+    def _amazon_card_records_locator(self, page: Page, limit: int = 60) -> List[Dict[str, Any]]:
+        """Legacy per-card locator walk; several round trips per card. Same record shape as AMAZON_CARDS_JS."""
+        records: List[Dict[str, Any]] = []
+        cards = page.locator(AMAZON_CARD_SELECTOR)
+        count = min(cards.count(), limit)
+        for i in range(count):
+            rec: Dict[str, Any] = {"index": i, "title": None, "price_offscreen": None, "price_whole": None,
+                                   "price_fraction": None, "sponsored": False, "href": None}
+            try:
+                item = cards.nth(i)
                 try:
-                    item = cards.nth(i)
-                    # Skip sponsored placements explicitly
-                    try:
-                        if item.locator("text=Sponsored").count() > 0 or item.locator(".s-sponsored-label-text").count() > 0:
-                            continue
-                    except Exception:
-                        pass
-                    title_loc = item.locator("h2 a span, span.a-size-medium.a-color-base.a-text-normal")
-                    if title_loc.count() == 0:
-                        continue
-                    name = title_loc.first.inner_text().strip()
-                    if not name:
-                        continue
-                    # Only consider laptop-like items
-                    lower = name.lower()
-                    if not ("laptop" in lower or "notebook" in lower or "macbook" in lower):
-                        continue
-                    price_text = ""
-                    try:
-                        if item.locator("span.a-price > span.a-offscreen").count() > 0:
-                            price_text = item.locator("span.a-price > span.a-offscreen").first.inner_text().strip()
-                        elif item.locator("span.a-price-whole").count() > 0:
-                            whole = item.locator("span.a-price-whole").first.inner_text().strip()
-                            frac = item.locator("span.a-price-fraction").first.inner_text().strip() if item.locator("span.a-price-fraction").count() > 0 else "00"
-                            price_text = f"{whole}.{frac}"
-                    except Exception:
-                        price_text = ""
-                    price_val = parse_price(price_text)
-                    href = ""
-                    try:
-                        link = item.locator("h2 a").first
-                        href = link.get_attribute("href") or ""
-                        if href and href.startswith("/"):
-                            # Build absolute URL using current origin
-                            # Attempt to keep the same domain
-                            from urllib.parse import urljoin
-                            href = urljoin(p.url, href)
-                        # Ensure it's a product link (exclude navigational/browse/label links)
-                        if href and ("/dp/" not in href and "/gp/" not in href):
-                            continue
-                    except Exception:
-                        href = ""
-
-                    # Skip out-of-budget items if max_price provided and price known
-                    if max_price is not None and price_val is not None and price_val > max_price:
-                        continue
-
-                    results.append({
-                        "name": name,
-                        "price": price_text or (f"{currency} {price_val:.0f}" if price_val is not None else None),
-                        "price_value": price_val,
-                        "currency": currency,
-                        "url": href,
-                    })
+                    rec["sponsored"] = item.locator("text=Sponsored").count() > 0 or item.locator(".s-sponsored-label-text").count() > 0
                 except Exception:
-                    continue
+                    pass
+                title_loc = item.locator("h2 a span, span.a-size-medium.a-color-base.a-text-normal")
+                if title_loc.count() > 0:
+                    rec["title"] = title_loc.first.inner_text().strip()
+                if item.locator("span.a-price > span.a-offscreen").count() > 0:
+                    rec["price_offscreen"] = item.locator("span.a-price > span.a-offscreen").first.inner_text().strip()
+                if item.locator("span.a-price-whole").count() > 0:
+                    rec["price_whole"] = item.locator("span.a-price-whole").first.inner_text().strip()
+                if item.locator("span.a-price-fraction").count() > 0:
+                    rec["price_fraction"] = item.locator("span.a-price-fraction").first.inner_text().strip()
+                link = item.locator("h2 a")
+                if link.count() > 0:
+                    rec["href"] = link.first.get_attribute("href") or ""
+            except Exception:
+                pass
+            records.append(rec)
+        return records
 
-            # Sort by price when available, otherwise keep order
-            results_sorted = sorted(results, key=lambda x: (x.get("price_value") is None, x.get("price_value") or 0))
-            return results_sorted[:k]
+    def extract_amazon_laptops_top_k(self, k: int = 5, max_price: Optional[float] = None, currency: str = "INR") -> List[Dict[str, Any]]:
+        p = self.ensure_open()
+        try:
+            return amazon_laptops_top_k(self._amazon_card_records(p, 60), p.url, k, max_price, currency)
         except Exception:
             return []
 
     def extract_amazon_search_results_top_k(self, k: int = 5, max_price: Optional[float] = None, currency_hint: str = "INR", only_with_price: bool = False) -> List[Dict[str, Any]]:
-        """Generic Amazon search results extractor.
-        - Skips first 3 cards (ads/labels), and sponsored results.
-        - Requires product-like links (/dp/ or /gp/).
-        - Returns list of {name, price, price_value, currency, url} sorted by price when available.
-        """
+        """Generic Amazon search results extractor; see amazon_search_results_top_k."""
         p = self.ensure_open()
         try:
-            cards = p.locator("div.s-main-slot [data-component-type='s-search-result']")
-            count = min(cards.count(), 60)
-            results: List[Dict[str, Any]] = []
-            start_index = 3 if count > 3 else 0
-
-            def parse_price(text: str) -> Optional[float]:
-                if not text:
-                    return None
-                s = text
-                for sym in ["₹", "Rs.", "$", "£", "€"]:
-                    s = s.replace(sym, "")
-                s = s.replace(",", "").strip()
-                try:
-                    return float(s)
-                except Exception:
-                    import re as _re
-                    m = _re.search(r"\d+[\d,]*", text)
-                    if m:
-                        try:
-                            return float(m.group(0).replace(",", ""))
-                        except Exception:
-                            return None
-                    return None
-
-            def detect_currency(text: str, fallback: str) -> str:
-                if not text:
-                    return fallback
-                if "₹" in text or "Rs" in text:
-                    return "INR"
-                if "$" in text:
-                    return "USD"
-                if "£" in text:
-                    return "GBP"
-                if "€" in text:
-                    return "EUR"
-                return fallback
-
-            for i in range(start_index, count):
-                try:
-                    item = cards.nth(i)
-                    # Skip sponsored
-                    try:
-                        if item.locator("text=Sponsored").count() > 0 or item.locator(".s-sponsored-label-text").count() > 0:
-                            continue
-                    except Exception:
-                        pass
-
-                    title_loc = item.locator("h2 a span, span.a-size-medium.a-color-base.a-text-normal")
-                    if title_loc.count() == 0:
-                        continue
-                    name = title_loc.first.inner_text().strip()
-                    if not name:
-                        continue
-
-                    # Extract price
-                    price_text = ""
-                    try:
-                        if item.locator("span.a-price > span.a-offscreen").count() > 0:
-                            price_text = item.locator("span.a-price > span.a-offscreen").first.inner_text().strip()
-                        elif item.locator("span.a-price-whole").count() > 0:
-                            whole = item.locator("span.a-price-whole").first.inner_text().strip()
-                            frac = item.locator("span.a-price-fraction").first.inner_text().strip() if item.locator("span.a-price-fraction").count() > 0 else "00"
-                            price_text = f"{whole}.{frac}"
-                    except Exception:
-                        price_text = ""
-                    price_val = parse_price(price_text)
-                    curr = detect_currency(price_text, currency_hint)
-
-                    href = ""
-                    try:
-                        link = item.locator("h2 a").first
-                        href = link.get_attribute("href") or ""
-                        if href and href.startswith("/"):
-                            from urllib.parse import urljoin
-                            href = urljoin(p.url, href)
-                        if href and ("/dp/" not in href and "/gp/" not in href):
-                            continue
-                    except Exception:
-                        href = ""
-
-                    if only_with_price and price_val is None:
-                        continue
-                    if max_price is not None and price_val is not None and price_val > max_price:
-                        continue
-
-                    results.append({
-                        "name": name,
-                        "price": price_text or (f"{curr} {price_val:.0f}" if price_val is not None else None),
-                        "price_value": price_val,
-                        "currency": curr,
-                        "url": href,
-                    })
-                except Exception:
-                    continue
-
-            # If nothing found, relax constraints: start from first card and allow non-product links
-            if not results:
-                for i in range(0, count):
-                    try:
-                        item = cards.nth(i)
-                        # Skip sponsored
-                        try:
-                            if item.locator("text=Sponsored").count() > 0 or item.locator(".s-sponsored-label-text").count() > 0:
-                                continue
-                        except Exception:
-                            pass
-                        title_loc = item.locator("h2 a span, span.a-size-medium.a-color-base.a-text-normal")
-                        if title_loc.count() == 0:
-                            continue
-                        name = title_loc.first.inner_text().strip()
-                        if not name:
-                            continue
-                        price_text = ""
-                        try:
-                            if item.locator("span.a-price > span.a-offscreen").count() > 0:
-                                price_text = item.locator("span.a-price > span.a-offscreen").first.inner_text().strip()
-                            elif item.locator("span.a-price-whole").count() > 0:
-                                whole = item.locator("span.a-price-whole").first.inner_text().strip()
-                                frac = item.locator("span.a-price-fraction").first.inner_text().strip() if item.locator("span.a-price-fraction").count() > 0 else "00"
-                                price_text = f"{whole}.{frac}"
-                        except Exception:
-                            price_text = ""
-                        price_val = parse_price(price_text)
-                        curr = detect_currency(price_text, currency_hint)
-                        href = ""
-                        try:
-                            link = item.locator("h2 a").first
-                            href = link.get_attribute("href") or ""
-                            if href and href.startswith("/"):
-                                from urllib.parse import urljoin
-                                href = urljoin(p.url, href)
-                        except Exception:
-                            href = ""
-                        if only_with_price and price_val is None:
-                            continue
-                        if max_price is not None and price_val is not None and price_val > max_price:
-                            continue
-                        results.append({
-                            "name": name,
-                            "price": price_text or (f"{curr} {price_val:.0f}" if price_val is not None else None),
-                            "price_value": price_val,
-                            "currency": curr,
-                            "url": href,
-                        })
-                    except Exception:
-                        continue
-            results_sorted = sorted(results, key=lambda x: (x.get("price_value") is None, x.get("price_value") or 0))
-            return results_sorted[:k]
+            return amazon_search_results_top_k(self._amazon_card_records(p, 60), p.url, k, max_price, currency_hint, only_with_price)
         except Exception:
             return []
 
@@ -893,40 +1111,17 @@ class BrowserSession:
         Returns {name, url} if clicked, else None.
         """
         p = self.ensure_open()
-        import re as _re
-        tokens = [t for t in _re.sub(r"[^a-z0-9+]+", " ", query.lower()).split() if t and t not in {"on", "in", "the", "for", "and", "with"}]
         try:
-            cards = p.locator("div.s-main-slot [data-component-type='s-search-result']")
-            count = cards.count()
-            start = min(max(skip_first, 0), max(count - 1, 0))
-            for i in range(start, count):
-                try:
-                    item = cards.nth(i)
-                    # skip sponsored
-                    try:
-                        if item.locator("text=Sponsored").count() > 0 or item.locator(".s-sponsored-label-text").count() > 0:
-                            continue
-                    except Exception:
-                        pass
-                    title_loc = item.locator("h2 a span, span.a-size-medium.a-color-base.a-text-normal")
-                    if title_loc.count() == 0:
-                        continue
-                    name = title_loc.first.inner_text().strip()
-                    if not name:
-                        continue
-                    low = name.lower()
-                    if any(tok in low for tok in tokens):
-                        link = item.locator("h2 a").first
-                        href = link.get_attribute("href") or ""
-                        if href and href.startswith("/"):
-                            from urllib.parse import urljoin
-                            href = urljoin(p.url, href)
-                        link.click()
-                        return {"name": name, "url": href}
-                except Exception:
-                    continue
+            records = self._amazon_card_records(p, 10_000)
         except Exception:
             return None
+        for rec, name in amazon_matching_records(records, query, skip_first):
+            try:
+                cards = p.locator(AMAZON_CARD_SELECTOR)
+                cards.nth(rec["index"]).locator("h2 a").first.click()
+                return {"name": name, "url": _absolute_href(p.url, rec.get("href") or "")}
+            except Exception:
+                continue
         return None
 
     def extract_amazon_product_price(self, currency_hint: str = "INR") -> Dict[str, Optional[Any]]:
@@ -934,46 +1129,9 @@ class BrowserSession:
         Returns { price, price_value, currency } or empty values when not found.
         """
         p = self.ensure_open()
-        def detect_currency(text: str, fallback: str) -> str:
-            if not text:
-                return fallback
-            if "₹" in text or "Rs" in text:
-                return "INR"
-            if "$" in text:
-                return "USD"
-            if "£" in text:
-                return "GBP"
-            if "€" in text:
-                return "EUR"
-            return fallback
-        def parse_price(text: str) -> Optional[float]:
-            if not text:
-                return None
-            s = text
-            for sym in ["₹", "Rs.", "$", "£", "€"]:
-                s = s.replace(sym, "")
-            s = s.replace(",", "").strip()
-            try:
-                return float(s)
-            except Exception:
-                import re as _re
-                m = _re.search(r"\d+[\d,]*", text)
-                if m:
-                    try:
-                        return float(m.group(0).replace(",", ""))
-                    except Exception:
-                        return None
-                return None
         try:
-            sels = [
-                "#corePrice_feature_div span.a-offscreen",
-                "#apex_desktop span.a-offscreen",
-                "span.priceToPay span.a-offscreen",
-                "span.a-price > span.a-offscreen",
-                ".reinventPricePriceToPayMargin priceToPay span.a-offscreen",
-            ]
             price_text = ""
-            for sel in sels:
+            for sel in AMAZON_PRICE_SELECTORS:
                 try:
                     if p.locator(sel).count() > 0:
                         price_text = p.locator(sel).first.inner_text().strip()
@@ -981,73 +1139,166 @@ class BrowserSession:
                             break
                 except Exception:
                     continue
-            curr = detect_currency(price_text, currency_hint)
-            val = parse_price(price_text)
-            return {"price": price_text or (f"{curr} {val:.0f}" if val is not None else None), "price_value": val, "currency": curr}
+            return amazon_price_record(price_text, currency_hint)
         except Exception:
             return {"price": None, "price_value": None, "currency": currency_hint}
 
-        # ---------- table extraction ----------
-        def extract_tables(self, max_tables: int = 10, max_rows: int = 200, max_cols: int = 50) -> List[List[List[str]]]:
-            """
-            Extract visible HTML tables as a list of tables, each table is a list of rows (list of cell strings).
-            Limits to max_tables tables, max_rows rows per table, and max_cols columns per row.
-            """
-            p = self.ensure_open()
-            try:
-                tables = p.locator('table')
-                n = min(tables.count(), max_tables)
-                all_tables: List[List[List[str]]] = []
-                for i in range(n):
-                    try:
-                        table = tables.nth(i)
-                        rows = table.locator('tr')
-                        row_count = min(rows.count(), max_rows)
-                        rows_data: List[List[str]] = []
-                        for r in range(row_count):
-                            try:
-                                cells = rows.nth(r).locator('th,td')
-                                col_count = min(cells.count(), max_cols)
-                                row_vals: List[str] = []
-                                for c in range(col_count):
-                                    try:
-                                        row_vals.append(cells.nth(c).inner_text())
-                                    except Exception:
-                                        row_vals.append("")
-                                rows_data.append(row_vals)
-                            except Exception:
-                                continue
-                        if rows_data:
-                            all_tables.append(rows_data)
-                    except Exception:
-                        continue
-                return all_tables
-            except Exception:
-                return []
+    # ---------- table extraction ----------
+    def extract_tables(self, max_tables: int = 10, max_rows: int = 200, max_cols: int = 50) -> List[Dict[str, Any]]:
+        """
+        Extract HTML tables in a single in-page pass.
+        Each table is returned column-wise: {index, caption, headers, columns, offset, row_count, total_rows, truncated}.
+        colspan/rowspan cells are expanded; headers come from <thead> or leading all-<th> rows.
+        Limits to max_tables tables, max_rows data rows per table, and max_cols columns.
+        Use iter_table_chunks() to stream the rest of a truncated table.
+        """
+        p = self.ensure_open()
+        try:
+            return p.evaluate(TABLES_JS, {"maxTables": max_tables, "maxRows": max_rows, "maxCols": max_cols}) or []
+        except Exception:
+            return []
+
+    def extract_table_chunk(self, index: int, offset: int = 0, limit: int = 500, max_cols: int = 50) -> Optional[Dict[str, Any]]:
+        """Return rows [offset, offset+limit) of table `index` in the same columnar shape, or None."""
+        p = self.ensure_open()
+        try:
+            return p.evaluate(TABLES_JS, {"tableIndex": index, "offset": offset, "limit": limit, "maxCols": max_cols})
+        except Exception:
+            return None
+
+    def iter_table_chunks(self, index: int, chunk_rows: int = 500, offset: int = 0, max_cols: int = 50) -> Iterator[Dict[str, Any]]:
+        """Stream a large table in row chunks; one evaluate per chunk."""
+        while True:
+            chunk = self.extract_table_chunk(index, offset, chunk_rows, max_cols)
+            if not chunk or not chunk.get("row_count"):
+                return
+            yield chunk
+            offset += chunk["row_count"]
+            if not chunk.get("truncated"):
+                return
+
+class _PoolWorker:
+    """
+    One pool thread with its own BrowserSession. Sync Playwright objects are bound
+    to the thread that created them, so each worker starts its own Playwright
+    instance and browser instead of sharing pages of one browser.
+    """
+
+    def __init__(self, index: int, headless: bool, profiles: Optional[SiteProfileStore]):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"browser-pool-{index}")
+        self.session: Optional[BrowserSession] = None
+        self._headless = headless
+        self._profiles = profiles
+
+    def get(self) -> BrowserSession:
+        # Only called on this worker's thread
+        if self.session is None:
+            self.session = BrowserSession(headless=self._headless, profiles=self._profiles)
+        return self.session
+
+    def close(self):
+        try:
+            if self.session is not None:
+                self.executor.submit(self.session.close).result(timeout=30)
+        except Exception:
+            pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 
 class ThreadedBrowserSession:
     """
     A thin proxy that runs all BrowserSession operations on a dedicated worker thread.
     This avoids the "Playwright Sync API inside the asyncio loop" error by ensuring
     every Playwright call happens off the main thread (or any active asyncio loop).
+
+    Interactive commands always run on that one thread and page. map_script /
+    map_extract fan a batch of URLs out over a separate pool of pool_size worker
+    threads (JARVIS_BROWSER_POOL, default 4), each with its own headless browser
+    (JARVIS_POOL_HEADLESS=0 shows them), started on first use.
     """
 
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = None):
         self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser-worker")
         self._session: Optional[BrowserSession] = None
+        self.pool_size = max(1, pool_size if pool_size is not None else int(os.getenv("JARVIS_BROWSER_POOL", "4")))
+        self.pool_headless = os.getenv("JARVIS_POOL_HEADLESS", "1") not in ("0", "false", "False")
+        self._pool: List[_PoolWorker] = []
+        self._pool_lock = threading.Lock()
+        # One store for every session so pool workers share (and don't clobber) learned site profiles
+        self._profiles = SiteProfileStore.from_env()
 
     # --- internal helper ---
     def _run(self, method_name: str, *args, **kwargs):
         def task():
             if self._session is None:
                 # Create the concrete session inside the worker thread
-                self._session = BrowserSession()
+                self._session = BrowserSession(profiles=self._profiles)
             method = getattr(self._session, method_name)
             return method(*args, **kwargs)
 
         fut = self._executor.submit(task)
         return fut.result()
 
+    def _ensure_pool(self, n: int) -> List[_PoolWorker]:
+        with self._pool_lock:
+            while len(self._pool) < min(n, self.pool_size):
+                self._pool.append(_PoolWorker(len(self._pool), self.pool_headless, self._profiles))
+            return self._pool[:n]
+
+    def _map(self, urls: Sequence[str], job) -> List[Any]:
+        """Run job(session, url) for every url on the pool; workers pull the next url as they free up."""
+        urls = list(urls)
+        if not urls:
+            return []
+        jobs: "queue.SimpleQueue[Tuple[int, str]]" = queue.SimpleQueue()
+        for item in enumerate(urls):
+            jobs.put(item)
+        results: List[Any] = [None] * len(urls)
+
+        def drain(worker: _PoolWorker):
+            session = worker.get()
+            while True:
+                try:
+                    i, url = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                results[i] = job(session, url)
+
+        futures = [w.executor.submit(drain, w) for w in self._ensure_pool(len(urls))]
+        for f in futures:
+            f.result()
+        return results
+
+    # --- pooled fan-out ---
+    def map_script(self, urls: Sequence[str], script: Iterable[Dict[str, Any]] = ()) -> List[ScriptTrace]:
+        """Open every url on the pool and run script there; traces come back in input order."""
+        steps = list(script)
+        return self._map(urls, lambda s, url: s.apply_script([{"type": "goto", "url": url}, *steps]))
+
+    def map_extract(self, urls: Sequence[str], method: str, *args, script: Iterable[Dict[str, Any]] = (), **kwargs) -> List[Dict[str, Any]]:
+        """
+        Open every url on the pool, run script, then call the BrowserSession extractor
+        `method` (e.g. "extract_amazon_search_results_top_k") with args. Returns one
+        {"url", "value", "error", "trace"} dict per url, in input order.
+        """
+        if method.startswith("_") or not callable(getattr(BrowserSession, method, None)):
+            raise ValueError(f"Unknown BrowserSession method: {method}")
+        steps = list(script)
+
+        def job(session: BrowserSession, url: str) -> Dict[str, Any]:
+            trace = session.apply_script([{"type": "goto", "url": url}, *steps])
+            out: Dict[str, Any] = {"url": url, "value": None, "error": None, "trace": trace}
+            if not trace.results or trace.results[0].outcome != "ok":
+                out["error"] = trace.message
+                return out
+            try:
+                out["value"] = getattr(session, method)(*args, **kwargs)
+            except Exception as e:
+                out["error"] = str(e)
+            return out
+
+        return self._map(urls, job)
+
     # --- public API proxies ---
     def ensure_open(self):
         return self._run("ensure_open")
@@ -1061,16 +1312,30 @@ class ThreadedBrowserSession:
             self._executor.shutdown(wait=False, cancel_futures=True)
         except Exception:
             pass
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for w in pool:
+            w.close()
 
-    def apply_script(self, script: List[Dict[str, Any]]) -> str:
-        return self._run("apply_script", script)
+    def apply_script(self, script: Union[str, Iterable[Dict[str, Any]]], lenient: bool = False) -> ScriptTrace:
+        # A streaming plan is consumed on the browser thread, action by action
+        return self._run("apply_script", script, lenient)
 
-    def summarize_page(self, max_links: int = 30, max_chars: int = 3000) -> Dict[str, Any]:
-        return self._run("summarize_page", max_links, max_chars)
+    def summarize_page(self, max_links: int = 30, max_chars: int = 3000, max_headings: int = 30, max_fields: int = 30) -> Dict[str, Any]:
+        return self._run("summarize_page", max_links, max_chars, max_headings, max_fields)
 
     def extract_text(self) -> str:
         return self._run("extract_text")
 
+    def captcha_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._run("captcha_stats")
+
+    def idle_stats(self) -> Dict[str, Any]:
+        return self._run("idle_stats")
+
+    def network_stats(self) -> Dict[str, Any]:
+        return self._run("network_stats")
+
     def detect_language(self) -> str:
         return self._run("detect_language")
 
@@ -1080,8 +1345,22 @@ class ThreadedBrowserSession:
     def extract_amazon_laptops_top_k(self, k: int = 5, max_price: Optional[float] = None, currency: str = "INR") -> List[Dict[str, Any]]:
         return self._run("extract_amazon_laptops_top_k", k, max_price, currency)
 
-    def extract_tables(self, max_tables: int = 10, max_rows: int = 200, max_cols: int = 50) -> List[List[List[str]]]:
+    def extract_tables(self, max_tables: int = 10, max_rows: int = 200, max_cols: int = 50) -> List[Dict[str, Any]]:
         return self._run("extract_tables", max_tables, max_rows, max_cols)
 
+    def extract_table_chunk(self, index: int, offset: int = 0, limit: int = 500, max_cols: int = 50) -> Optional[Dict[str, Any]]:
+        return self._run("extract_table_chunk", index, offset, limit, max_cols)
+
+    def iter_table_chunks(self, index: int, chunk_rows: int = 500, offset: int = 0, max_cols: int = 50) -> Iterator[Dict[str, Any]]:
+        # Generator stays on the caller's side; each chunk is a single hop to the worker thread
+        while True:
+            chunk = self.extract_table_chunk(index, offset, chunk_rows, max_cols)
+            if not chunk or not chunk.get("row_count"):
+                return
+            yield chunk
+            offset += chunk["row_count"]
+            if not chunk.get("truncated"):
+                return
+
     def extract_amazon_search_results_top_k(self, k: int = 5, max_price: Optional[float] = None, currency_hint: str = "INR", only_with_price: bool = False) -> List[Dict[str, Any]]:
         return self._run("extract_amazon_search_results_top_k", k, max_price, currency_hint, only_with_price)
@@ -1,20 +1,213 @@
 import os
 import json
+import time
+import atexit
+import logging
+import threading
 import datetime as _dt
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 
 try:
-    from pymongo import MongoClient  
+    from pymongo import MongoClient, UpdateOne
+    from pymongo.errors import BulkWriteError
 except Exception:  
     MongoClient = None  
+    UpdateOne = None
+    BulkWriteError = None
+
+log = logging.getLogger(__name__)
+_DUPLICATE_KEY = 11000
+
+from .session_log import SessionLogReader
 
 
 def _now_iso() -> str:
     return _dt.datetime.utcnow().isoformat() + "Z"
 
 
+def _ts_in_range(ts: Optional[str], since: Optional[str], until: Optional[str]) -> bool:
+    # ISO-8601 strings from _now_iso() sort lexicographically
+    if since and (ts is None or ts < since):
+        return False
+    if until and (ts is None or ts > until):
+        return False
+    return True
+
+
+class _EventWriter:
+    """
+    Background batching writer used by SessionStore.
+
+    Records are queued as (mongo_op, jsonl_line) pairs; a daemon thread drains
+    the queue every flush_interval seconds (or as soon as batch_size records are
+    waiting) and writes each batch with one file append and one Mongo bulk_write.
+    The queue is bounded: with overflow="block" producers wait up to
+    block_timeout seconds for room, with overflow="drop" the new record is
+    discarded. Either way dropped records are counted in stats().
+    """
+
+    def __init__(self, store: "SessionStore", max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.2, overflow: str = "block", block_timeout: float = 1.0):
+        self.store = store
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow if overflow in ("block", "drop") else "block"
+        self.block_timeout = block_timeout
+        self._queue: Deque[Tuple[Optional[Tuple[str, Dict[str, Any]]], str]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def submit(self, mongo_op: Optional[Tuple[str, Dict[str, Any]]], line: str) -> bool:
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "block":
+                    self._cond.notify_all()
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                if len(self._queue) >= self.max_queue or self._closed:
+                    self.dropped += 1
+                    return False
+            self._queue.append((mongo_op, line))
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far has been written (or timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self.enqueued
+            self._cond.notify_all()
+            while self.written < target and self._thread is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "overflow": self.overflow,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._queue and len(self._queue) < self.batch_size and not self._closed:
+                    # Let a batch accumulate; flush()/batch_size wake us early
+                    self._cond.wait(self.flush_interval)
+                if not self._queue:
+                    if self._closed:
+                        return
+                    continue
+                n = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(n)]
+                # Room freed up for blocked producers
+                self._cond.notify_all()
+            try:
+                self._write(batch)
+            except Exception:
+                pass
+            with self._cond:
+                self.written += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Tuple[Optional[Tuple[str, Dict[str, Any]]], str]]) -> None:
+        self.store._append_lines("".join(line for _op, line in batch))
+        self.store._write_mongo([op for op, _line in batch if op is not None], retries=2)
+
+
+def _bulk_update(col, ops: List[Tuple[Dict[str, Any], Dict[str, Any]]], retries: int = 0) -> List[int]:
+    """
+    Apply (filter, update) upserts in order with one bulk_write and return the
+    indexes of ops that were not applied. The ops are guarded by `lastSeq`, so a
+    replay matches nothing and its upsert fails as a duplicate key: that counts
+    as applied. An ordered batch stops at its first failed op, so the ops after
+    the index BulkWriteError reports are resubmitted. Any other error leaves
+    the remainder unapplied; with retries (background writer only) it is sent
+    again after a short pause, which the guards make safe.
+    """
+    if col is None or not ops:
+        return []
+    failed: List[int] = []
+    start = 0
+    attempts = 0
+    while start < len(ops):
+        try:
+            col.bulk_write([UpdateOne(f, u, upsert=True) for f, u in ops[start:]], ordered=True)
+            return failed
+        except BulkWriteError as e:
+            error = ((e.details or {}).get("writeErrors") or [{}])[0]
+            at = start + int(error.get("index", 0))
+            if error.get("code") != _DUPLICATE_KEY:
+                log.warning("session bulk_write: op %d of %d failed: %s", at, len(ops), error.get("errmsg", e))
+                failed.append(at)
+            start = at + 1
+        except Exception as e:
+            attempts += 1
+            if attempts > retries:
+                log.warning("session bulk_write failed, %d op(s) not written: %s", len(ops) - start, e)
+                return failed + list(range(start, len(ops)))
+            time.sleep(0.05 * attempts)
+    return failed
+
+
+def _bucket_id(session_id: str, bucket: int) -> str:
+    return f"{session_id}:{bucket:08d}"
+
+
 class SessionStore:
-    """Persist session history to MongoDB if available, else to a local JSONL file."""
+    """Persist session history to MongoDB if available, else to a local JSONL file.
+
+    Writes go through a background batching writer unless JARVIS_SESSIONS_ASYNC=0;
+    see _EventWriter for the queue/overflow settings (JARVIS_SESSIONS_QUEUE_MAX,
+    JARVIS_SESSIONS_BATCH, JARVIS_SESSIONS_FLUSH_MS, JARVIS_SESSIONS_OVERFLOW).
+
+    In Mongo each session is a small header document in `<collection>`
+    (createdAt, meta, eventCount, bucketCount, firstTs, lastTs, lastSeq, endedAt)
+    and its events live in fixed-size bucket documents in `<collection>_events`:
+    {_id: "<sid>:<bucket>", sessionId, bucket, count, events, firstTs, lastTs, lastSeq}.
+    Every event carries a per-session `seq`; event seq lands in bucket
+    seq // JARVIS_SESSIONS_BUCKET_SIZE, so no document grows without bound.
+    Sessions written by older versions (one `events` array on the session
+    document) are migrated on first write, or in bulk with migrate_legacy().
+    """
+
+    SCHEMA_VERSION = 2
 
     def __init__(self, db_name: str = "jarvis", collection: str = "sessions"):
         self.mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
@@ -22,12 +215,27 @@ class SessionStore:
         self.collection = collection
         self._client = None
         self._col = None
+        self._buckets = None
+        self.bucket_size = max(1, int(os.getenv("JARVIS_SESSIONS_BUCKET_SIZE", "200")))
+        # Next event seq per session, so bucket numbers are known without a round trip
+        self._seq: Dict[str, int] = {}
+        self._seq_lock = threading.Lock()
         # File persistence settings
         self._file_path = os.getenv("JARVIS_SESSIONS_FILE", os.path.join(os.getcwd(), "sessions.jsonl"))
         self._home_fallback_path = os.path.join(os.path.expanduser("~"), "jarvis_sessions.jsonl")
         # Dual-write ensures we always have a local record even if Mongo is enabled
         self._dual_write = os.getenv("JARVIS_SESSIONS_DUAL_WRITE", "1") not in ("0", "false", "False")
         self._connect()
+        self._writer: Optional[_EventWriter] = None
+        if os.getenv("JARVIS_SESSIONS_ASYNC", "1") not in ("0", "false", "False"):
+            self._writer = _EventWriter(
+                self,
+                max_queue=int(os.getenv("JARVIS_SESSIONS_QUEUE_MAX", "10000")),
+                batch_size=int(os.getenv("JARVIS_SESSIONS_BATCH", "500")),
+                flush_interval=float(os.getenv("JARVIS_SESSIONS_FLUSH_MS", "200")) / 1000.0,
+                overflow=os.getenv("JARVIS_SESSIONS_OVERFLOW", "block"),
+            )
+            atexit.register(self._writer.close)
 
     def _connect(self):
         if MongoClient is None:
@@ -37,9 +245,24 @@ class SessionStore:
             # quick ping
             self._client.admin.command('ping')
             self._col = self._client[self.db_name][self.collection]
+            self._buckets = self._client[self.db_name][self.collection + "_events"]
         except Exception:
             self._client = None
             self._col = None
+            self._buckets = None
+            return
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Indexes for bucket lookup by (sessionId, bucket) and time-range scans."""
+        if self._col is None or self._buckets is None:
+            return
+        try:
+            self._buckets.create_index([("sessionId", 1), ("bucket", 1)], unique=True)
+            self._buckets.create_index([("sessionId", 1), ("lastTs", 1)])
+            self._col.create_index([("lastTs", -1)])
+        except Exception:
+            pass
 
     def start_session(self, meta: Optional[Dict[str, Any]] = None) -> str:
         sid = os.urandom(8).hex()
@@ -47,42 +270,270 @@ class SessionStore:
             "_id": sid,
             "createdAt": _now_iso(),
             "meta": meta or {},
-            "events": [],
+            "schema": self.SCHEMA_VERSION,
+            "eventCount": 0,
+            "bucketCount": 0,
         }
-        if self._col is not None:
-            try:
-                self._col.insert_one(doc)
-            except Exception:
-                # ignore and continue to file write
-                pass
+        with self._seq_lock:
+            self._seq[sid] = 0
+        if self._writer is not None:
+            self._writer.submit(("start", doc), self._line({"type": "session_start", "sessionId": sid, "doc": doc}))
+            return sid
+        self._write_mongo([("start", doc)])
         # Always write to file to guarantee persistence
         self._append_file({"type": "session_start", "sessionId": sid, "doc": doc})
         return sid
 
     def append_event(self, session_id: str, event: Dict[str, Any]):
-        event = {**event, "ts": _now_iso(), "sessionId": session_id}
-        if self._col is not None:
-            try:
-                self._col.update_one({"_id": session_id}, {"$push": {"events": event}}, upsert=True)
-            except Exception:
-                # even if Mongo fails, still write to file
-                pass
+        event = {**event, "ts": _now_iso(), "sessionId": session_id, "seq": self._next_seq(session_id)}
+        if self._writer is not None:
+            # Serialize now so later mutation by the caller can't change what gets logged
+            self._writer.submit(("push", event), self._line({"type": "event", **event}))
+            return
+        # Mongo failures are swallowed; the file write below still happens
+        self._write_mongo([("push", event)])
         # Always write to file as well
         self._append_file({"type": "event", **event})
 
+    def append_trace(self, session_id: str, trace: Any, event: Optional[Dict[str, Any]] = None):
+        """Log a browser ScriptTrace (per-action timing/outcome) along with the fields in event."""
+        d = trace.to_dict()
+        self.append_event(session_id, {
+            "type": "action",
+            **(event or {}),
+            "result": d.pop("message"),
+            "trace": d,
+        })
+
     def end_session(self, session_id: str, meta: Optional[Dict[str, Any]] = None):
         update = {"endedAt": _now_iso(), "endMeta": meta or {}}
-        if self._col is not None:
-            try:
-                self._col.update_one({"_id": session_id}, {"$set": update}, upsert=True)
-            except Exception:
-                # continue to file write
-                pass
+        if self._writer is not None:
+            self._writer.submit(("end", {"_id": session_id, "update": update}),
+                                self._line({"type": "session_end", "sessionId": session_id, **update}))
+            self._writer.flush()
+            with self._seq_lock:
+                self._seq.pop(session_id, None)
+            return
+        self._write_mongo([("end", {"_id": session_id, "update": update})])
         self._append_file({"type": "session_end", "sessionId": session_id, **update})
+        with self._seq_lock:
+            self._seq.pop(session_id, None)
+
+    # ---------- reading back ----------
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session header (counters, meta, timestamps) without its events."""
+        if self._col is None:
+            return None
+        self.flush()
+        try:
+            return self._col.find_one({"_id": session_id}, {"events": 0})
+        except Exception:
+            return None
+
+    def iter_events(self, session_id: str, start_seq: int = 0, since: Optional[str] = None,
+                    until: Optional[str] = None, page_buckets: int = 20) -> Iterator[Dict[str, Any]]:
+        """
+        Yield a session's events in order, reading page_buckets bucket documents per
+        round trip. since/until are ISO timestamps (inclusive) matched against ts.
+        """
+        if self._col is None or self._buckets is None:
+            return
+        self.flush()
+        header = self._col.find_one({"_id": session_id}, {"events": 1, "bucketCount": 1})
+        if header is None:
+            return
+        if isinstance(header.get("events"), list):
+            for i, ev in enumerate(header["events"]):
+                ev = {**ev, "seq": ev.get("seq", i)}
+                if ev["seq"] >= start_seq and _ts_in_range(ev.get("ts"), since, until):
+                    yield ev
+            return
+        # Bucket numbers are dense, so page by explicit ranges on the (sessionId, bucket) index
+        end = int(header.get("bucketCount") or 0)
+        bucket = start_seq // self.bucket_size
+        page_buckets = max(1, page_buckets)
+        while bucket < end:
+            query: Dict[str, Any] = {"sessionId": session_id, "bucket": {"$gte": bucket, "$lt": bucket + page_buckets}}
+            if since:
+                query["lastTs"] = {"$gte": since}
+            if until:
+                query["firstTs"] = {"$lte": until}
+            for doc in sorted(self._buckets.find(query), key=lambda d: d["bucket"]):
+                for ev in doc.get("events") or []:
+                    if ev.get("seq", 0) >= start_seq and _ts_in_range(ev.get("ts"), since, until):
+                        yield ev
+            bucket += page_buckets
+
+    def events_page(self, session_id: str, after_seq: int = -1, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of events with seq > after_seq; returns (events, cursor for the next page or None)."""
+        out: List[Dict[str, Any]] = []
+        for ev in self.iter_events(session_id, start_seq=after_seq + 1, page_buckets=max(1, limit // self.bucket_size + 1)):
+            out.append(ev)
+            if len(out) >= limit:
+                return out, ev.get("seq")
+        return out, None
+
+    def log_reader(self) -> SessionLogReader:
+        """Indexed reader over the local sessions.jsonl (works without Mongo)."""
+        self.flush()
+        return SessionLogReader(self._file_path)
+
+    # ---------- legacy schema ----------
+    def migrate_legacy_session(self, doc: Dict[str, Any]) -> int:
+        """Move one old-style session's `events` array into buckets. Idempotent; returns events moved."""
+        if self._col is None or self._buckets is None:
+            return 0
+        sid = doc["_id"]
+        events = doc.get("events") or []
+        first_ts = events[0].get("ts") if events else None
+        last_ts = events[-1].get("ts") if events else None
+        n_buckets = 0
+        for start in range(0, len(events), self.bucket_size):
+            chunk = [{**ev, "seq": start + i} for i, ev in enumerate(events[start:start + self.bucket_size])]
+            bucket = start // self.bucket_size
+            self._buckets.replace_one({"_id": _bucket_id(sid, bucket)}, {
+                "_id": _bucket_id(sid, bucket),
+                "sessionId": sid,
+                "bucket": bucket,
+                "count": len(chunk),
+                "events": chunk,
+                "firstTs": chunk[0].get("ts"),
+                "lastTs": chunk[-1].get("ts"),
+            }, upsert=True)
+            n_buckets = bucket + 1
+        header: Dict[str, Any] = {"schema": self.SCHEMA_VERSION, "eventCount": len(events), "bucketCount": n_buckets}
+        if first_ts:
+            header["firstTs"] = first_ts
+            header["lastTs"] = last_ts
+        self._col.update_one({"_id": sid}, {"$set": header, "$unset": {"events": ""}})
+        return len(events)
+
+    def migrate_legacy(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Migrate every session document that still has an `events` array."""
+        stats = {"sessions": 0, "events": 0}
+        if self._col is None:
+            return stats
+        self.flush()
+        cursor = self._col.find({"events": {"$type": "array"}}, {"_id": 1})
+        ids = [d["_id"] for d in (cursor.limit(limit) if limit else cursor)]
+        for sid in ids:
+            # One document at a time so a huge legacy array is never held twice
+            doc = self._col.find_one({"_id": sid})
+            if doc is None or not isinstance(doc.get("events"), list):
+                continue
+            stats["events"] += self.migrate_legacy_session(doc)
+            stats["sessions"] += 1
+        return stats
+
+    # ---------- Mongo writes ----------
+    def _next_seq(self, session_id: str) -> int:
+        with self._seq_lock:
+            seq = self._seq.get(session_id)
+        if seq is None:
+            seq = self._resume_seq(session_id)
+        with self._seq_lock:
+            seq = self._seq.get(session_id, seq)
+            self._seq[session_id] = seq + 1
+            return seq
+
+    def _resume_seq(self, session_id: str) -> int:
+        # Session not started by this process: continue after what Mongo already has
+        if self._col is None:
+            return 0
+        self.flush()
+        try:
+            doc = self._col.find_one({"_id": session_id}, {"eventCount": 1, "lastSeq": 1, "events": 1})
+        except Exception:
+            return 0
+        if doc is None:
+            return 0
+        if isinstance(doc.get("events"), list):
+            return self.migrate_legacy_session(doc)
+        # lastSeq can run ahead of eventCount after a lost bucket write; new events must pass the lastSeq guard
+        return max(int(doc.get("eventCount") or 0), int(doc.get("lastSeq", -1)) + 1)
+
+    def _write_mongo(self, records: List[Tuple[str, Dict[str, Any]]], retries: int = 0) -> None:
+        """
+        Turn start/push/end records into bucket and header upserts, one bulk_write
+        per collection. Event upserts only match documents whose lastSeq is below
+        their first seq, so writing the same records twice stores them once.
+        """
+        if self._col is None or self._buckets is None or not records:
+            return
+        header_ops: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        bucket_ops: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        # bucket op -> (index of its session's header op, events it carries)
+        bucket_owner: List[Tuple[int, int]] = []
+        # Runs of events become one upsert per touched bucket plus one header
+        # counter update per session; start/end records act as barriers so they
+        # stay ordered against the events around them
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+
+        def push_pending():
+            for sid, events in pending.items():
+                by_bucket: Dict[int, List[Dict[str, Any]]] = {}
+                for ev in events:
+                    by_bucket.setdefault(ev["seq"] // self.bucket_size, []).append(ev)
+                for bucket, evs in by_bucket.items():
+                    bucket_owner.append((len(header_ops), len(evs)))
+                    bucket_ops.append(({"_id": _bucket_id(sid, bucket), "lastSeq": {"$not": {"$gte": evs[0]["seq"]}}}, {
+                        "$setOnInsert": {"sessionId": sid, "bucket": bucket},
+                        "$push": {"events": {"$each": evs}},
+                        "$inc": {"count": len(evs)},
+                        "$min": {"firstTs": evs[0]["ts"]},
+                        "$max": {"lastTs": evs[-1]["ts"], "lastSeq": evs[-1]["seq"]},
+                    }))
+                header_ops.append(({"_id": sid, "lastSeq": {"$not": {"$gte": events[0]["seq"]}}}, {
+                    "$inc": {"eventCount": len(events)},
+                    "$min": {"firstTs": events[0]["ts"]},
+                    "$max": {"lastTs": events[-1]["ts"], "bucketCount": max(by_bucket) + 1, "lastSeq": events[-1]["seq"]},
+                }))
+            pending.clear()
+
+        for kind, body in records:
+            if kind == "push":
+                pending.setdefault(body["sessionId"], []).append(body)
+                continue
+            push_pending()
+            if kind == "start":
+                fields = {k: v for k, v in body.items() if k != "_id"}
+                header_ops.append(({"_id": body["_id"]}, {"$setOnInsert": fields}))
+            elif kind == "end":
+                header_ops.append(({"_id": body["_id"]}, {"$set": body["update"]}))
+        push_pending()
+        # Buckets first so header counters never run ahead of stored events;
+        # events whose bucket write was dropped are taken back out of the counters
+        lost: Dict[int, int] = {}
+        for i in _bulk_update(self._buckets, bucket_ops, retries):
+            owner, n = bucket_owner[i]
+            lost[owner] = lost.get(owner, 0) + n
+        for owner, n in lost.items():
+            update = header_ops[owner][1]
+            update["$inc"]["eventCount"] -= n
+            if update["$inc"]["eventCount"] <= 0:
+                header_ops[owner] = None
+        _bulk_update(self._col, [op for op in header_ops if op is not None], retries)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait for queued writes to reach the file/Mongo. No-op when writing synchronously."""
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def writer_stats(self) -> Dict[str, Any]:
+        if self._writer is None:
+            return {"async": False}
+        return {"async": True, **self._writer.stats()}
+
+    @staticmethod
+    def _line(obj: Dict[str, Any]) -> str:
+        return json.dumps(obj, ensure_ascii=False) + "\n"
 
     def _append_file(self, obj: Dict[str, Any]):
         """Append an entry to the session log file. If the primary path fails, try a fallback in the user's home directory."""
-        payload = json.dumps(obj, ensure_ascii=False) + "\n"
+        self._append_lines(self._line(obj))
+
+    def _append_lines(self, payload: str):
         # Try primary path
         if not self._safe_write(self._file_path, payload):
             # Try fallback in home directory
@@ -0,0 +1,489 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Hop-by-hop and encoding headers are not replayed: bodies are stored decoded
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+_CACHEABLE_STATUS = (200, 203, 301, 308, 404, 410)
+_DIRECTIVE = re.compile(r"([\w-]+)\s*(?:=\s*\"?([^\",]*)\"?)?")
+
+
+def _directives(value: Optional[str]) -> Dict[str, Optional[str]]:
+    return {m.group(1).lower(): m.group(2) for m in _DIRECTIVE.finditer(value or "")}
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _int(value: Optional[str], default: int = 0) -> int:
+    try:
+        return int(value or default)
+    except ValueError:
+        return default
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    status: int
+    headers: Dict[str, str]
+    stored_at: float
+    fresh_until: float
+    size: int = 0
+    vary: List[str] = field(default_factory=list)
+    must_revalidate: bool = False
+    # Stored from a request without cookies; entries from older versions lack it and are dropped on load
+    cookieless: bool = False
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def is_fresh(self, now: float) -> bool:
+        return not self.must_revalidate and now < self.fresh_until
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        out = {}
+        if self.etag:
+            out["if-none-match"] = self.etag
+        if self.last_modified:
+            out["if-modified-since"] = self.last_modified
+        return out
+
+
+class HttpCache:
+    """
+    On-disk HTTP response cache for browser contexts, applied through
+    Playwright route handlers (install/ainstall below).
+
+    Entries are keyed by method + URL + the request headers named in the
+    response's Vary, honour Cache-Control (no-store, private, no-cache, max-age,
+    must-revalidate), Expires, Age and the ETag / Last-Modified validators,
+    and are evicted least-recently-used once max_bytes is exceeded. Responses
+    without an explicit lifetime get the usual heuristic (10% of the time since
+    Last-Modified, at most a day) or are kept for revalidation only.
+    Requests carrying cookies bypass the cache and responses that set cookies
+    are never stored, so nothing user-specific is shared or replayed.
+
+    With stale_while_revalidate=True a stale entry (up to max_stale seconds past
+    its lifetime) is served at once and revalidated in the background; otherwise
+    it is revalidated with a conditional request before being served.
+    """
+
+    _instances: Dict[str, "HttpCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, stale_while_revalidate: bool = False,
+                 max_stale: float = 86400.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._vary: Dict[str, List[str]] = {}
+        self._bytes = 0
+        self._revalidating: set = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "stale_served": 0, "stored": 0, "evicted": 0, "bypassed": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["HttpCache"]:
+        """
+        JARVIS_HTTP_CACHE=1 enables the cache in ~/.jarvis/http_cache (any other
+        non-false value is used as the directory); off by default.
+        JARVIS_HTTP_CACHE_MB caps its size, JARVIS_HTTP_CACHE_SWR=1 turns on
+        stale-while-revalidate. Sessions using the same directory share one instance.
+        """
+        setting = os.getenv("JARVIS_HTTP_CACHE", "0")
+        if setting in ("0", "false", "False", ""):
+            return None
+        directory = os.path.join(os.path.expanduser("~"), ".jarvis", "http_cache") if setting in ("1", "true", "True") else setting
+        with cls._instances_lock:
+            cache = cls._instances.get(directory)
+            if cache is None:
+                try:
+                    cache = cls(
+                        directory,
+                        max_bytes=int(float(os.getenv("JARVIS_HTTP_CACHE_MB", "256")) * 1024 * 1024),
+                        stale_while_revalidate=os.getenv("JARVIS_HTTP_CACHE_SWR", "0") in ("1", "true", "True"),
+                        max_stale=float(os.getenv("JARVIS_HTTP_CACHE_MAX_STALE", "86400")),
+                    )
+                except Exception:
+                    return None
+                cls._instances[directory] = cache
+            return cache
+
+    # ---------- keys ----------
+    @staticmethod
+    def _base_key(method: str, url: str) -> str:
+        return f"{method.upper()} {url.split('#', 1)[0]}"
+
+    @staticmethod
+    def _key(base: str, vary: List[str], req_headers: Dict[str, str]) -> str:
+        parts = [base] + [f"{h}={req_headers.get(h, '')}" for h in vary]
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.directory, key + ".json"), os.path.join(self.directory, key + ".bin")
+
+    # ---------- lookups ----------
+    @staticmethod
+    def bypass(method: str, req_headers: Dict[str, str]) -> bool:
+        """Requests that never touch the cache: non-GET, ranges, credentials (incl. cookies), hard reloads."""
+        if method.upper() != "GET" or "range" in req_headers or "authorization" in req_headers or "cookie" in req_headers:
+            return True
+        cc = _directives(req_headers.get("cache-control"))
+        return "no-store" in cc or "no-cache" in cc or req_headers.get("pragma") == "no-cache"
+
+    def lookup(self, method: str, url: str, req_headers: Dict[str, str]) -> Tuple[Optional[CacheEntry], str]:
+        """
+        (entry, state). state is 'fresh' (serve it), 'stale' (serve it and revalidate
+        in the background), 'revalidate' (send a conditional request first),
+        'miss' or 'bypass'.
+        """
+        if self.bypass(method, req_headers):
+            self._count("bypassed")
+            return None, "bypass"
+        base = self._base_key(method, url)
+        now = time.time()
+        with self._lock:
+            vary = self._vary.get(base)
+            entry = self._entries.get(self._key(base, vary, req_headers)) if vary is not None else None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None, "miss"
+            self._entries.move_to_end(entry.key)
+            if entry.is_fresh(now):
+                self.counters["hits"] += 1
+                state = "fresh"
+            elif self.stale_while_revalidate and not entry.must_revalidate and now < entry.fresh_until + self.max_stale:
+                self.counters["stale_served"] += 1
+                state = "stale"
+            elif entry.validators():
+                state = "revalidate"
+            else:
+                self.counters["misses"] += 1
+                return None, "miss"
+        try:
+            os.utime(self._paths(entry.key)[0])
+        except OSError:
+            pass
+        return entry, state
+
+    def body(self, entry: CacheEntry) -> Optional[bytes]:
+        try:
+            with open(self._paths(entry.key)[1], "rb") as f:
+                return f.read()
+        except OSError:
+            self._drop(entry.key)
+            return None
+
+    # ---------- writes ----------
+    def _lifetime(self, headers: Dict[str, str], now: float) -> Optional[float]:
+        cc = _directives(headers.get("cache-control"))
+        if "no-store" in cc or "private" in cc:
+            return None
+        age = _int(headers.get("age"))
+        if "max-age" in cc:
+            return _int(cc["max-age"]) - age
+        expires = _http_date(headers.get("expires"))
+        if expires is not None:
+            date = _http_date(headers.get("date")) or now
+            return expires - date - age
+        modified = _http_date(headers.get("last-modified"))
+        if modified is not None:
+            return min(86400.0, max(0.0, (now - modified) * 0.1)) - age
+        return 0.0
+
+    def store(self, method: str, url: str, req_headers: Dict[str, str], status: int,
+              headers: Dict[str, str], body: bytes) -> Optional[CacheEntry]:
+        """Cache a response if its status and headers allow it; returns the entry or None."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        if method.upper() != "GET" or status not in _CACHEABLE_STATUS or len(body) > self.max_bytes // 8:
+            return None
+        if "set-cookie" in headers or self.bypass(method, {k.lower(): v for k, v in req_headers.items()}):
+            return None
+        vary = sorted({h.strip().lower() for h in headers.get("vary", "").split(",") if h.strip()})
+        if "*" in vary:
+            return None
+        now = time.time()
+        lifetime = self._lifetime(headers, now)
+        cc = _directives(headers.get("cache-control"))
+        if lifetime is None or (lifetime <= 0 and not (headers.get("etag") or headers.get("last-modified"))):
+            return None
+        base = self._base_key(method, url)
+        entry = CacheEntry(
+            key=self._key(base, vary, req_headers),
+            url=url,
+            status=status,
+            headers={k: v for k, v in headers.items() if k not in _DROP_HEADERS},
+            stored_at=now,
+            fresh_until=now + max(0.0, lifetime),
+            size=len(body),
+            vary=vary,
+            must_revalidate="no-cache" in cc or "must-revalidate" in cc,
+            cookieless=True,
+        )
+        meta_path, body_path = self._paths(entry.key)
+        try:
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError:
+            return None
+        with self._lock:
+            old = self._entries.pop(entry.key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[entry.key] = entry
+            self._vary[base] = vary
+            self._bytes += entry.size
+            self.counters["stored"] += 1
+            victims = self._evict_locked()
+        self._unlink(victims)
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: Dict[str, str]) -> None:
+        """Apply a 304's headers: the stored body is valid for a new lifetime (unless it may no longer be stored)."""
+        if any(k.lower() == "set-cookie" for k in headers):
+            self._drop(entry.key)
+            return
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        merged = {**entry.headers, **headers}
+        now = time.time()
+        lifetime = self._lifetime(merged, now)
+        if lifetime is None:
+            self._drop(entry.key)
+            return
+        entry.headers = merged
+        entry.stored_at = now
+        entry.fresh_until = now + max(0.0, lifetime)
+        self._count("revalidated")
+        try:
+            with open(self._paths(entry.key)[0], "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+        except OSError:
+            pass
+
+    def revalidate_later(self, entry: CacheEntry, req_headers: Dict[str, str]) -> None:
+        """
+        Background conditional GET for a stale entry served from cache (outside the
+        browser, so without cookies): only for entries stored from cookieless requests.
+        """
+        if not entry.cookieless or "cookie" in {k.lower() for k in req_headers}:
+            return
+        with self._lock:
+            if entry.key in self._revalidating:
+                return
+            self._revalidating.add(entry.key)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="http-cache")
+        self._pool.submit(self._revalidate, entry, req_headers)
+
+    def _revalidate(self, entry: CacheEntry, req_headers: Dict[str, str]) -> None:
+        # urllib doesn't decode gzip/br, so ask for an identity body
+        headers = {k: v for k, v in req_headers.items() if k.lower() not in ("accept-encoding", "cookie") and not k.startswith(":")}
+        headers.update(entry.validators())
+        try:
+            with urllib.request.urlopen(urllib.request.Request(entry.url, headers=headers), timeout=15) as resp:
+                self.store("GET", entry.url, req_headers, resp.status, dict(resp.headers), resp.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self.refresh(entry, dict(e.headers))
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._revalidating.discard(entry.key)
+
+    # ---------- housekeeping ----------
+    def _evict_locked(self) -> List[str]:
+        victims = []
+        while self._bytes > self.max_bytes and self._entries:
+            key, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.counters["evicted"] += 1
+            victims.append(key)
+        return victims
+
+    def _unlink(self, keys: List[str]) -> None:
+        for key in keys:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _drop(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+        self._unlink([key])
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _load(self) -> None:
+        metas = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = CacheEntry(**json.load(f))
+                if not entry.cookieless:
+                    self._unlink([entry.key])
+                    continue
+                metas.append((os.path.getmtime(path), entry))
+            except Exception:
+                continue
+        # mtime is bumped on every hit, so oldest-first rebuilds the LRU order
+        for _mtime, entry in sorted(metas, key=lambda m: m[0]):
+            self._entries[entry.key] = entry
+            self._vary[self._base_key("GET", entry.url)] = entry.vary
+            self._bytes += entry.size
+        self._unlink(self._evict_locked())
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._vary.clear()
+            self._bytes = 0
+        self._unlink(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+            served = c["hits"] + c["stale_served"] + c["revalidated"]
+            lookups = served + c["misses"]
+            return {
+                **c,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ---------- Playwright glue ----------
+def _fulfill_args(entry: CacheEntry, body: bytes) -> Dict[str, Any]:
+    return {"status": entry.status, "headers": entry.headers, "body": body}
+
+
+def _with_cookies(headers: Dict[str, str], cookies: List[Dict[str, Any]]) -> Dict[str, str]:
+    # route.request.headers never carries Cookie (the browser adds it when sending),
+    # so the context's jar stands in for it and makes lookup() bypass the cache
+    if not cookies:
+        return headers
+    return {**headers, "cookie": "; ".join(f"{c['name']}={c['value']}" for c in cookies)}
+
+
+def install(context, cache: HttpCache) -> None:
+    """Serve a playwright.sync_api BrowserContext's GET requests through cache (see core.blocking.install)."""
+
+    def handler(route) -> None:
+        req = route.request
+        headers = req.headers
+        if not cache.bypass(req.method, headers):
+            headers = _with_cookies(headers, context.cookies(req.url))
+        entry, state = cache.lookup(req.method, req.url, headers)
+        if state == "bypass":
+            route.fallback()
+            return
+        if entry is not None and state in ("fresh", "stale"):
+            body = cache.body(entry)
+            if body is not None:
+                route.fulfill(**_fulfill_args(entry, body))
+                if state == "stale":
+                    cache.revalidate_later(entry, headers)
+                return
+        try:
+            extra = entry.validators() if entry is not None and state == "revalidate" else {}
+            resp = route.fetch(headers={**headers, **extra} if extra else None, max_redirects=0)
+        except Exception:
+            route.fallback()
+            return
+        if resp.status == 304 and entry is not None:
+            body = cache.body(entry)
+            if body is not None:
+                cache.refresh(entry, resp.headers)
+                route.fulfill(**_fulfill_args(entry, body))
+                return
+        if state == "revalidate":
+            cache._count("misses")
+        cache.store(req.method, req.url, headers, resp.status, resp.headers, resp.body())
+        route.fulfill(response=resp)
+
+    context.route("**/*", handler)
+
+
+async def ainstall(context, cache: HttpCache) -> None:
+    """install() for a playwright.async_api BrowserContext."""
+
+    async def handler(route) -> None:
+        req = route.request
+        headers = req.headers
+        if not cache.bypass(req.method, headers):
+            headers = _with_cookies(headers, await context.cookies(req.url))
+        entry, state = cache.lookup(req.method, req.url, headers)
+        if state == "bypass":
+            await route.fallback()
+            return
+        if entry is not None and state in ("fresh", "stale"):
+            body = cache.body(entry)
+            if body is not None:
+                await route.fulfill(**_fulfill_args(entry, body))
+                if state == "stale":
+                    cache.revalidate_later(entry, headers)
+                return
+        try:
+            extra = entry.validators() if entry is not None and state == "revalidate" else {}
+            resp = await route.fetch(headers={**headers, **extra} if extra else None, max_redirects=0)
+        except Exception:
+            await route.fallback()
+            return
+        if resp.status == 304 and entry is not None:
+            body = cache.body(entry)
+            if body is not None:
+                cache.refresh(entry, resp.headers)
+                await route.fulfill(**_fulfill_args(entry, body))
+                return
+        if state == "revalidate":
+            cache._count("misses")
+        cache.store(req.method, req.url, headers, resp.status, resp.headers, await resp.body())
+        await route.fulfill(response=resp)
+
+    await context.route("**/*", handler)
@@ -0,0 +1,95 @@
+import json
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array arriving in arbitrary text chunks.
+
+    feed() returns every top-level element completed so far, so a caller can act
+    on the first item of an LLM plan while the rest is still being generated.
+    Text before the first '[' (prose, code fences, a wrapping object key) is
+    skipped; elements that fail to parse are dropped.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._item_start: Optional[int] = None
+        self.started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        out: List[Any] = []
+        if self.done or not chunk:
+            return out
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        n = len(text)
+        while i < n and not self.done:
+            ch = text[i]
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                    self._depth = 1
+            elif self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    # End of the array; flush a trailing scalar element
+                    self._emit(text, i, out)
+                    self.done = True
+                elif self._depth == 1 and self._item_start is not None:
+                    self._emit(text, i + 1, out)
+            elif ch == "," and self._depth == 1:
+                self._emit(text, i, out)
+            elif self._depth == 1 and self._item_start is None and not ch.isspace():
+                self._item_start = i
+            i += 1
+        # Keep only the unfinished element so long streams don't grow the buffer
+        cut = self._item_start if self._item_start is not None else i
+        self._text = text[cut:]
+        self._pos = i - cut
+        if self._item_start is not None:
+            self._item_start = 0
+        return out
+
+    def _emit(self, text: str, end: int, out: List[Any]) -> None:
+        if self._item_start is None:
+            return
+        segment = text[self._item_start:end].strip()
+        self._item_start = None
+        if not segment:
+            return
+        try:
+            out.append(json.loads(segment))
+        except ValueError:
+            pass
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yield elements of a streamed JSON array as soon as each one is complete."""
+    parser = JSONArrayStream()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            break
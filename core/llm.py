@@ -1,13 +1,52 @@
 import os
 import json
+import time
+import threading
 import subprocess
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 try:
     import requests  # type: ignore
 except Exception:  # pragma: no cover
     requests = None  # type: ignore
 
+from .llm_cache import ResponseCache
+from .json_stream import JSONArrayStream
+
+
+class CircuitBreaker:
+    """
+    Cached up/down state for a backend.
+
+    'unknown' and 'down' (once reprobe_interval has passed) ask for a probe;
+    while 'up', real requests are the health signal and no probes are made.
+    A connection failure flips the state to 'down' and short-circuits calls
+    until the next re-probe.
+    """
+
+    def __init__(self, reprobe_interval: float = 15.0):
+        self.reprobe_interval = reprobe_interval
+        self.state = "unknown"
+        self._next_probe = 0.0
+        self._lock = threading.Lock()
+
+    def needs_probe(self) -> bool:
+        with self._lock:
+            return self.state == "unknown" or (self.state == "down" and time.monotonic() >= self._next_probe)
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == "down" and time.monotonic() < self._next_probe
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "up"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.state = "down"
+            self._next_probe = time.monotonic() + self.reprobe_interval
+
 
 class LLMProvider:
     """
@@ -28,16 +67,58 @@ class LLMProvider:
             self._openai = OpenAI(api_key=self.openai_api_key) if self.openai_api_key else None
         except Exception:
             self._openai = None
+        # Persistent cache of LLM answers for repeated commands (JARVIS_LLM_CACHE=0 disables)
+        self.cache: Optional[ResponseCache] = ResponseCache.from_env()
+        # One keep-alive HTTP session for every Ollama call, and cached backend health
+        self._http = self._make_http_session()
+        self._ollama_health = CircuitBreaker(float(os.getenv("OLLAMA_REPROBE_SECONDS", "15")))
+        self.ollama_probes = 0
+
+    @staticmethod
+    def _make_http_session():
+        if requests is None:
+            return None
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _cache_model_id(self) -> str:
+        # Answers depend on which backends are configured, not on which one happened to reply
+        return f"ollama:{self.ollama_model}|openai:{'on' if self._openai else 'off'}"
+
+    def _cache_get(self, kind: str, system: str, prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(ResponseCache.make_key(kind, self._cache_model_id(), system, prompt))
+
+    def _cache_put(self, kind: str, system: str, prompt: str, value: str) -> None:
+        if self.cache is not None:
+            self.cache.put(ResponseCache.make_key(kind, self._cache_model_id(), system, prompt), value)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
 
     # ---------------- Ollama helpers ----------------
     def _ollama_available(self) -> bool:
-        if requests is None:
+        if self._http is None:
             return False
+        if self._ollama_health.is_open():
+            return False
+        if not self._ollama_health.needs_probe():
+            return True
+        self.ollama_probes += 1
         try:
-            r = requests.get(self.ollama_url + "/api/tags", timeout=0.8)
-            return r.status_code == 200
+            r = self._http.get(self.ollama_url + "/api/tags", timeout=0.8)
+            ok = r.status_code == 200
         except Exception:
-            return False
+            ok = False
+        if ok:
+            self._ollama_health.record_success()
+        else:
+            self._ollama_health.record_failure()
+        return ok
 
     def _ollama_chat(self, messages: List[Dict[str, str]], json_mode: bool = False) -> Optional[str]:
         if not self._ollama_available():
@@ -51,9 +132,17 @@ class LLMProvider:
         if json_mode:
             payload["format"] = "json"
         try:
-            if requests is None:
-                return None
-            r = requests.post(self.ollama_url + "/api/chat", json=payload, timeout=60)
+            # Short connect timeout: a dead backend trips the breaker instead of stalling the command
+            r = self._http.post(self.ollama_url + "/api/chat", json=payload, timeout=(0.8, 60))
+        except requests.ConnectionError:
+            # Includes ConnectTimeout: the backend is unreachable
+            self._ollama_health.record_failure()
+            return None
+        except Exception:
+            # ReadTimeout included: a slow generation (e.g. a cold model load) is not an outage
+            return None
+        self._ollama_health.record_success()
+        try:
             if r.status_code != 200:
                 return None
             data = r.json()
@@ -62,6 +151,48 @@ class LLMProvider:
         except Exception:
             return None
 
+    def _ollama_stream(self, messages: List[Dict[str, str]], json_mode: bool = False) -> Iterator[str]:
+        """Yield content pieces from Ollama's NDJSON /api/chat stream."""
+        if not self._ollama_available():
+            return
+        payload: Dict[str, Any] = {
+            "model": self.ollama_model,
+            "messages": messages,
+            "stream": True,
+            "options": {"temperature": 0},
+        }
+        if json_mode:
+            payload["format"] = "json"
+        try:
+            r = self._http.post(self.ollama_url + "/api/chat", json=payload, stream=True, timeout=(0.8, 60))
+        except requests.ConnectionError:
+            # Includes ConnectTimeout: the backend is unreachable
+            self._ollama_health.record_failure()
+            return
+        except Exception:
+            # ReadTimeout included: a slow generation (e.g. a cold model load) is not an outage
+            return
+        self._ollama_health.record_success()
+        try:
+            if r.status_code != 200:
+                return
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                content = (data.get("message") or {}).get("content")
+                if content:
+                    yield content
+                if data.get("done"):
+                    break
+        except Exception:
+            return
+        finally:
+            r.close()
+
     # ---------------- OpenAI fallback ----------------
     def _openai_chat(self, system: str, user: str) -> Optional[str]:
         if not self._openai:
@@ -82,17 +213,68 @@ class LLMProvider:
                 continue
         return None
 
+    def _openai_stream(self, system: str, user: str) -> Iterator[str]:
+        if not self._openai:
+            return
+        for model in ("gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"):
+            yielded = False
+            try:
+                stream = self._openai.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    temperature=0,
+                    max_tokens=800,
+                    stream=True,
+                )
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yielded = True
+                        yield delta
+                return
+            except Exception:
+                # Only fall through to the next model if nothing reached the caller yet
+                if yielded:
+                    return
+                continue
+
+    # ---------------- Streaming ----------------
+    def stream_chat(self, system: str, user: str, json_mode: bool = False) -> Iterator[str]:
+        """Yield response text as it is generated: Ollama first, then OpenAI. Yields nothing if both are down."""
+        yielded = False
+        for piece in self._ollama_stream([
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ], json_mode=json_mode):
+            yielded = True
+            yield piece
+        if yielded:
+            return
+        for piece in self._openai_stream(system, user):
+            yield piece
+
     # ---------------- Public APIs ----------------
+    _PLAN_SYSTEM = (
+        "You generate a JSON array of browser actions from a natural-language command. "
+        "Only return the JSON array, nothing else. Allowed types: 'goto', 'fill', 'click', "
+        "'click_text', 'press', 'wait', 'wait_for_navigation', 'wait_for_selector', 'wait_for_text', "
+        "'screenshot'. Prefer the wait_for_* types over a fixed 'wait'. "
+        "Use 'goto' with full URL starting with http(s). "
+        "For search queries, prefer DuckDuckGo (https://duckduckgo.com/)."
+    )
+
     def plan_actions(self, command_text: str) -> str:
         """Return a JSON array string of browser actions for the given natural language command."""
-        system = (
-            "You generate a JSON array of browser actions from a natural-language command. "
-            "Only return the JSON array, nothing else. Allowed types: 'goto', 'fill', 'click', "
-            "'click_text', 'press', 'wait', 'screenshot'. Use 'goto' with full URL starting with http(s). "
-            "For search queries, prefer DuckDuckGo (https://duckduckgo.com/)."
-        )
+        system = self._PLAN_SYSTEM
         user = f"Command: {command_text}\nOutput: JSON array of actions."
 
+        cached = self._cache_get("plan_actions", system, command_text)
+        if cached:
+            return cached
+
         # 1) Try Ollama (JSON mode)
         txt = self._ollama_chat([
             {"role": "system", "content": system},
@@ -115,7 +297,9 @@ class LLMProvider:
             l = s.find("[")
             r = s.rfind("]")
             if l != -1 and r != -1 and r > l:
-                return s[l : r + 1]
+                plan = s[l : r + 1]
+                self._cache_put("plan_actions", system, command_text, plan)
+                return plan
 
         # 3) Heuristic offline plan
         lower = command_text.lower()
@@ -144,6 +328,41 @@ class LLMProvider:
             {"type": "wait", "duration": 1500},
         ])
 
+    def plan_actions_stream(self, command_text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield browser actions one at a time while the plan is still being generated,
+        so the first action can run before the LLM finishes. Falls back to
+        plan_actions() (cache, then heuristics) when streaming yields nothing.
+        """
+        system = self._PLAN_SYSTEM
+        user = f"Command: {command_text}\nOutput: JSON array of actions."
+
+        cached = self._cache_get("plan_actions", system, command_text)
+        if not cached:
+            parser = JSONArrayStream()
+            actions: List[Dict[str, Any]] = []
+            try:
+                # Keep reading after the array closes so the pooled connection is reusable
+                for piece in self.stream_chat(system, user, json_mode=True):
+                    for item in parser.feed(piece):
+                        if isinstance(item, dict) and item.get("type"):
+                            actions.append(item)
+                            yield item
+            except Exception:
+                pass
+            if actions:
+                if parser.done:
+                    self._cache_put("plan_actions", system, command_text, json.dumps(actions))
+                return
+            cached = self.plan_actions(command_text)
+        try:
+            plan = json.loads(cached)
+        except ValueError:
+            return
+        for item in plan if isinstance(plan, list) else []:
+            if isinstance(item, dict):
+                yield item
+
     def generate_code(self, language: str, prompt: str) -> str:
         """Return a minimal code snippet for the given language and prompt."""
         sys = (
@@ -152,6 +371,10 @@ class LLMProvider:
         )
         usr = f"Write {language} code for: {prompt}. Keep it minimal."
 
+        cached = self._cache_get("generate_code", sys, usr)
+        if cached:
+            return cached
+
         def _strip_code_fences(text: str) -> str:
             s = (text or "").strip()
             if "```" in s:
@@ -175,6 +398,7 @@ class LLMProvider:
         if txt:
             code = _strip_code_fences(txt)
             if code:
+                self._cache_put("generate_code", sys, usr, code)
                 return code
 
         # 2) Ollama CLI fallback
@@ -186,6 +410,7 @@ class LLMProvider:
                 raw = out.stdout.decode("utf-8", errors="ignore")
                 code = _strip_code_fences(raw)
                 if code:
+                    self._cache_put("generate_code", sys, usr, code)
                     return code
         except Exception:
             pass
@@ -195,6 +420,7 @@ class LLMProvider:
         if txt:
             code = _strip_code_fences(txt)
             if code:
+                self._cache_put("generate_code", sys, usr, code)
                 return code
 
         # Offline/heuristic default: avoid hardcoded "Hello from Jarvis".
@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Whitespace-insensitive form so 'Search for  X' and 'Search for X' share an entry.
+    Case and punctuation are kept: they change what a plan or generated code must contain.
+    """
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+class ResponseCache:
+    """
+    Persistent LLM response cache backed by a local SQLite file.
+
+    Entries are keyed by (kind, model, normalized system prompt, normalized prompt),
+    expire after ttl_seconds and are evicted least-recently-used beyond max_entries.
+    A small in-memory LRU sits in front of SQLite so repeated hits never touch disk;
+    access times are written back in batches.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 2000, memory_entries: int = 256):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".jarvis", "llm_cache.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (value, created_at, last_access)
+        self._mem: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._dirty_access: Dict[str, float] = {}
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._db.commit()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """Build the cache from JARVIS_LLM_CACHE* env vars; JARVIS_LLM_CACHE=0 disables it."""
+        setting = os.getenv("JARVIS_LLM_CACHE", "1")
+        if setting in ("0", "false", "False", ""):
+            return None
+        try:
+            return cls(
+                path=None if setting in ("1", "true", "True") else setting,
+                ttl_seconds=float(os.getenv("JARVIS_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("JARVIS_LLM_CACHE_MAX", "2000")),
+            )
+        except Exception:
+            return None
+
+    @staticmethod
+    def make_key(kind: str, model: str, system: str, prompt: str) -> str:
+        raw = json.dumps([kind, model, normalize_prompt(system), normalize_prompt(prompt)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is None:
+                try:
+                    row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                except Exception:
+                    row = None
+                if row is not None:
+                    entry = (row[0], row[1], now)
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+            self._remember(key, (entry[0], entry[1], now))
+            self._dirty_access[key] = now
+            self.hits += 1
+            if len(self._dirty_access) >= 64:
+                self._flush_access()
+            return entry[0]
+
+    def put(self, key: str, value: str) -> None:
+        if not value:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now, now))
+            self._dirty_access.pop(key, None)
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses(key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._flush_access()
+                self._evict(now)
+                self._db.commit()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except Exception:
+                size = len(self._mem)
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": size,
+                "path": self.path,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._dirty_access.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            try:
+                self._flush_access()
+                self._db.commit()
+            except Exception:
+                pass
+
+    # ---------- internals (caller holds self._lock) ----------
+    def _remember(self, key: str, entry: Tuple[str, float, float]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        self._mem.pop(key, None)
+        self._dirty_access.pop(key, None)
+        try:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+        except Exception:
+            pass
+
+    def _flush_access(self) -> None:
+        if not self._dirty_access:
+            return
+        self._db.executemany(
+            "UPDATE responses SET last_access = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._dirty_access.items()],
+        )
+        self._dirty_access.clear()
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            stale = [r[0] for r in self._db.execute(
+                "SELECT key FROM responses ORDER BY last_access ASC LIMIT ?", (overflow,)
+            ).fetchall()]
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in stale])
+            for k in stale:
+                self._mem.pop(k, None)
@@ -0,0 +1,34 @@
+"""
+Move sessions stored with the old single-document schema (one growing `events`
+array) into bucket documents. Safe to re-run; already migrated sessions are skipped.
+
+    python -m core.migrate_sessions [--limit N] [--bucket-size 200]
+"""
+import argparse
+import json
+import os
+
+from .history import SessionStore
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate legacy Jarvis sessions to bucketed event storage.")
+    parser.add_argument("--db", default="jarvis")
+    parser.add_argument("--collection", default="sessions")
+    parser.add_argument("--limit", type=int, default=None, help="migrate at most N sessions")
+    parser.add_argument("--bucket-size", type=int, default=None, help="events per bucket (JARVIS_SESSIONS_BUCKET_SIZE)")
+    args = parser.parse_args(argv)
+    if args.bucket_size:
+        os.environ["JARVIS_SESSIONS_BUCKET_SIZE"] = str(args.bucket_size)
+    # Synchronous store: nothing else is written through it
+    os.environ["JARVIS_SESSIONS_ASYNC"] = "0"
+    store = SessionStore(db_name=args.db, collection=args.collection)
+    if store._col is None:
+        print(f"MongoDB not reachable at {store.mongo_uri}")
+        return 1
+    print(json.dumps(store.migrate_legacy(limit=args.limit)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,318 @@
+"""
+Voice/API command router on top of AsyncBrowserSession, shared by main.py
+(the voice loop) and web_api.py (/api/command).
+"""
+import asyncio
+import csv
+import itertools
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .actions import ScriptTrace
+from .async_browser import AsyncBrowserSession
+from .history import SessionStore
+from .llm import LLMProvider
+from .tables import write_table_csv
+
+# DuckDuckGo result cards; search scripts wait for these instead of sleeping
+DDG_RESULTS = "[data-testid='result'], .result"
+
+
+def _search_script(query: str, timeout_ms: int = 3000) -> List[Dict[str, Any]]:
+    return [
+        {"type": "goto", "url": "https://duckduckgo.com/"},
+        {"type": "fill", "selector": "input[name='q']", "text": query},
+        {"type": "press", "key": "Enter"},
+        {"type": "wait_for_selector", "selector": DDG_RESULTS, "timeout": timeout_ms},
+    ]
+
+
+def ask_gpt_for_browser_script(llm: LLMProvider, command_text: str) -> str:
+    """Use local-first LLM to produce a JSON array of browser actions."""
+    try:
+        return llm.plan_actions(command_text)
+    except Exception:
+        # Fallback minimal search plan
+        return json.dumps(_search_script(command_text))
+
+
+def _fallback_script(command: str) -> List[Dict[str, Any]]:
+    lower = command.lower()
+    if "search" in lower:
+        query = lower.split("search", 1)[1].strip()
+        if query.startswith("for "):
+            query = query[4:]
+        return _search_script(query or command)
+    # open website/go to
+    url = "https://www.google.com"
+    for kw in ("open website", "go to"):
+        if kw in lower:
+            part = lower.split(kw, 1)[1].strip()
+            if part:
+                url = part.split()[0]
+                if not url.startswith("http"):
+                    url = f"https://{url}"
+            break
+    return [{"type": "goto", "url": url}, {"type": "wait", "duration": 1500}]
+
+
+async def handle_browser_command(session: AsyncBrowserSession, llm: LLMProvider, command: str) -> ScriptTrace:
+    # Stream the plan so the first action runs while the LLM is still generating the rest;
+    # apply_script pulls the remaining actions off the loop. LLM plans compile leniently:
+    # an invalid action is skipped (and traced) rather than failing the whole plan
+    try:
+        actions = llm.plan_actions_stream(command)
+        first = await asyncio.to_thread(next, actions, None)
+    except Exception:
+        first = None
+    if first is not None:
+        return await session.apply_script(itertools.chain([first], actions), lenient=True)
+
+    script_json = await asyncio.to_thread(ask_gpt_for_browser_script, llm, command)
+    if not script_json or (isinstance(script_json, str) and script_json.startswith("ERROR_GPT_CALL")):
+        # Fallback to offline heuristic if LLM failed
+        try:
+            script_json = json.dumps(_fallback_script(command))
+        except Exception:
+            return ScriptTrace.from_message("Sorry, I am unable to fetch browser instructions right now.")
+    # The planner's JSON text goes in as-is: a repeated (cached) plan is compiled once
+    trace = await session.apply_script(script_json, lenient=True)
+    if not trace.results and trace.message.startswith("Invalid browser script"):
+        trace.message = "Sorry, I couldn't understand the browser actions."
+    return trace
+
+
+def gather_data_to_csv(items: List[Dict[str, Any]], file_path: str) -> str:
+    if not items:
+        return "No data to save."
+    keys = sorted({k for it in items for k in it.keys()})
+    try:
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=keys)
+            writer.writeheader()
+            for it in items:
+                writer.writerow({k: it.get(k, "") for k in keys})
+        return f"Saved CSV: {file_path}"
+    except Exception as e:
+        return f"Failed to save CSV: {e}"
+
+
+def _parse_budget(text: str) -> Optional[float]:
+    """'under 50000', 'under 50,000' or 'under 50k' -> 50000.0."""
+    m = re.search(r"under\s*([\d,]+)\s*([kK]?)", text)
+    if not m:
+        return None
+    try:
+        num = float(m.group(1).replace(",", ""))
+    except ValueError:
+        return None
+    return num * 1000.0 if m.group(2) else num
+
+
+async def _run(session: AsyncBrowserSession, store: SessionStore, session_id: str,
+               script: List[Dict[str, Any]], event: Dict[str, Any]) -> ScriptTrace:
+    trace = await session.apply_script(script)
+    store.append_trace(session_id, trace, event)
+    return trace
+
+
+def _code_prompt(user_cmd: str, text: str, prefixes) -> Optional[str]:
+    for prefix in prefixes:
+        if text.startswith(prefix):
+            return user_cmd.partition(prefix)[2] if prefix in user_cmd else user_cmd[len(prefix):]
+    return None
+
+
+async def _generate_code(session: AsyncBrowserSession, llm: LLMProvider, prompt: str) -> str:
+    try:
+        lang = await session.detect_language()
+        return await asyncio.to_thread(llm.generate_code, lang, prompt)
+    except Exception:
+        return prompt
+
+
+async def _export_tables(session: AsyncBrowserSession, store: SessionStore, session_id: str) -> str:
+    tables = await session.extract_tables()
+    if not tables:
+        store.append_event(session_id, {"type": "export_csv", "paths": [], "count": 0})
+        return "No HTML tables found on this page."
+
+    async def rest(t: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Large tables come back truncated; stream the remaining rows in chunks
+        if not t.get("truncated"):
+            return []
+        return [c async for c in session.iter_table_chunks(t["index"], offset=t["offset"] + t["row_count"])]
+
+    # Truncated tables are read back concurrently
+    rests = await asyncio.gather(*(rest(t) for t in tables))
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = []
+    rows = 0
+    for t, chunks in zip(tables, rests):
+        csv_path = os.path.join(os.getcwd(), f"exported_table_{t['index'] + 1}_{stamp}.csv")
+        try:
+            rows += write_table_csv(csv_path, t, chunks)
+            paths.append(csv_path)
+        except Exception:
+            continue
+    store.append_event(session_id, {"type": "export_csv", "paths": paths, "count": rows})
+    if not paths:
+        return "Failed to save the tables to CSV."
+    return f"Saved {len(paths)} table(s), {rows} rows: " + ", ".join(paths)
+
+
+async def web_navigator(session: AsyncBrowserSession, store: SessionStore, session_id: str, user_cmd: str,
+                        llm: LLMProvider) -> str:
+    """Handle dynamic browser tasks including search, click by text, coding playground flows, and data extraction."""
+    text = user_cmd.lower()
+    store.append_event(session_id, {"type": "user", "text": user_cmd})
+
+    # Intent: top 5 laptops under X (Amazon-aware extraction if on Amazon)
+    if ("laptops" in text and ("under" in text or "top" in text)) or text.startswith("search for laptops"):
+        budget = _parse_budget(text)
+        p = await session.ensure_open()
+        # If not on amazon listing, search for it first
+        if "amazon." not in p.url or "/s?" not in p.url:
+            query = f"site:amazon.in laptops under {int(budget)}" if budget else user_cmd
+            script = _search_script(query)[:3] + [
+                {"type": "wait_for_navigation", "timeout": 2500},
+                {"type": "wait_for_text", "text": "Amazon", "timeout": 2500},
+                {"type": "click_text", "text": "Amazon"},
+                {"type": "wait_for_navigation", "timeout": 2500},
+            ]
+            await _run(session, store, session_id, script, {"type": "action", "script": script})
+
+        # DOM extraction on an Amazon listing; the text heuristic only when that finds nothing
+        items = []
+        if "amazon." in p.url:
+            items = await session.extract_amazon_laptops_top_k(5, max_price=budget, currency="INR")
+        if not items:
+            items = await session.extract_top_k_with_prices(5)
+
+        # Save CSV when there's structured data
+        csv_path = os.path.join(os.getcwd(), "laptops_top5.csv")
+        if items:
+            gather_data_to_csv(items, csv_path)
+        store.append_event(session_id, {"type": "extraction", "items": items, "budget": budget, "csv": csv_path})
+        return json.dumps({"query": user_cmd, "top5": items, "csv": csv_path}, ensure_ascii=False)
+
+    # Intent: search something (use DDG by default)
+    if text.startswith("search ") or text.startswith("search for "):
+        query = text.split("search", 1)[1].strip()
+        query = query[4:].strip() if query.startswith("for ") else query
+        script = _search_script(query, 2000)
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    # Intent: learn current site profile (editor/run/output)
+    if text.startswith("learn site") or text.startswith("profile site") or text.startswith("remember site"):
+        await _run(session, store, session_id, [{"type": "learn_site"}], {"type": "learn_site"})
+        return "Learned site profile for this page."
+
+    # Intent: click something by visible text
+    if text.startswith("click ") or text.startswith("open "):
+        target_text = user_cmd.split(" ", 1)[1] if " " in user_cmd else user_cmd
+        script = [{"type": "click_text", "text": target_text}, {"type": "wait", "duration": 1500}]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    # Intent: type code into an online compiler (generic)
+    if text.startswith("select language ") or text.startswith("choose language "):
+        lang = user_cmd.split(" ", 2)[2] if len(user_cmd.split(" ")) >= 3 else "python"
+        script = [{"type": "click_text", "text": lang}, {"type": "wait", "duration": 800}]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    if text.startswith((
+        "remove the existing code", "remove the code", "remove code", "clear code",
+        "clear the code", "delete code", "erase code",
+    )) and not text.startswith("remove the existing code and write "):
+        script = [{"type": "focus_editor"}, {"type": "clear_editor"}]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    prompt = _code_prompt(user_cmd, text, ("write code ", "type code ", "write ", "type "))
+    if prompt is None and text.endswith(" code"):
+        # Handle trailing ' code' phrasing like 'addition of two numbers code'
+        prompt = user_cmd[: -len(" code")]
+    if prompt is not None:
+        # Natural language gets turned into code; anything that already looks like code is typed as-is
+        looks_like_code = any(k in prompt for k in ("print(", "function", "def ", "#include", "public static void main"))
+        code = prompt if looks_like_code else await _generate_code(session, llm, prompt)
+        script = [
+            {"type": "focus_editor"},
+            # Type with a small delay so it looks like manual typing
+            {"type": "write_code", "text": code, "delay": 12},
+        ]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script, "generated": True}))
+
+    prompt = _code_prompt(user_cmd, text, (
+        "set code ", "rewrite code ", "replace code ", "over write code ", "overwrite code ",
+        "remove the existing code and write ",
+    ))
+    if prompt is not None:
+        looks_like_code = ";" in prompt or "print(" in prompt or "def " in prompt
+        code = prompt if looks_like_code else await _generate_code(session, llm, prompt)
+        script = [
+            {"type": "focus_editor"},
+            # Slow-typing replace: clear then type with delay for a natural look
+            {"type": "clear_editor"},
+            {"type": "type_code", "text": code, "delay": 12},
+        ]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script, "generated": True}))
+
+    if text.startswith("run code") or text.startswith("execute"):
+        script = [
+            {"type": "run_code"},
+            # Online compilers post the code and render the result: wait for the output area to update
+            {"type": "wait_for_output", "timeout": 10000},
+        ]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    # Intent: get output after running code
+    if text.startswith("get output") or text.startswith("read output") or text.startswith("show output"):
+        script = [{"type": "get_output"}]
+        return str(await _run(session, store, session_id, script, {"type": "action", "script": script}))
+
+    if text.startswith("debug"):
+        # naive: look for error text after run and attempt an auto-fix cycle if possible
+        body = await session.extract_text()
+        err_lines = [l for l in body.splitlines() if any(k in l.lower() for k in ("error", "traceback", "exception"))]
+        msg = "\n".join(err_lines[:10]) or "No obvious error found."
+        store.append_event(session_id, {"type": "debug", "info": msg})
+        # Auto-rewrite suggestion: if syntax error detected, suggest a simple Python addition template
+        if "syntax" in body.lower():
+            script = [
+                {"type": "set_code", "text": "a = 2\nb = 3\nprint(a + b)\n"},
+                {"type": "run_code"},
+                {"type": "wait_for_output", "timeout": 10000},
+            ]
+            await _run(session, store, session_id, script, {"type": "auto_fix", "script": script})
+            return f"Tried a quick fix and re-ran. Error summary was:\n{msg}"
+        return msg
+
+    # Intent: gather data and save to csv
+    if text.startswith("gather some data about "):
+        topic = user_cmd.split("gather some data about ", 1)[1]
+        script = _search_script(topic)
+        await _run(session, store, session_id, script, {"type": "action", "script": script})
+        page_info = await session.summarize_page(max_links=50, max_chars=0)
+        items = [{"text": l.get("text"), "href": l.get("href")} for l in page_info.get("links", [])]
+        csv_path = os.path.join(os.getcwd(), "gathered_data.csv")
+        msg = gather_data_to_csv(items, csv_path)
+        store.append_event(session_id, {"type": "gather", "topic": topic, "csv": csv_path, "count": len(items)})
+        return msg
+
+    # Intent: extract tables and save to CSV
+    if text.startswith("export tables") or text.startswith("extract tables"):
+        return await _export_tables(session, store, session_id)
+
+    # Intent: screenshot
+    if text.startswith("screenshot"):
+        path = os.path.join(os.getcwd(), "page.png")
+        script = [{"type": "screenshot", "path": path}]
+        return str(await _run(session, store, session_id, script, {"type": "screenshot", "path": path}))
+
+    # Default: treat like regular browser command
+    trace = await handle_browser_command(session, llm, user_cmd)
+    store.append_trace(session_id, trace, {"type": "fallback", "cmd": user_cmd})
+    return str(trace)
@@ -0,0 +1,565 @@
+"""
+In-page JavaScript snippets used by the browser sessions.
+
+Each snippet is a single function expression meant for ``page.evaluate`` so that
+a whole extraction happens in one Playwright round trip instead of a locator
+call per element.
+"""
+
+# Serialize Amazon search result cards into plain records.
+# Mirrors the per-card locator logic in BrowserSession: title from the first
+# "h2 a span" / medium title span, price from a-offscreen or whole+fraction,
+# sponsored flag and the raw h2 link href.
+AMAZON_CARDS_JS = """
+(limit) => {
+  const cards = document.querySelectorAll("div.s-main-slot [data-component-type='s-search-result']");
+  const n = Math.min(cards.length, limit || 60);
+  const text = (el) => el ? (el.innerText || el.textContent || '').trim() : '';
+  const out = [];
+  for (let i = 0; i < n; i++) {
+    const card = cards[i];
+    const titleEl = card.querySelector("h2 a span, span.a-size-medium.a-color-base.a-text-normal");
+    const offscreen = card.querySelector("span.a-price > span.a-offscreen");
+    const whole = card.querySelector("span.a-price-whole");
+    const fraction = card.querySelector("span.a-price-fraction");
+    const link = card.querySelector("h2 a");
+    const sponsored = !!card.querySelector(".s-sponsored-label-text")
+      || /sponsored/i.test(card.textContent || '');
+    out.push({
+      index: i,
+      title: titleEl ? text(titleEl) : null,
+      price_offscreen: offscreen ? text(offscreen) : null,
+      price_whole: whole ? text(whole) : null,
+      price_fraction: fraction ? text(fraction) : null,
+      sponsored: sponsored,
+      href: link ? (link.getAttribute('href') || '') : null,
+    });
+  }
+  return out;
+}
+"""
+
+# Serialize HTML tables into column arrays in one pass.
+# Rows/colspans/rowspans are expanded into a rectangular grid; header rows come
+# from <thead> or leading all-<th> rows. Expanded grids are memoized per table
+# element so row-chunk requests (opts.tableIndex/offset/limit) don't re-walk
+# the DOM for each chunk; a memo is only reused for the same maxCols and is
+# dropped by a per-table MutationObserver as soon as anything inside changes.
+TABLES_JS = """
+(opts) => {
+  opts = opts || {};
+  const maxTables = opts.maxTables || 10;
+  const maxCols = opts.maxCols || 50;
+  const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+  const memo = window.__jarvisTableGrids || (window.__jarvisTableGrids = new WeakMap());
+
+  const expand = (table) => {
+    const rows = Array.from(table.rows);
+    const cached = memo.get(table);
+    if (cached && !cached.dirty && cached.maxCols === maxCols && cached.rowCount === rows.length) return cached;
+    if (cached && cached.observer) cached.observer.disconnect();
+    const grid = [];
+    const headerFlags = [];
+    let width = 0;
+    for (let r = 0; r < rows.length; r++) {
+      const row = rows[r];
+      grid[r] = grid[r] || [];
+      headerFlags[r] = row.parentElement && row.parentElement.tagName === 'THEAD';
+      let allTh = row.cells.length > 0;
+      let c = 0;
+      for (const cell of row.cells) {
+        if (cell.tagName !== 'TH') allTh = false;
+        while (grid[r][c] !== undefined) c++;
+        const text = clean(cell.innerText !== undefined ? cell.innerText : cell.textContent);
+        const cs = Math.max(1, Math.min(cell.colSpan || 1, maxCols));
+        let rs = cell.rowSpan === 0 ? rows.length - r : (cell.rowSpan || 1);
+        rs = Math.max(1, Math.min(rs, rows.length - r));
+        for (let dr = 0; dr < rs; dr++) {
+          const target = grid[r + dr] || (grid[r + dr] = []);
+          for (let dc = 0; dc < cs; dc++) {
+            if (c + dc < maxCols) target[c + dc] = text;
+          }
+        }
+        c += cs;
+      }
+      headerFlags[r] = headerFlags[r] || false;
+      if (!headerFlags[r] && allTh && (r === 0 || headerFlags[r - 1] === true)) headerFlags[r] = true;
+      width = Math.max(width, Math.min(grid[r].length, maxCols));
+    }
+    let headerCount = 0;
+    while (headerCount < headerFlags.length && headerFlags[headerCount]) headerCount++;
+    // A table made only of header-looking rows is data, not headers.
+    if (headerCount === grid.length) headerCount = Math.min(1, grid.length - 1);
+    const headers = [];
+    for (let c = 0; c < width; c++) {
+      const parts = [];
+      for (let r = 0; r < headerCount; r++) {
+        const v = grid[r][c] || '';
+        if (v && parts[parts.length - 1] !== v) parts.push(v);
+      }
+      headers.push(parts.join(' / ') || ('col_' + (c + 1)));
+    }
+    const entry = { rowCount: rows.length, maxCols, headers, body: grid.slice(headerCount), width, dirty: false, observer: null };
+    try {
+      entry.observer = new MutationObserver(() => { entry.dirty = true; entry.observer.disconnect(); });
+      entry.observer.observe(table, { subtree: true, childList: true, characterData: true, attributes: true });
+    } catch (e) {
+      entry.dirty = true;
+    }
+    memo.set(table, entry);
+    return entry;
+  };
+
+  const columns = (entry, offset, limit) => {
+    const rows = entry.body.slice(offset, offset + limit);
+    const cols = [];
+    for (let c = 0; c < entry.width; c++) cols.push(rows.map(row => row[c] === undefined ? '' : row[c]));
+    return { cols, n: rows.length };
+  };
+
+  const describe = (table, index, offset, limit) => {
+    const entry = expand(table);
+    const { cols, n } = columns(entry, offset, limit);
+    const caption = table.caption ? clean(table.caption.textContent) : '';
+    return {
+      index, caption, headers: entry.headers, columns: cols,
+      offset, row_count: n, total_rows: entry.body.length,
+      truncated: offset + n < entry.body.length,
+    };
+  };
+
+  const tables = Array.from(document.querySelectorAll('table')).filter(t => t.rows.length > 0);
+  if (typeof opts.tableIndex === 'number') {
+    const t = tables[opts.tableIndex];
+    return t ? describe(t, opts.tableIndex, opts.offset || 0, opts.limit || 500) : null;
+  }
+  const out = [];
+  for (let i = 0; i < tables.length && out.length < maxTables; i++) {
+    out.push(describe(tables[i], i, 0, opts.maxRows || 200));
+  }
+  return out;
+}
+"""
+
+# Site profile inference for online code playgrounds, in one call.
+# Returns the editor kind (same precedence as the locator probes), run-button
+# candidates matched by text or known selector with visibility and bounding
+# boxes, and which of the given output selectors exist. Installed once per
+# context as window.__jarvisInferSite via add_init_script (SITE_PROFILE_INIT_JS);
+# INFER_SITE_JS defines it on the fly for pages loaded before that.
+_INFER_SITE_FN = """
+function (opts) {
+  opts = opts || {};
+  const runTexts = opts.runTexts || [];
+  const runSelectors = opts.runSelectors || [];
+  const outputSelectors = opts.outputSelectors || [];
+  const maxCandidates = opts.maxCandidates || 10;
+
+  const editors = [
+    ['monaco', '.monaco-editor'], ['cm5', '.CodeMirror'], ['cm6', '.cm-editor'],
+    ['ace', '.ace_editor'], ['textarea', 'textarea'], ['contenteditable', '[contenteditable="true"]'],
+  ];
+  let editorKind = null;
+  for (const [kind, sel] of editors) {
+    if (document.querySelector(sel)) { editorKind = kind; break; }
+  }
+
+  const boxOf = (el) => {
+    const r = el.getBoundingClientRect();
+    return { x: Math.round(r.x), y: Math.round(r.y), width: Math.round(r.width), height: Math.round(r.height) };
+  };
+  const isVisible = (el) => {
+    const r = el.getBoundingClientRect();
+    if (!r.width || !r.height) return false;
+    const st = getComputedStyle(el);
+    return st.visibility !== 'hidden' && st.display !== 'none' && st.opacity !== '0';
+  };
+  const labelOf = (el) => (
+    el.innerText || el.value || el.getAttribute('aria-label') || el.getAttribute('title') || el.textContent || ''
+  ).replace(/\\s+/g, ' ').trim();
+  const selectorOf = (el) => {
+    for (const sel of runSelectors) { try { if (el.matches(sel)) return sel; } catch (e) {} }
+    if (el.id && window.CSS && CSS.escape) return '#' + CSS.escape(el.id);
+    return null;
+  };
+
+  const clickable = Array.from(document.querySelectorAll(
+    'button, [role="button"], input[type="button"], input[type="submit"], a, [onclick], [aria-label], [title]'
+  ));
+  const seen = new Set();
+  const candidates = [];
+  const add = (el, text, how) => {
+    if (seen.has(el) || candidates.length >= maxCandidates) return;
+    seen.add(el);
+    candidates.push({
+      text: text, selector: selectorOf(el), how: how, tag: el.tagName.toLowerCase(),
+      label: labelOf(el).slice(0, 80), visible: isVisible(el), box: boxOf(el),
+    });
+  };
+  // Text order is the caller's priority order; exact label matches beat substrings
+  for (const text of runTexts) {
+    const needle = text.toLowerCase();
+    const hits = clickable.filter(el => labelOf(el).toLowerCase().includes(needle));
+    hits.sort((a, b) => (labelOf(b).toLowerCase() === needle) - (labelOf(a).toLowerCase() === needle));
+    for (const el of hits) add(el, text, 'text');
+  }
+  for (const sel of runSelectors) {
+    let els = [];
+    try { els = Array.from(document.querySelectorAll(sel)); } catch (e) {}
+    for (const el of els) add(el, null, 'selector');
+  }
+  candidates.sort((a, b) => (b.visible - a.visible));
+
+  const outputs = [];
+  for (const sel of outputSelectors) {
+    let el = null;
+    try { el = document.querySelector(sel); } catch (e) {}
+    if (el) outputs.push({ selector: sel, visible: isVisible(el) });
+  }
+  return { url: location.href, editorKind: editorKind, runCandidates: candidates, outputs: outputs };
+}
+"""
+
+SITE_PROFILE_INIT_JS = "window.__jarvisInferSite = " + _INFER_SITE_FN.strip() + ";"
+
+# Cheap call when the init script is installed; null means "not installed here".
+INFER_SITE_CALL_JS = "(opts) => (window.__jarvisInferSite ? window.__jarvisInferSite(opts) : null)"
+
+INFER_SITE_JS = (
+    "(opts) => (window.__jarvisInferSite || (window.__jarvisInferSite = "
+    + _INFER_SITE_FN.strip()
+    + "))(opts)"
+)
+
+# CAPTCHA / bot-challenge detection: every known selector and text signal in
+# one check. Returns the matching signal (for stats) or null.
+_CAPTCHA_DETECT_FN = """
+function () {
+  const sel = "iframe[title*='reCAPTCHA'], iframe[src*='recaptcha'], iframe[src*='challenges'], #g-recaptcha, .hcaptcha-box";
+  const hit = document.querySelector(sel);
+  if (hit) return 'selector:' + (hit.id ? '#' + hit.id : hit.tagName.toLowerCase());
+  const body = document.body;
+  const text = body ? (body.innerText || '') : '';
+  const m = text.match(/I'm not a robot|unusual traffic|verify you are human|complete a quick verification|Press & hold/i);
+  return m ? 'text:' + m[0].toLowerCase() : null;
+}
+"""
+
+CAPTCHA_CHECK_JS = "() => (" + _CAPTCHA_DETECT_FN.strip() + ")()"
+
+# Predicate for page.wait_for_function: the first call installs a
+# MutationObserver that re-checks (debounced) on DOM changes and flips a flag
+# once the challenge is gone; later calls only read that flag. Re-installed
+# automatically on the new document when solving the challenge navigates.
+CAPTCHA_GONE_JS = """
+() => {
+  let st = window.__jarvisCaptchaWatch;
+  if (!st) {
+    const detect = """ + _CAPTCHA_DETECT_FN.strip() + """;
+    st = window.__jarvisCaptchaWatch = { gone: false };
+    let pending = null;
+    const check = () => {
+      pending = null;
+      if (!detect()) { st.gone = true; obs.disconnect(); }
+    };
+    const obs = new MutationObserver(() => { if (!pending) pending = setTimeout(check, 100); });
+    obs.observe(document.documentElement || document, { childList: true, subtree: true, attributes: true, characterData: true });
+    check();
+  }
+  return st.gone;
+}
+"""
+
+# Predicate for page.wait_for_function: true once the document has gone
+# quietMs without a DOM mutation. The observer is installed on first use and
+# kept per document; a new token restarts the quiet window, so each wait
+# measures from its own start rather than from the last mutation ever seen.
+DOM_QUIET_JS = """
+({ quietMs, token }) => {
+  let st = window.__jarvisDomQuiet;
+  if (!st) {
+    st = window.__jarvisDomQuiet = { last: performance.now(), token: null };
+    new MutationObserver(() => { st.last = performance.now(); })
+      .observe(document.documentElement || document, { childList: true, subtree: true, attributes: true, characterData: true });
+  }
+  if (st.token !== token) {
+    st.token = token;
+    st.last = performance.now();
+  }
+  return document.readyState !== 'loading' && performance.now() - st.last >= quietMs;
+}
+"""
+
+# run_code arms OUTPUT_WATCH_JS just before clicking Run: a MutationObserver
+# on the first output container that exists (first of selectors; the whole
+# document if none does) counts what changes from then on. wait_for_output
+# polls OUTPUT_SETTLED_JS, true once something changed and quietMs passed
+# since the last mutation (or at once when no run was armed).
+OUTPUT_WATCH_JS = """
+(selectors) => {
+  const prev = window.__jarvisOutputWatch;
+  if (prev) prev.observer.disconnect();
+  let target = null;
+  for (const s of selectors) {
+    try { target = document.querySelector(s); } catch (e) { target = null; }
+    if (target) break;
+  }
+  const st = window.__jarvisOutputWatch = { mutations: 0, last: performance.now(), observer: null };
+  st.observer = new MutationObserver(() => { st.mutations++; st.last = performance.now(); });
+  st.observer.observe(target || document.documentElement, { childList: true, subtree: true, characterData: true });
+  return !!target;
+}
+"""
+
+OUTPUT_SETTLED_JS = """
+({ quietMs }) => {
+  const st = window.__jarvisOutputWatch;
+  if (!st) return true;
+  if (st.mutations === 0 || performance.now() - st.last < quietMs) return false;
+  st.observer.disconnect();
+  window.__jarvisOutputWatch = null;
+  return true;
+}
+"""
+
+# Programmatic editor setters, tried in this order by set_code/clear_editor.
+# Each takes the new text and returns true when it found its editor.
+SET_MONACO_JS = """
+(t) => {
+  if (window.monaco && monaco.editor) {
+    const models = monaco.editor.getModels();
+    if (models && models.length) { models[0].setValue(t); return true; }
+  }
+  // Some sites attach editor instance to window.editor
+  if (window.editor && typeof window.editor.setValue === 'function') {
+    window.editor.setValue(t); return true;
+  }
+  return false;
+}
+"""
+
+SET_CM5_JS = """
+(t) => {
+  const cmEl = document.querySelector('.CodeMirror');
+  if (cmEl && cmEl.CodeMirror) { cmEl.CodeMirror.setValue(t); return true; }
+  return false;
+}
+"""
+
+SET_CM6_JS = """
+(t) => {
+  const root = document.querySelector('.cm-editor');
+  if (!root) return false;
+  const view = root.cmView || root.view || root.__cmView || root.editorView || (root.cm && root.cm.view) || null;
+  if (view && view.state) {
+    view.dispatch({ changes: { from: 0, to: view.state.doc.length, insert: t } });
+    return true;
+  }
+  // fallback to contenteditable area
+  const editable = root.querySelector('.cm-content[contenteditable="true"]') || document.querySelector('.cm-content[contenteditable="true"]');
+  if (editable) {
+    editable.innerText = t;
+    editable.dispatchEvent(new InputEvent('input', { bubbles: true }));
+    return true;
+  }
+  return false;
+}
+"""
+
+SET_ACE_JS = """
+(t) => {
+  const aceEl = document.querySelector('.ace_editor');
+  if (!aceEl) return false;
+  const e = aceEl.env && aceEl.env.editor ? aceEl.env.editor : (window.ace && window.ace.edit ? window.ace.edit(aceEl) : null);
+  if (e && e.session && typeof e.setValue === 'function') {
+    e.setValue(t, -1);
+    return true;
+  }
+  return false;
+}
+"""
+
+# Used with eval_on_selector('textarea', ...): (el, text)
+SET_TEXTAREA_JS = "(el, t) => { el.value = t; el.dispatchEvent(new Event('input', {bubbles:true})); return true; }"
+
+SET_CONTENTEDITABLE_JS = """
+(t) => {
+  const el = document.querySelector('[contenteditable="true"]');
+  if (!el) return false;
+  el.innerText = t;
+  el.dispatchEvent(new InputEvent('input', { bubbles: true }));
+  return true;
+}
+"""
+
+# Page summary (title, URL, visible text, links, headings, form fields) in one
+# call. The document keeps the last summary's token and a dirty flag set by a
+# MutationObserver (class/style included, as they hide and show text) and by
+# input events, since typing changes no attributes; when the caller passes the
+# current token and nothing changed, only
+# {same: true} comes back and the caller reuses its copy.
+SUMMARIZE_PAGE_JS = """
+(opts) => {
+  let st = window.__jarvisSummary;
+  if (!st) {
+    st = window.__jarvisSummary = { dirty: true, token: 0, key: '' };
+    const mark = () => { st.dirty = true; };
+    try {
+      new MutationObserver(mark).observe(document, {
+        subtree: true, childList: true, characterData: true,
+        attributes: true, attributeFilter: ['href', 'hidden', 'value', 'aria-hidden', 'disabled', 'class', 'style'],
+      });
+    } catch (e) {}
+    document.addEventListener('input', mark, true);
+    document.addEventListener('change', mark, true);
+  }
+  const key = [opts.maxLinks, opts.maxChars, opts.maxHeadings, opts.maxFields].join(',');
+  if (!st.dirty && opts.token && opts.token === st.token && key === st.key) {
+    return { same: true, token: st.token };
+  }
+  const text = (el) => (el.innerText || el.textContent || '').trim();
+  const links = [];
+  const anchors = document.getElementsByTagName('a');
+  for (let i = 0; i < anchors.length && links.length < opts.maxLinks; i++) {
+    const a = anchors[i];
+    const t = text(a).slice(0, 200);
+    const href = a.getAttribute('href');
+    if (t || href) links.push({ text: t, href: href, url: href ? a.href : null });
+  }
+  const headings = [];
+  for (const h of document.querySelectorAll('h1, h2, h3')) {
+    if (headings.length >= opts.maxHeadings) break;
+    const t = text(h);
+    if (t) headings.push({ level: Number(h.tagName[1]), text: t.slice(0, 200) });
+  }
+  const labelFor = (el) => {
+    if (el.labels && el.labels.length) return text(el.labels[0]).slice(0, 100);
+    return el.getAttribute('aria-label') || '';
+  };
+  const fields = [];
+  for (const el of document.querySelectorAll('input, textarea, select')) {
+    if (fields.length >= opts.maxFields) break;
+    const type = (el.getAttribute('type') || el.tagName).toLowerCase();
+    if (type === 'hidden') continue;
+    fields.push({
+      tag: el.tagName.toLowerCase(), type: type, name: el.name || null, id: el.id || null,
+      placeholder: el.getAttribute('placeholder'), label: labelFor(el),
+      value: type === 'password' ? null : String(el.value || '').slice(0, 200),
+    });
+  }
+  const body = document.body ? (document.body.innerText || '').slice(0, opts.maxChars) : '';
+  st.dirty = false;
+  st.key = key;
+  st.token = Math.floor(Math.random() * 2147483646) + 1;
+  return {
+    token: st.token, url: location.href, title: document.title,
+    links: links, headings: headings, fields: fields, body: body,
+  };
+}
+"""
+
+# Readable main-content text without innerText (which lays out the whole
+# document). A TreeWalker over <main>/<article>/[role=main] (else <body>)
+# rejects boilerplate subtrees (nav, aside, footer, page-level header, forms,
+# hidden/aria-hidden/display:none/visibility:hidden, cookie/menu/share-style
+# class names) and groups text nodes by their nearest block element; link
+# lists and short fragments are dropped. The walker is kept in window.__jarvisReadable, so each call
+# (opts.restart on the first) continues where the previous chunk stopped and
+# returns about opts.chunkChars of {tag, text} blocks until opts.budget
+# characters have been produced.
+READABLE_TEXT_JS = """
+(opts) => {
+  opts = opts || {};
+  const BLOCK = new Set(['P', 'LI', 'H1', 'H2', 'H3', 'H4', 'H5', 'H6', 'PRE', 'BLOCKQUOTE', 'TD', 'TH',
+    'DD', 'DT', 'FIGCAPTION', 'CAPTION', 'DIV', 'SECTION', 'ARTICLE', 'MAIN', 'TABLE', 'UL', 'OL', 'DL', 'BODY']);
+  const SKIP = new Set(['NAV', 'ASIDE', 'FOOTER', 'SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'CANVAS',
+    'FORM', 'BUTTON', 'SELECT', 'TEXTAREA', 'IFRAME', 'OBJECT', 'DIALOG']);
+  const SKIP_ROLES = /^(navigation|banner|contentinfo|complementary|menu|menubar|search|dialog|alert)$/;
+  const BOILERPLATE = /(^|[\\s_-])(nav|navbar|menu|footer|sidebar|breadcrumbs?|cookies?|consent|banner|newsletter|subscribe|share|social|related|promo|advert|ads?|popup|modal)([\\s_-]|$)/i;
+  const HEADING = /^H[1-6]$/;
+
+  let st = window.__jarvisReadable;
+  if (opts.restart || !st) {
+    const root = document.querySelector('main, article, [role=main]') || document.body || document.documentElement;
+    const reject = (el) => {
+      if (el === root) return false;
+      if (SKIP.has(el.tagName) || el.hidden || el.getAttribute('aria-hidden') === 'true') return true;
+      // display:none / visibility:hidden (display:contents has no box but its children render)
+      if (el.checkVisibility && !el.checkVisibility({ visibilityProperty: true })
+          && getComputedStyle(el).display !== 'contents') return true;
+      if (el.tagName === 'HEADER' && !el.closest('article, main')) return true;
+      const role = el.getAttribute('role');
+      if (role && SKIP_ROLES.test(role)) return true;
+      const cls = typeof el.className === 'string' ? el.className : '';
+      return BOILERPLATE.test(cls + ' ' + (el.id || ''));
+    };
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+      acceptNode: (n) => n.nodeType === Node.TEXT_NODE ? NodeFilter.FILTER_ACCEPT
+        : (reject(n) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_SKIP),
+    });
+    st = window.__jarvisReadable = {
+      walker, root, budget: opts.budget || 4000, minChars: opts.minChars || 25,
+      chars: 0, done: false, block: null, parts: [], linkChars: 0, places: new WeakMap(),
+    };
+  }
+  // Nearest block ancestor of a text node's parent, and whether a link lies in between (memoised per parent)
+  const place = (el) => {
+    let p = st.places.get(el);
+    if (!p) {
+      let block = el, link = false;
+      while (block !== st.root && !BLOCK.has(block.tagName)) {
+        if (block.tagName === 'A') link = true;
+        block = block.parentElement || st.root;
+      }
+      p = { block, link };
+      st.places.set(el, p);
+    }
+    return p;
+  };
+  // The pending block as {tag, text}, or null when it does not pass the filters
+  const flush = () => {
+    const block = st.block;
+    if (!block) return null;
+    const pre = block.tagName === 'PRE';
+    let text = st.parts.join(pre ? '' : ' ');
+    text = pre ? text.replace(/^\\n+|\\s+$/g, '') : text.replace(/\\s+/g, ' ').trim();
+    const linkShare = text ? st.linkChars / text.length : 0;
+    st.block = null;
+    st.parts = [];
+    st.linkChars = 0;
+    if (!text) return null;
+    if (!HEADING.test(block.tagName) && (text.length < st.minChars || (linkShare > 0.5 && text.length < 300))) return null;
+    return { tag: block.tagName.toLowerCase(), text };
+  };
+
+  const chunk = opts.chunkChars || 1000;
+  const out = [];
+  let size = 0;
+  const emit = (b) => {
+    if (!b || st.chars >= st.budget) return;
+    if (st.chars + b.text.length > st.budget) b.text = b.text.slice(0, st.budget - st.chars);
+    st.chars += b.text.length;
+    size += b.text.length;
+    out.push(b);
+  };
+  while (!st.done && size < chunk && st.chars < st.budget) {
+    const node = st.walker.nextNode();
+    if (!node) {
+      emit(flush());
+      st.done = true;
+      break;
+    }
+    if (node.nodeType !== Node.TEXT_NODE || !node.parentElement) continue;
+    const value = node.nodeValue;
+    if (!value || !value.trim()) continue;
+    const { block, link } = place(node.parentElement);
+    if (block !== st.block) {
+      emit(flush());
+      st.block = block;
+    }
+    st.parts.push(value);
+    if (link) st.linkChars += value.trim().length;
+  }
+  return { blocks: out, chars: st.chars, done: st.done || st.chars >= st.budget };
+}
+"""
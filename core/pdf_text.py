@@ -0,0 +1,335 @@
+from __future__ import annotations
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Pages read in this process before any pool work; a typical research budget
+# is met within them, so most PDFs never touch the pool
+INLINE_PAGES = 4
+# Smallest pool task; larger documents get about two tasks per worker
+MIN_TASK_PAGES = 4
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _workers() -> int:
+    try:
+        return max(1, int(os.getenv("JARVIS_PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1))
+    except ValueError:
+        return 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs Playwright/asyncio threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); runs in a pool process, so it opens the file itself."""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    out = []
+    for i in range(start, min(stop, len(reader.pages))):
+        try:
+            out.append(reader.pages[i].extract_text() or "")
+        except Exception:
+            out.append("")
+    return out
+
+
+@dataclass
+class PdfText:
+    text: str
+    pages_read: int
+    page_count: int
+    sha256: str = ""
+    # text was cut at the budget (the last page read may end with the cut)
+    truncated: bool = False
+
+    @property
+    def complete(self) -> bool:
+        return self.pages_read >= self.page_count and not self.truncated
+
+
+def extract_pdf_text(path: str, budget: int = 4000, pool: Optional[ProcessPoolExecutor] = None) -> PdfText:
+    """
+    Text of the PDF at path, page by page, stopping once budget characters are
+    in hand (budget <= 0 reads everything). The first INLINE_PAGES pages are
+    read here; the rest go to a process pool in page-ordered tasks, at most one
+    in flight per worker, so an early stop wastes little work.
+    """
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    limit = budget if budget > 0 else float("inf")
+    pages: List[str] = []
+    size = 0
+
+    def take(texts: List[str]) -> bool:
+        nonlocal size
+        for t in texts:
+            pages.append(t)
+            size += len(t)
+            if size >= limit:
+                return True
+        return False
+
+    stop = False
+    for i in range(min(INLINE_PAGES, page_count)):
+        try:
+            stop = take([reader.pages[i].extract_text() or ""])
+        except Exception:
+            stop = take([""])
+        if stop:
+            break
+    rest = page_count - len(pages)
+    if not stop and rest > 0:
+        workers = _workers()
+        task = max(MIN_TASK_PAGES, -(-rest // (2 * workers)))
+        pool = pool or _get_pool()
+        starts = iter(range(len(pages), page_count, task))
+        pending: Dict[int, Future] = {}
+        done_pages: Dict[int, List[str]] = {}
+        next_start = len(pages)
+        try:
+            while not stop:
+                while len(pending) < workers:
+                    start = next(starts, None)
+                    if start is None:
+                        break
+                    pending[start] = pool.submit(_extract_pages, path, start, start + task)
+                if not pending:
+                    break
+                wait(list(pending.values()), return_when=FIRST_COMPLETED)
+                for start in [s for s, f in pending.items() if f.done()]:
+                    done_pages[start] = pending.pop(start).result()
+                # Consume finished tasks in page order
+                while next_start in done_pages and not stop:
+                    stop = take(done_pages.pop(next_start))
+                    next_start += task
+        finally:
+            for f in pending.values():
+                f.cancel()
+    text = "\n".join(pages)
+    truncated = 0 < budget < len(text)
+    return PdfText(text=text[:budget] if truncated else text, pages_read=len(pages), page_count=page_count,
+                   truncated=truncated)
+
+
+class PdfTextCache:
+    """
+    Extracted PDF text in a local SQLite file, keyed by content hash, with a
+    URL -> hash index so a known URL skips the download (until ttl_seconds)
+    and the same document under another URL skips the extraction.
+    A partial extraction (pages left unread, or text cut at the budget) only
+    answers requests for up to as much text as it holds.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".jarvis", "pdf_text.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_text ("
+            " sha256 TEXT PRIMARY KEY, text TEXT NOT NULL, pages_read INTEGER NOT NULL,"
+            " page_count INTEGER NOT NULL, truncated INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS pdf_urls (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pdf_text)")}
+        if "truncated" not in columns:
+            # Older rows did not record a cut at the budget: treat them as possibly cut
+            self._db.execute("ALTER TABLE pdf_text ADD COLUMN truncated INTEGER NOT NULL DEFAULT 1")
+        self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["PdfTextCache"]:
+        """JARVIS_PDF_CACHE (default on, '0' disables, other values are the file path), JARVIS_PDF_CACHE_TTL."""
+        setting = os.getenv("JARVIS_PDF_CACHE", "1")
+        if setting in ("0", "false", "False", ""):
+            return None
+        try:
+            return cls(
+                path=None if setting in ("1", "true", "True") else setting,
+                ttl_seconds=float(os.getenv("JARVIS_PDF_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        except Exception:
+            return None
+
+    def _row(self, sha256: str, budget: int) -> Optional[PdfText]:
+        row = self._db.execute("SELECT text, pages_read, page_count, truncated FROM pdf_text WHERE sha256 = ?",
+                               (sha256,)).fetchone()
+        if row is None:
+            return None
+        text, pages_read, page_count, truncated = row
+        hit = PdfText(text=text, pages_read=pages_read, page_count=page_count, sha256=sha256, truncated=bool(truncated))
+        if not hit.complete and (budget <= 0 or len(text) < budget):
+            return None
+        if 0 < budget < len(text):
+            hit.text, hit.truncated = text[:budget], True
+        return hit
+
+    def by_url(self, url: str, budget: int) -> Optional[PdfText]:
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT sha256, fetched_at FROM pdf_urls WHERE url = ?", (url,)).fetchone()
+                hit = self._row(row[0], budget) if row and time.time() - row[1] <= self.ttl_seconds else None
+            except Exception:
+                hit = None
+            # A miss here is counted by the by_hash lookup that follows the download
+            if hit is not None:
+                self.hits += 1
+            return hit
+
+    def by_hash(self, url: str, sha256: str, budget: int) -> Optional[PdfText]:
+        with self._lock:
+            try:
+                hit = self._row(sha256, budget)
+                if hit is not None:
+                    self._remember_url(url, sha256)
+            except Exception:
+                hit = None
+            self._count(hit)
+            return hit
+
+    def put(self, url: str, result: PdfText) -> None:
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pdf_text(sha256, text, pages_read, page_count, truncated, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (result.sha256, result.text, result.pages_read, result.page_count, int(result.truncated), time.time()),
+                )
+                self._remember_url(url, result.sha256)
+            except Exception:
+                pass
+
+    def _remember_url(self, url: str, sha256: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO pdf_urls(url, sha256, fetched_at) VALUES (?, ?, ?)", (url, sha256, time.time()))
+        self._db.commit()
+
+    def _count(self, hit: Optional[PdfText]) -> None:
+        if hit is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                size = self._db.execute("SELECT COUNT(*) FROM pdf_text").fetchone()[0]
+            except Exception:
+                size = 0
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": (self.hits / total) if total else 0.0,
+                    "documents": size, "path": self.path}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM pdf_text")
+            self._db.execute("DELETE FROM pdf_urls")
+            self._db.commit()
+
+
+_default_cache: Optional[PdfTextCache] = None
+_default_cache_loaded = False
+
+
+def default_cache() -> Optional[PdfTextCache]:
+    global _default_cache, _default_cache_loaded
+    if not _default_cache_loaded:
+        _default_cache = PdfTextCache.from_env()
+        _default_cache_loaded = True
+    return _default_cache
+
+
+def _save(body: bytes) -> Tuple[str, str]:
+    """Body to a temp file in 1 MB writes, hashing as it goes -> (path, sha256)."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="jarvis-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        view = memoryview(body)
+        for i in range(0, len(view), 1 << 20):
+            part = view[i:i + (1 << 20)]
+            digest.update(part)
+            f.write(part)
+    return path, digest.hexdigest()
+
+
+async def fetch_pdf_text(request, url: str, budget: int = 4000, cache: Optional[PdfTextCache] = None,
+                         timeout_ms: int = 30000) -> Dict[str, Any]:
+    """
+    Download url through a Playwright APIRequestContext (page.context.request, so
+    the browser's cookies apply) and extract up to budget characters of text.
+    Returns {url, text, pages_read, page_count, sha256, cached}, or {url, error}.
+    JARVIS_PDF_MAX_MB (default 25) caps the download.
+    """
+    cache = cache if cache is not None else default_cache()
+    if cache is not None:
+        hit = await asyncio.to_thread(cache.by_url, url, budget)
+        if hit is not None:
+            return {"url": url, **asdict(hit), "cached": True}
+    try:
+        response = await request.get(url, timeout=timeout_ms)
+    except Exception as e:
+        return {"url": url, "error": f"download failed: {e}"}
+    try:
+        if not response.ok:
+            return {"url": url, "error": f"HTTP {response.status}"}
+        max_bytes = int(float(os.getenv("JARVIS_PDF_MAX_MB", "25")) * 1024 * 1024)
+        try:
+            length = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            length = 0
+        if length > max_bytes:
+            return {"url": url, "error": f"PDF too large ({length} bytes)"}
+        try:
+            body = await response.body()
+        except Exception as e:
+            return {"url": url, "error": f"download failed: {e}"}
+    finally:
+        await response.dispose()
+    if not body.lstrip()[:5].startswith(b"%PDF"):
+        return {"url": url, "error": "not a PDF"}
+    if len(body) > max_bytes:
+        return {"url": url, "error": f"PDF too large ({len(body)} bytes)"}
+
+    path, sha256 = await asyncio.to_thread(_save, body)
+    del body
+    try:
+        if cache is not None:
+            hit = await asyncio.to_thread(cache.by_hash, url, sha256, budget)
+            if hit is not None:
+                return {"url": url, **asdict(hit), "cached": True}
+        try:
+            result = await asyncio.to_thread(extract_pdf_text, path, budget)
+        except Exception as e:
+            return {"url": url, "error": f"extraction failed: {e}"}
+        result.sha256 = sha256
+        if cache is not None:
+            await asyncio.to_thread(cache.put, url, result)
+        return {"url": url, **asdict(result), "cached": False}
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
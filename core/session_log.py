@@ -0,0 +1,286 @@
+import os
+import glob
+import gzip
+import json
+import mmap
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def _event_ts(obj: Dict[str, Any]) -> Optional[str]:
+    return obj.get("ts") or obj.get("endedAt") or (obj.get("doc") or {}).get("createdAt")
+
+
+def _first_line(path: str, compressed: bool) -> Optional[bytes]:
+    try:
+        opener = gzip.open if compressed else open
+        with opener(path, "rb") as f:
+            line = f.readline(1 << 20)
+    except Exception:
+        return None
+    return line if line.endswith(b"\n") else None
+
+
+class SessionLogReader:
+    """
+    Read side for the sessions.jsonl log written by SessionStore.
+
+    A sidecar SQLite index (<log>.idx) maps every line to its segment, byte
+    offset and length together with sessionId, type and ts, so lookups by
+    session, event type or time range read only the matching lines (through
+    mmap for plain files). The index is brought up to date on every query by
+    indexing just the bytes appended since the last call.
+
+    Rotated segments next to the log (sessions.jsonl.1, sessions.jsonl.2.gz,
+    sessions.jsonl.2024-05-01, ...) are included. Segments are identified by a
+    hash of their first line, so a rename or gzip of an already indexed file
+    keeps its index entries; offsets always refer to the uncompressed bytes.
+    """
+
+    INDEX_SUFFIX = ".idx"
+
+    def __init__(self, path: Optional[str] = None, index_path: Optional[str] = None):
+        self.path = path or os.getenv("JARVIS_SESSIONS_FILE", os.path.join(os.getcwd(), "sessions.jsonl"))
+        self.index_path = index_path or self.path + self.INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._gz_cache: Tuple[Optional[str], float, bytes] = (None, 0.0, b"")
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " id INTEGER PRIMARY KEY, fingerprint TEXT UNIQUE NOT NULL, path TEXT NOT NULL,"
+            " compressed INTEGER NOT NULL, indexed_bytes INTEGER NOT NULL, mtime REAL NOT NULL, first_ts TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lines ("
+            " segment INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,"
+            " session_id TEXT, type TEXT, ts TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS lines_session ON lines(session_id, segment, offset)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS lines_ts ON lines(ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS lines_pos ON lines(segment, offset)")
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---------- public API ----------
+    def refresh(self) -> int:
+        """Index whatever was appended, rotated or compressed since the last call; returns new lines indexed."""
+        with self._lock:
+            return self._refresh()
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """One entry per session id: event count and first/last timestamps."""
+        with self._lock:
+            self._refresh()
+            rows = self._db.execute(
+                "SELECT session_id, COUNT(*), MIN(ts), MAX(ts) FROM lines"
+                " WHERE session_id IS NOT NULL GROUP BY session_id ORDER BY MIN(ts)"
+            ).fetchall()
+        return [{"sessionId": r[0], "lines": r[1], "firstTs": r[2], "lastTs": r[3]} for r in rows]
+
+    def session(self, session_id: str) -> List[Dict[str, Any]]:
+        """Every entry (start, events, end) of one session, in log order."""
+        return list(self.events(session_id=session_id))
+
+    def events(
+        self,
+        session_id: Optional[str] = None,
+        types: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Entries matching all given filters, oldest first. since/until are inclusive ISO timestamps."""
+        with self._lock:
+            self._refresh()
+            rows = self._select(session_id, types, since, until, limit, newest_first=False)
+        return self._load(rows)
+
+    def tail(self, n: int = 20, session_id: Optional[str] = None, types: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """The n most recent entries (optionally of one session / event types), oldest first."""
+        with self._lock:
+            self._refresh()
+            rows = self._select(session_id, types, None, None, n, newest_first=True)
+        rows.reverse()
+        return list(self._load(rows))
+
+    # ---------- indexing ----------
+    def _segment_files(self) -> List[str]:
+        files = [self.path] if os.path.exists(self.path) else []
+        for p in sorted(glob.glob(glob.escape(self.path) + ".*")):
+            if self.INDEX_SUFFIX in p[len(self.path):]:
+                continue
+            files.append(p)
+        return files
+
+    def _refresh(self) -> int:
+        added = 0
+        seen = set()
+        for path in self._segment_files():
+            compressed = path.endswith(".gz")
+            first = _first_line(path, compressed)
+            if first is None:
+                # Empty or still writing its first line
+                continue
+            fingerprint = hashlib.sha1(first).hexdigest()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            row = self._db.execute(
+                "SELECT id, path, compressed, indexed_bytes, mtime FROM segments WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None:
+                try:
+                    first_ts = _event_ts(json.loads(first))
+                except ValueError:
+                    first_ts = None
+                cur = self._db.execute(
+                    "INSERT INTO segments(fingerprint, path, compressed, indexed_bytes, mtime, first_ts) VALUES (?, ?, ?, 0, 0, ?)",
+                    (fingerprint, path, int(compressed), first_ts),
+                )
+                row = (cur.lastrowid, path, int(compressed), 0, 0.0)
+            seg_id, _old_path, _old_compressed, indexed, old_mtime = row
+            if compressed and indexed and mtime == old_mtime:
+                # Compressed segments don't grow; nothing new unless the file was replaced
+                self._db.execute("UPDATE segments SET path = ?, compressed = 1 WHERE id = ?", (path, seg_id))
+                continue
+            n, indexed = self._index_segment(seg_id, path, compressed, indexed)
+            added += n
+            self._db.execute(
+                "UPDATE segments SET path = ?, compressed = ?, indexed_bytes = ?, mtime = ? WHERE id = ?",
+                (path, int(compressed), indexed, mtime, seg_id),
+            )
+        # Segments that disappeared (deleted after rotation) drop out of the index
+        for seg_id, fingerprint in self._db.execute("SELECT id, fingerprint FROM segments").fetchall():
+            if fingerprint not in seen:
+                self._db.execute("DELETE FROM lines WHERE segment = ?", (seg_id,))
+                self._db.execute("DELETE FROM segments WHERE id = ?", (seg_id,))
+        self._db.commit()
+        return added
+
+    def _index_segment(self, seg_id: int, path: str, compressed: bool, start: int) -> Tuple[int, int]:
+        if compressed:
+            data = self._read_gz(path)
+            size = len(data)
+        else:
+            size = os.path.getsize(path)
+            data = None
+        if size < start:
+            # Truncated in place: start this segment over
+            self._db.execute("DELETE FROM lines WHERE segment = ?", (seg_id,))
+            start = 0
+        if size == start:
+            return 0, start
+        if data is not None:
+            return self._index_bytes(seg_id, data, start)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return self._index_bytes(seg_id, mm, start)
+
+    def _index_bytes(self, seg_id: int, buf, start: int) -> Tuple[int, int]:
+        rows = []
+        pos = start
+        end = len(buf)
+        while pos < end:
+            nl = buf.find(b"\n", pos)
+            if nl == -1:
+                # Partial last line: picked up on the next refresh
+                break
+            line = buf[pos:nl]
+            if line.strip():
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    obj = None
+                if isinstance(obj, dict):
+                    rows.append((seg_id, pos, nl - pos, obj.get("sessionId"), obj.get("type"), _event_ts(obj)))
+            pos = nl + 1
+        if rows:
+            self._db.executemany(
+                "INSERT INTO lines(segment, offset, length, session_id, type, ts) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows), pos
+
+    # ---------- reading ----------
+    def _select(self, session_id, types, since, until, limit, newest_first: bool) -> List[Tuple[int, int, int]]:
+        # One query per segment (few of them) so SQLite walks (segment, offset) or
+        # (session_id, segment, offset) in order and stops at the limit instead of sorting everything
+        clauses: List[str] = ["segment = ?"]
+        params: List[Any] = []
+        if session_id:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if types:
+            clauses.append("type IN (%s)" % ",".join("?" * len(types)))
+            params.extend(types)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until:
+            clauses.append("ts <= ?")
+            params.append(until)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT segment, offset, length FROM lines WHERE {' AND '.join(clauses)} ORDER BY offset {order}"
+        segments = self._db.execute(f"SELECT id FROM segments ORDER BY first_ts {order}, id {order}").fetchall()
+        out: List[Tuple[int, int, int]] = []
+        for (seg_id,) in segments:
+            remaining = (limit - len(out)) if limit else None
+            if remaining is not None and remaining <= 0:
+                break
+            q = sql + (f" LIMIT {int(remaining)}" if remaining is not None else "")
+            out.extend(self._db.execute(q, [seg_id] + params).fetchall())
+        return out
+
+    def _read_gz(self, path: str) -> bytes:
+        mtime = os.path.getmtime(path)
+        cached_path, cached_mtime, data = self._gz_cache
+        if cached_path == path and cached_mtime == mtime:
+            return data
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+        self._gz_cache = (path, mtime, data)
+        return data
+
+    def _load(self, rows: List[Tuple[int, int, int]]) -> Iterator[Dict[str, Any]]:
+        if not rows:
+            return iter(())
+        with self._lock:
+            segs = {r[0]: (r[1], bool(r[2])) for r in self._db.execute("SELECT id, path, compressed FROM segments")}
+        return self._iter_rows(rows, segs)
+
+    def _iter_rows(self, rows, segs) -> Iterator[Dict[str, Any]]:
+        i = 0
+        while i < len(rows):
+            seg_id = rows[i][0]
+            j = i
+            while j < len(rows) and rows[j][0] == seg_id:
+                j += 1
+            path, compressed = segs.get(seg_id, (None, False))
+            if path is not None:
+                for obj in self._read_lines(path, compressed, rows[i:j]):
+                    yield obj
+            i = j
+
+    def _read_lines(self, path: str, compressed: bool, rows) -> Iterator[Dict[str, Any]]:
+        try:
+            if compressed:
+                with self._lock:
+                    data = self._read_gz(path)
+                for _seg, off, length in rows:
+                    yield json.loads(data[off:off + length])
+                return
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for _seg, off, length in rows:
+                    yield json.loads(mm[off:off + length])
+        except (OSError, ValueError):
+            # Segment rotated or removed between indexing and reading; the next refresh fixes the index
+            return
@@ -1,7 +1,19 @@
 from __future__ import annotations
+import os
+import json
+import time
+import threading
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 
+from .page_scripts import INFER_SITE_CALL_JS, INFER_SITE_JS
+
+
+def origin_of(url: str) -> str:
+    from urllib.parse import urlparse
+    url = url or "about:blank"
+    return f"{urlparse(url).scheme}://{urlparse(url).netloc}" if "://" in url else url
+
 
 @dataclass
 class SiteProfile:
@@ -15,6 +27,14 @@ class SiteProfile:
         ".output", "#output", "pre.output", "pre", ".terminal", ".console",
         "#console", ".result", "#result", "textarea[readonly]", ".output-window"
     ])
+    # What actually worked last time on this origin; tried before anything else
+    run_text: Optional[str] = None
+    output_selector: Optional[str] = None
+    # Consecutive misses per learned field ('run_selector', 'run_text', 'output_selector')
+    misses: Dict[str, int] = field(default_factory=dict)
+    updated_at: float = 0.0
+    # Run-button candidates seen by the last inference (text, selector, visible, box); not persisted
+    run_candidates: List[Dict[str, Any]] = field(default_factory=list, repr=False)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -23,14 +43,93 @@ class SiteProfile:
             "run_selector": self.run_selector,
             "run_texts": self.run_texts,
             "output_selectors": self.output_selectors,
+            "run_text": self.run_text,
+            "output_selector": self.output_selector,
+            "misses": self.misses,
+            "updated_at": self.updated_at,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "SiteProfile":
+        prof = SiteProfile(origin=data.get("origin") or "")
+        for key in ("editor_kind", "run_selector", "run_text", "output_selector"):
+            if data.get(key):
+                setattr(prof, key, data[key])
+        if data.get("run_texts"):
+            prof.run_texts = list(data["run_texts"])
+        if data.get("output_selectors"):
+            prof.output_selectors = list(data["output_selectors"])
+        prof.misses = dict(data.get("misses") or {})
+        prof.updated_at = float(data.get("updated_at") or 0.0)
+        return prof
+
+    @staticmethod
+    def infer(page, preloaded: bool = False) -> "SiteProfile":
+        """
+        Learn editor kind, run control and output containers in one page.evaluate.
+        preloaded=True means SITE_PROFILE_INIT_JS is installed on the context, so
+        only a short call is sent. Falls back to infer_probes() if the script fails.
+        """
+        opts = SiteProfile._infer_opts()
+        data = None
+        try:
+            if preloaded:
+                data = page.evaluate(INFER_SITE_CALL_JS, opts)
+            if data is None:
+                data = page.evaluate(INFER_SITE_JS, opts)
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            return SiteProfile.infer_probes(page)
+        return SiteProfile.from_inference(origin_of(page.url), data)
+
+    @staticmethod
+    async def ainfer(page, preloaded: bool = False) -> "SiteProfile":
+        """infer() for a playwright.async_api page. Without a script result the profile keeps its defaults."""
+        opts = SiteProfile._infer_opts()
+        data = None
+        try:
+            if preloaded:
+                data = await page.evaluate(INFER_SITE_CALL_JS, opts)
+            if data is None:
+                data = await page.evaluate(INFER_SITE_JS, opts)
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            return SiteProfile(origin=origin_of(page.url))
+        return SiteProfile.from_inference(origin_of(page.url), data)
+
+    @staticmethod
+    def _infer_opts() -> Dict[str, Any]:
+        return {
+            "runTexts": ["Run Code", "Run", "Execute", "Compile", "▶", "Play", "Submit", "Start"],
+            "runSelectors": ["button.run", "#run", ".run-btn", "[aria-label='Run']"],
+            "outputSelectors": list(SiteProfile(origin="").output_selectors),
         }
 
     @staticmethod
-    def infer(page) -> "SiteProfile":
-        from urllib.parse import urlparse
-        url = page.url or "about:blank"
-        origin = f"{urlparse(url).scheme}://{urlparse(url).netloc}" if "://" in url else url
+    def from_inference(origin: str, data: Dict[str, Any]) -> "SiteProfile":
+        """Build a profile from the INFER_SITE_JS result."""
         prof = SiteProfile(origin=origin)
+        prof.editor_kind = data.get("editorKind")
+        candidates = data.get("runCandidates") or []
+        prof.run_candidates = candidates
+        if candidates:
+            best = candidates[0]
+            if best.get("text"):
+                # Found text goes first so run_code tries it before the generic list
+                prof.run_texts = [best["text"]] + [t for t in prof.run_texts if t != best["text"]]
+            prof.run_selector = best.get("selector")
+        present = data.get("outputs") or []
+        if present:
+            visible = [o["selector"] for o in present if o.get("visible")]
+            prof.output_selectors = visible + [o["selector"] for o in present if not o.get("visible")]
+        return prof
+
+    @staticmethod
+    def infer_probes(page) -> "SiteProfile":
+        """Locator-by-locator inference (one round trip per probe); fallback for infer()."""
+        prof = SiteProfile(origin=origin_of(page.url))
 
         # Detect editor kind
         try:
@@ -91,3 +190,108 @@ class SiteProfile:
             pass
 
         return prof
+
+
+class SiteProfileStore:
+    """
+    Learned SiteProfiles persisted as JSON, keyed by origin.
+
+    BrowserSession loads the profile for the current origin after every goto and
+    reports back which run/output selectors actually worked (record_win) or
+    stopped matching (record_miss). A learned field is dropped after max_misses
+    consecutive misses so a redesigned site falls back to the generic probes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_misses: int = 2):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".jarvis", "site_profiles.json")
+        self.max_misses = max(1, max_misses)
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, SiteProfile] = {}
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["SiteProfileStore"]:
+        """JARVIS_SITE_PROFILES=0 disables persistence; any other value is used as the file path."""
+        setting = os.getenv("JARVIS_SITE_PROFILES", "1")
+        if setting in ("0", "false", "False", ""):
+            return None
+        try:
+            return cls(
+                path=None if setting in ("1", "true", "True") else setting,
+                max_misses=int(os.getenv("JARVIS_SITE_PROFILE_MAX_MISSES", "2")),
+            )
+        except Exception:
+            return None
+
+    def get(self, origin: str) -> Optional[SiteProfile]:
+        with self._lock:
+            return self._profiles.get(origin)
+
+    def put(self, profile: SiteProfile) -> None:
+        with self._lock:
+            old = self._profiles.get(profile.origin)
+            if old is not None and old is not profile:
+                # Re-learning keeps winners we already confirmed on this origin
+                profile.run_text = profile.run_text or old.run_text
+                profile.output_selector = profile.output_selector or old.output_selector
+            profile.updated_at = time.time()
+            self._profiles[profile.origin] = profile
+            self._save()
+
+    def forget(self, origin: str) -> None:
+        with self._lock:
+            if self._profiles.pop(origin, None) is not None:
+                self._save()
+
+    def record_win(self, profile: SiteProfile, key: str, value: str) -> None:
+        """Remember that `value` worked for `key` ('run_selector', 'run_text' or 'output_selector')."""
+        with self._lock:
+            changed = getattr(profile, key) != value or profile.misses.get(key)
+            setattr(profile, key, value)
+            profile.misses.pop(key, None)
+            if profile.origin not in self._profiles:
+                self._profiles[profile.origin] = profile
+                changed = True
+            if changed:
+                profile.updated_at = time.time()
+                self._save()
+
+    def record_miss(self, profile: SiteProfile, key: str) -> bool:
+        """Count a miss for a learned field; returns True when the field was invalidated."""
+        with self._lock:
+            if not getattr(profile, key):
+                return False
+            profile.misses[key] = profile.misses.get(key, 0) + 1
+            dropped = profile.misses[key] >= self.max_misses
+            if dropped:
+                setattr(profile, key, None)
+                profile.misses.pop(key, None)
+            if profile.origin in self._profiles:
+                profile.updated_at = time.time()
+                self._save()
+            return dropped
+
+    # ---------- persistence (caller holds self._lock) ----------
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        for origin, raw in (data.get("profiles") or {}).items():
+            try:
+                self._profiles[origin] = SiteProfile.from_dict({**raw, "origin": origin})
+            except Exception:
+                continue
+
+    def _save(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "profiles": {o: p.to_dict() for o, p in self._profiles.items()}}, f, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
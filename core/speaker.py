@@ -1,3 +1,4 @@
+import re
 import pyttsx3
 
 engine = pyttsx3.init()
@@ -6,3 +7,24 @@ def speak(text):
     print(f"🤖 Jarvis: {text}")
     engine.say(text)
     engine.runAndWait()
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def speak_stream(pieces):
+    """Speak streamed text sentence by sentence as it arrives. Returns False if nothing was spoken."""
+    spoken = False
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        parts = _SENTENCE_END.split(buf)
+        buf = parts.pop()
+        for sentence in parts:
+            if sentence.strip():
+                speak(sentence.strip())
+                spoken = True
+    if buf.strip():
+        speak(buf.strip())
+        spoken = True
+    return spoken
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import csv
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def table_rows(table: Dict[str, Any]) -> List[List[str]]:
+    """Turn a columnar table/chunk ({headers, columns, row_count}) back into rows."""
+    cols = table.get("columns") or []
+    n = int(table.get("row_count") or (len(cols[0]) if cols else 0))
+    return [[col[r] if r < len(col) else "" for col in cols] for r in range(n)]
+
+
+def iter_rows(chunks: Iterable[Dict[str, Any]]) -> Iterator[List[str]]:
+    for chunk in chunks:
+        for row in table_rows(chunk):
+            yield row
+
+
+def write_table_csv(path: str, table: Dict[str, Any], more_chunks: Iterable[Dict[str, Any]] = ()) -> int:
+    """Write a table (and any further row chunks of it) to CSV. Returns the number of data rows written."""
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.get("headers") or [])
+        for row in iter_rows(_chain(table, more_chunks)):
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def _chain(first: Dict[str, Any], rest: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    yield first
+    yield from rest
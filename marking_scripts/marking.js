@@ -1,52 +1,249 @@
-function captureInteractiveElements() {
-  const results = [];
-  const toRect = (el) => (el.getBoundingClientRect ? el.getBoundingClientRect() : {x:0,y:0});
-  const pushEl = (el, type, description) => {
+// Interactive-element capture, installed once per document as window.__jarvisMarking
+// (web_agents registers it as a context init script).
+//   capture(opts) -> the matches, indexed 0..n-1 in document order
+//   changes(opts) -> {full, added, removed, moved} since the previous capture()/changes()
+//                    of what capture() reported: a MutationObserver records what
+//                    changed, so only the touched subtrees are re-queried; removed
+//                    lists indexes, moved carries the new xpath/position under the old index.
+//                    New elements pass the same maxElements/skipHidden filters as the
+//                    capture; passing different ones starts a full capture. With scope
+//                    'viewport'/'near' every call is a full capture: what is in range
+//                    moves with scrolling and layout, which no mutation record reports
+// opts (all optional):
+//   scope: 'all' | 'viewport' | 'near' (within `margin` px, default one viewport height)
+//   maxElements: stop after this many (0 = no limit)
+//   skipHidden: drop zero-size and invisible elements
+//   maxText: text truncation (default 200)
+//   columnar: {n, total, ms, index: [...], text: [...], ...} instead of a list of objects
+(function () {
+  if (window.__jarvisMarking) return;
+
+  const SELECTOR = 'a,button,input,textarea,[role="button"],[contenteditable="true"]';
+  const WATCHED_ATTRS = ['id', 'role', 'contenteditable'];
+  const COLUMNS = ['index', 'text', 'type', 'xpath', 'x', 'y', 'description', 'inViewport'];
+
+  // el -> {index, xpath} for the elements reported so far; null until the first capture()
+  // filters: the capture's scope/margin/maxElements/skipHidden, reapplied by changes()
+  const state = { seq: 0, index: null, records: [], observer: null, filters: null };
+  const FILTERS = { scope: 'all', margin: null, maxElements: 0, skipHidden: false };
+
+  // XPaths for one capture: each parent's children are numbered in a single loop
+  // and ancestor paths are memoised, so n elements cost O(n) rather than
+  // O(depth x siblings) each
+  function xpathBuilder() {
+    const nth = new Map();
+    const paths = new Map();
+    const siblingIndex = (el) => {
+      if (!nth.has(el)) {
+        const kids = el.parentNode && el.parentNode.children ? el.parentNode.children : [el];
+        const counts = {};
+        for (let i = 0; i < kids.length; i++) {
+          const name = kids[i].nodeName;
+          counts[name] = (counts[name] || 0) + 1;
+          nth.set(kids[i], counts[name]);
+        }
+      }
+      return nth.get(el) || 1;
+    };
+    const path = (el) => {
+      if (!el || el.nodeType !== Node.ELEMENT_NODE) return '';
+      let p = paths.get(el);
+      if (p === undefined) {
+        const idx = siblingIndex(el);
+        p = path(el.parentNode) + '/' + el.nodeName.toLowerCase() + (idx > 1 ? `[${idx}]` : '');
+        paths.set(el, p);
+      }
+      return p;
+    };
+    return (el) => (el.id ? `//*[@id='${el.id}']` : '/' + path(el));
+  }
+
+  function elementType(el) {
+    const tag = el.tagName.toLowerCase();
+    if (el.isContentEditable) return 'text_editor';
+    return tag === 'a' ? 'link' : tag;
+  }
+
+  function viewport() {
+    return {
+      w: window.innerWidth || document.documentElement.clientWidth,
+      h: window.innerHeight || document.documentElement.clientHeight,
+    };
+  }
+
+  function filtersOf(opts) {
+    const f = {};
+    for (const k in FILTERS) f[k] = opts[k] != null ? opts[k] : FILTERS[k];
+    return f;
+  }
+
+  function sameFilters(a, b) {
+    for (const k in FILTERS) if (a[k] !== b[k]) return false;
+    return true;
+  }
+
+  // Rect-only checks first, so skipped elements never pay for innerText/xpath
+  function admitted(el, f, view) {
     const r = el.getBoundingClientRect();
-    const x = r.left + r.width/2;
-    const y = r.top + r.height/2;
-    results.push({
-      index: results.length,
-      text: (el.innerText || el.value || '').trim().slice(0,200),
-      type,
-      xpath: getXPath(el),
-      x, y,
-      description: description || el.getAttribute('aria-label') || el.getAttribute('title') || '',
-      inViewport: !!(r.top >= 0 && r.left >= 0 && r.bottom <= (window.innerHeight||document.documentElement.clientHeight) && r.right <= (window.innerWidth||document.documentElement.clientWidth))
+    if (f.scope === 'viewport' || f.scope === 'near') {
+      const margin = f.scope === 'near' ? (f.margin != null ? f.margin : view.h) : 0;
+      if (r.bottom < -margin || r.top > view.h + margin || r.right < 0 || r.left > view.w) return null;
+    }
+    if (f.skipHidden && hidden(el, r)) return null;
+    return r;
+  }
+
+  function hidden(el, r) {
+    if (r.width === 0 || r.height === 0) return true;
+    return el.checkVisibility ? !el.checkVisibility({ visibilityProperty: true, opacityProperty: true }) : false;
+  }
+
+  function describe(el, index, xpath, view, r, maxText) {
+    r = r || el.getBoundingClientRect();
+    return {
+      index,
+      text: (el.innerText || el.value || '').trim().slice(0, maxText == null ? 200 : maxText),
+      type: elementType(el),
+      xpath,
+      x: r.left + r.width / 2,
+      y: r.top + r.height / 2,
+      description: el.getAttribute('aria-label') || el.getAttribute('title') || '',
+      inViewport: !!(r.top >= 0 && r.left >= 0 && r.bottom <= view.h && r.right <= view.w),
+    };
+  }
+
+  function watch() {
+    if (state.observer) {
+      state.observer.takeRecords();
+      state.records = [];
+      return;
+    }
+    state.observer = new MutationObserver((records) => {
+      for (const r of records) state.records.push(r);
     });
-  };
+    state.observer.observe(document.documentElement, {
+      childList: true, subtree: true, attributes: true, attributeFilter: WATCHED_ATTRS,
+    });
+  }
 
-  document.querySelectorAll('a,button,input,textarea,[role="button"],[contenteditable="true"]').forEach(el => {
-    const tag = el.tagName.toLowerCase();
-    let type = tag;
-    if (tag === 'a') type = 'link';
-    if (el.isContentEditable) type = 'text_editor';
-    pushEl(el, type, undefined);
-  });
-  return results;
-}
-
-function getXPath(element) {
-  if (element.id) return `//*[@id='${element.id}']`;
-  const parts = [];
-  while (element && element.nodeType === Node.ELEMENT_NODE) {
-    let nb = 0, idx = 0;
-    const siblings = element.parentNode ? element.parentNode.children : [];
-    for (let i=0;i<siblings.length;i++) {
-      const sib = siblings[i];
-      if (sib.nodeName === element.nodeName) {
-        nb++;
-        if (sib === element) idx = nb;
+  // One array per field; coordinates rounded to whole pixels
+  function columnar(entries) {
+    const out = { n: entries.length };
+    for (const c of COLUMNS) out[c] = entries.map((e) => e[c]);
+    out.x = out.x.map(Math.round);
+    out.y = out.y.map(Math.round);
+    return out;
+  }
+
+  function captureInteractiveElements(opts) {
+    opts = opts || {};
+    const t0 = performance.now();
+    const xpathOf = xpathBuilder();
+    const view = viewport();
+    const filters = filtersOf(opts);
+    const limit = filters.maxElements > 0 ? filters.maxElements : Infinity;
+    const results = [];
+    state.index = new Map();
+    state.filters = filters;
+    const all = document.querySelectorAll(SELECTOR);
+    for (let i = 0; i < all.length && results.length < limit; i++) {
+      const el = all[i];
+      const r = admitted(el, filters, view);
+      if (!r) continue;
+      const entry = describe(el, results.length, xpathOf(el), view, r, opts.maxText);
+      results.push(entry);
+      state.index.set(el, { index: entry.index, xpath: entry.xpath });
+    }
+    state.seq = results.length;
+    watch();
+    if (!opts.columnar) return results;
+    return Object.assign(columnar(results), { total: all.length, ms: Math.round(performance.now() - t0) });
+  }
+
+  // el and the matches below it
+  function matchesIn(node, out) {
+    if (!node || node.nodeType !== Node.ELEMENT_NODE) return;
+    if (node.matches(SELECTOR)) out.add(node);
+    node.querySelectorAll(SELECTOR).forEach((el) => out.add(el));
+  }
+
+  function captureChanges(opts) {
+    opts = opts || {};
+    const filters = Object.assign({}, state.filters || FILTERS);
+    for (const k in FILTERS) if (opts[k] != null) filters[k] = opts[k];
+    if (!state.index || !state.observer || filters.scope !== 'all' || !sameFilters(filters, state.filters)) {
+      const added = captureInteractiveElements(Object.assign({}, opts, filters, { columnar: false }));
+      return { full: true, added: opts.columnar ? columnar(added) : added, removed: [], moved: [] };
+    }
+    const records = state.records.concat(state.observer.takeRecords());
+    state.records = [];
+    const gone = new Set();
+    const touched = new Set();
+    for (const r of records) {
+      if (r.type === 'attributes') {
+        touched.add(r.target);
+        gone.add(r.target);
+        continue;
+      }
+      const tags = new Set();
+      r.removedNodes.forEach((n) => { tags.add(n.nodeName); matchesIn(n, gone); });
+      r.addedNodes.forEach((n) => tags.add(n.nodeName));
+      // Only same-tag siblings after the insertion point can have shifted position
+      const prev = r.previousSibling;
+      let sib = prev && prev.parentNode === r.target ? prev.nextSibling : r.target.firstChild;
+      for (; sib; sib = sib.nextSibling) {
+        if (tags.has(sib.nodeName)) matchesIn(sib, touched);
       }
     }
-    const tagName = element.nodeName.toLowerCase();
-    const nth = idx > 1 ? `[${idx}]` : '';
-    parts.unshift(`${tagName}${nth}`);
-    element = element.parentNode;
+
+    const removed = [];
+    gone.forEach((el) => {
+      const entry = state.index.get(el);
+      if (entry && (!el.isConnected || !el.matches(SELECTOR))) {
+        state.index.delete(el);
+        removed.push(entry.index);
+      }
+    });
+
+    const xpathOf = xpathBuilder();
+    const view = viewport();
+    const fresh = [];
+    const moved = [];
+    touched.forEach((el) => {
+      if (!el.isConnected || !el.matches(SELECTOR)) return;
+      const entry = state.index.get(el);
+      if (!entry) {
+        fresh.push(el);
+        return;
+      }
+      const xpath = xpathOf(el);
+      if (entry.xpath !== xpath) {
+        entry.xpath = xpath;
+        moved.push(describe(el, entry.index, xpath, view, null, opts.maxText));
+      }
+    });
+    // New elements get the next indexes in document order, as far as the capture's filters admit them
+    fresh.sort((a, b) => (a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1));
+    const limit = filters.maxElements > 0 ? filters.maxElements : Infinity;
+    const added = [];
+    for (const el of fresh) {
+      if (state.index.size >= limit) break;
+      const r = admitted(el, filters, view);
+      if (!r) continue;
+      const index = state.seq++;
+      const xpath = xpathOf(el);
+      state.index.set(el, { index, xpath });
+      added.push(describe(el, index, xpath, view, r, opts.maxText));
+    }
+    moved.sort((a, b) => a.index - b.index);
+    removed.sort((a, b) => a - b);
+    if (opts.columnar) return { full: false, added: columnar(added), removed, moved: columnar(moved) };
+    return { full: false, added, removed, moved };
   }
-  return '//' + parts.join('/');
-}
 
-function unmarkElements() {
-  // noop placeholder to match remover scripts
-}
+  window.__jarvisMarking = {
+    capture: captureInteractiveElements,
+    changes: captureChanges,
+    xpath: (el) => xpathBuilder()(el),
+  };
+})();
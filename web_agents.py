@@ -1,24 +1,126 @@
-import asyncio
+import itertools
 import json
+import os
+import time
+import weakref
+from functools import lru_cache
 from typing import AsyncGenerator, List, Tuple, Optional
-from playwright.async_api import Page
+from playwright.async_api import BrowserContext, Page
+from Browser.tab_pool import get_tab_pool
+from core.page_scripts import DOM_QUIET_JS, READABLE_TEXT_JS
+from core.pdf_text import fetch_pdf_text
 
+_quiet_tokens = itertools.count(1)
 
-async def annotate_all(page: Page):
-    # Load marking script
+_MARKING_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "marking_scripts", "marking.js")
+# Contexts whose documents get marking.js as an init script
+_marking_contexts: "weakref.WeakSet[BrowserContext]" = weakref.WeakSet()
+
+# Task-agent annotation: near-viewport, visible elements only, capped and columnar
+ANNOTATE_SCOPE = os.getenv("JARVIS_ANNOTATE_SCOPE", "near")
+ANNOTATE_MAX = int(os.getenv("JARVIS_ANNOTATE_MAX", "300"))
+ANNOTATE_TEXT = int(os.getenv("JARVIS_ANNOTATE_TEXT", "80"))
+_COLUMNS = ("index", "text", "type", "xpath", "x", "y", "description", "inViewport")
+
+
+async def wait_dom_quiet(page: Page, quiet_ms: int = 300, timeout_ms: int = 2000) -> None:
+    """Return once the DOM has gone quiet_ms without mutations, or after timeout_ms."""
+    try:
+        await page.wait_for_function(DOM_QUIET_JS, arg={"quietMs": quiet_ms, "token": next(_quiet_tokens)}, timeout=timeout_ms, polling=50)
+    except Exception:
+        pass
+
+
+async def wait_for_url_change(page: Page, before: str, timeout_ms: int = 15000) -> None:
+    """Wait for a navigation away from `before` (e.g. after pressing Enter in a search box)."""
     try:
-        with open("marking_scripts/marking.js", "r", encoding="utf-8") as f:
-            marking_script = f.read()
-        await asyncio.sleep(0.2)
-        dom = await page.evaluate(f"""
-            (function() {{
-                {marking_script}
-                return captureInteractiveElements();
-            }})()
-        """)
-        return dom or []
+        await page.wait_for_url(lambda u: u != before, wait_until="domcontentloaded", timeout=timeout_ms)
     except Exception:
-        return []
+        pass
+
+
+@lru_cache(maxsize=1)
+def _marking_script() -> str:
+    with open(_MARKING_JS, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def _run_marking(page: Page, fn: str, opts: dict):
+    """window.__jarvisMarking[fn](opts) on page; marking.js is registered once per context."""
+    context = page.context
+    if context not in _marking_contexts:
+        _marking_contexts.add(context)
+        await context.add_init_script(script=_marking_script())
+    res = await page.evaluate("([fn, opts]) => window.__jarvisMarking ? window.__jarvisMarking[fn](opts) : null", [fn, opts])
+    if res is None:
+        # Document loaded before the context was registered: inject it here once
+        res = await page.evaluate(f"(() => {{ {_marking_script()}\n return window.__jarvisMarking.{fn}({json.dumps(opts)}); }})()")
+    return res
+
+
+def _empty_columns() -> dict:
+    return {"n": 0, "total": 0, "ms": 0, **{c: [] for c in _COLUMNS}}
+
+
+def elements_from_columns(cols: dict) -> List[dict]:
+    """A columnar capture back to marking.js's list of element dicts."""
+    return [dict(zip(_COLUMNS, row)) for row in zip(*(cols.get(c) or [] for c in _COLUMNS))]
+
+
+async def annotate_all(page: Page, scope: str = "all", max_elements: int = 0, skip_hidden: bool = False,
+                       max_text: int = 200, columnar: bool = False):
+    """
+    Interactive elements on the page (see marking_scripts/marking.js). scope is
+    'all', 'viewport' or 'near' (within a viewport height of it); max_elements=0
+    means no cap. columnar=True returns {n, total, ms, index: [...], text: [...], ...}.
+    """
+    opts = {"scope": scope, "maxElements": max_elements, "skipHidden": skip_hidden,
+            "maxText": max_text, "columnar": columnar}
+    try:
+        await wait_dom_quiet(page, quiet_ms=100, timeout_ms=200)
+        dom = await _run_marking(page, "capture", opts)
+        return dom or (_empty_columns() if columnar else [])
+    except Exception:
+        return _empty_columns() if columnar else []
+
+
+async def annotate_changes(page: Page, scope: Optional[str] = None, max_elements: Optional[int] = None,
+                           skip_hidden: Optional[bool] = None, max_text: int = 200, columnar: bool = False) -> dict:
+    """
+    Interactive elements added, removed (by index) or moved since the last
+    annotate_all/annotate_changes on this document. New elements pass the same
+    max_elements/skip_hidden filters as that capture (None keeps them). The
+    first call on a document, one with different filters, and every call whose
+    scope is 'viewport' or 'near' (scrolling changes what is in range without
+    any DOM mutation) is a full capture, returned as added with full=True.
+    """
+    empty = {"full": True, "added": [], "removed": [], "moved": []}
+    opts = {"maxText": max_text, "columnar": columnar}
+    for key, value in (("scope", scope), ("maxElements", max_elements), ("skipHidden", skip_hidden)):
+        if value is not None:
+            opts[key] = value
+    try:
+        await wait_dom_quiet(page, quiet_ms=100, timeout_ms=200)
+        return await _run_marking(page, "changes", opts) or empty
+    except Exception:
+        return empty
+
+
+async def dom_update_event(page: Page) -> dict:
+    """The task agent's dom_update: budgeted columnar capture plus its payload size and timing."""
+    t0 = time.perf_counter()
+    dom = await annotate_all(page, scope=ANNOTATE_SCOPE, max_elements=ANNOTATE_MAX, skip_hidden=True,
+                             max_text=ANNOTATE_TEXT, columnar=True)
+    capture_ms = (time.perf_counter() - t0) * 1000.0
+    return {
+        "type": "dom_update",
+        "content": [f"Found {dom['n']} interactive elements"],
+        "elements": dom["n"],
+        "total": dom["total"],
+        "payload_bytes": len(json.dumps(dom, ensure_ascii=False).encode("utf-8")),
+        "capture_ms": round(capture_ms, 1),
+        "script_ms": dom["ms"],
+    }
 
 
 async def stream_task_agent(query: str, page: Page) -> AsyncGenerator[str, None]:
@@ -43,18 +145,15 @@ async def stream_task_agent(query: str, page: Page) -> AsyncGenerator[str, None]
         box = await page.query_selector('input[name="q"],textarea[name="q"],#APjFqb')
         if box:
             await box.click()
-            await asyncio.sleep(0.1)
             # clear
             await page.keyboard.press("Control+A")
-            await asyncio.sleep(0.05)
             await page.keyboard.press("Backspace")
-            await asyncio.sleep(0.05)
             await page.keyboard.type(query)
-            await asyncio.sleep(0.1)
+            before = page.url
             await page.keyboard.press("Enter")
             yield sse({"type": "browser_action", "content": [f"Searched for: {query}"]})
-            await page.wait_for_load_state("domcontentloaded")
-            await asyncio.sleep(1.0)
+            # The result links are waited for below; only the navigation itself is needed here
+            await wait_for_url_change(page, before)
         else:
             yield sse({"type": "error", "content": "Search box not found"})
     except Exception as e:
@@ -86,8 +185,7 @@ async def stream_task_agent(query: str, page: Page) -> AsyncGenerator[str, None]
 
     # Annotate and finish
     try:
-        dom = await annotate_all(page)
-        yield sse({"type": "dom_update", "content": [f"Found {len(dom)} interactive elements"]})
+        yield sse(await dom_update_event(page))
     except Exception:
         pass
 
@@ -106,17 +204,14 @@ async def search_google(page: Page, query: str) -> AsyncGenerator[str, None]:
         box = await page.query_selector('input[name="q"],textarea[name="q"],#APjFqb')
         if box:
             await box.click()
-            await asyncio.sleep(0.05)
             await page.keyboard.press("Control+A")
-            await asyncio.sleep(0.02)
             await page.keyboard.press("Backspace")
-            await asyncio.sleep(0.02)
             await page.keyboard.type(query)
-            await asyncio.sleep(0.05)
+            before = page.url
             await page.keyboard.press("Enter")
             yield sse({"type": "browser_action", "content": [f"Searched for: {query}"]})
-            await page.wait_for_load_state("domcontentloaded")
-            await asyncio.sleep(0.8)
+            # collect_top_results waits for the result links themselves
+            await wait_for_url_change(page, before)
         else:
             yield sse({"type": "error", "content": "Search box not found"})
     except Exception as e:
@@ -141,23 +236,101 @@ async def collect_top_results(page: Page, max_links: int = 5) -> List[Tuple[str,
     return results
 
 
-async def fetch_page_summary(page: Page) -> str:
+async def iter_readable_text(page: Page, budget: int = 4000, chunk_chars: int = 1000) -> AsyncGenerator[List[dict], None]:
+    """
+    Main-content blocks ({tag, text}) in document order, boilerplate stripped,
+    about chunk_chars per evaluate until budget characters (READABLE_TEXT_JS).
+    """
+    opts = {"restart": True, "budget": budget, "chunkChars": chunk_chars}
+    while True:
+        res = await page.evaluate(READABLE_TEXT_JS, opts)
+        if not res:
+            return
+        if res.get("blocks"):
+            yield res["blocks"]
+        if res.get("done"):
+            return
+        opts = {"chunkChars": chunk_chars}
+
+
+def _blocks_text(blocks: List[dict]) -> str:
+    return "\n".join(b["text"] for b in blocks)
+
+
+async def fetch_page_summary(page: Page, budget: int = 4000) -> str:
     try:
-        # Extract readable text up to a limit
-        text = await page.evaluate(
-            "() => document.body ? document.body.innerText.slice(0, 4000) : ''"
-        )
-        return text or ""
+        # Readable main-content text up to budget characters, in one chunk
+        parts = [_blocks_text(blocks) async for blocks in iter_readable_text(page, budget, chunk_chars=budget)]
+        return "\n".join(parts)
     except Exception:
         return ""
 
 
+async def trigger_lazy_load(page: Page, timeout_ms: int = 600) -> None:
+    """One scroll to the bottom (lazy loaders need a rendered frame there), then wait for the DOM to settle."""
+    try:
+        await page.evaluate("() => window.scrollTo(0, document.documentElement.scrollHeight)")
+    except Exception:
+        return
+    await wait_dom_quiet(page, quiet_ms=200, timeout_ms=timeout_ms)
+
+
 def is_pdf_url(url: str) -> bool:
     u = (url or "").lower()
     return u.endswith(".pdf") or "/pdf" in u or "viewer.html" in u
 
 
-async def stream_research_agent(query: str, page: Page) -> AsyncGenerator[str, None]:
+def _clamp_concurrency(concurrency: int) -> int:
+    return max(1, min(int(concurrency or 1), 16))
+
+
+def _timeout_ms(remaining: float, cap_ms: int) -> int:
+    return cap_ms if remaining <= 0 else max(1000, min(cap_ms, int(remaining * 1000)))
+
+
+async def _open_result(tab: Page, href: str, remaining: float, cap_ms: int) -> None:
+    await tab.goto(href, timeout=_timeout_ms(remaining, cap_ms), wait_until="domcontentloaded")
+    await wait_dom_quiet(tab, quiet_ms=200, timeout_ms=500)
+
+
+async def _read_pdf(tab: Page, url: str, budget: int, remaining: float, cap_ms: int) -> dict:
+    """fetch_pdf_text through the tab's context (its cookies apply)."""
+    return await fetch_pdf_text(tab.context.request, url, budget=budget, timeout_ms=_timeout_ms(remaining, cap_ms))
+
+
+async def _open_or_read_pdf(tab: Page, href: str, budget: int, remaining: float, cap_ms: int) -> Optional[dict]:
+    """
+    Open href in tab; for a PDF (by URL, or where href lands) return its text instead.
+    A URL that only looks like a PDF is opened as a page when the download fails
+    for any reason (HTTP error, not a PDF, too large, ...).
+    """
+    guessed = None
+    if is_pdf_url(href):
+        guessed = await _read_pdf(tab, href, budget, remaining, cap_ms)
+        if not guessed.get("error"):
+            return guessed
+    try:
+        await _open_result(tab, href, remaining, cap_ms)
+    except Exception:
+        if guessed is None:
+            raise
+        # Neither worked: report the download error
+        return guessed
+    if tab.url != href and is_pdf_url(tab.url):
+        pdf = await _read_pdf(tab, tab.url, budget, remaining, cap_ms)
+        return None if pdf.get("error") == "not a PDF" else pdf
+    return None
+
+
+def _pdf_text(pdf: dict) -> str:
+    return pdf.get("text") or f"PDF could not be read: {pdf.get('error') or 'no text layer'}"
+
+
+def _pdf_info(pdf: dict) -> dict:
+    return {k: pdf.get(k) for k in ("pages_read", "page_count", "cached", "error") if pdf.get(k) is not None}
+
+
+async def stream_research_agent(query: str, page: Page, concurrency: int = 4, deadline_seconds: Optional[float] = None) -> AsyncGenerator[str, None]:
     yield sse({"type": "keepalive", "message": "research-start"})
     async for ev in search_google(page, query):
         yield ev
@@ -168,28 +341,32 @@ async def stream_research_agent(query: str, page: Page) -> AsyncGenerator[str, N
         return
     yield sse({"type": "dom_update", "content": [f"Found {len(links)} results"]})
 
-    summaries = []
-    for idx, (title, href) in enumerate(links, start=1):
-        try:
-            new_tab = await page.context.new_page()
-            await new_tab.goto(href, timeout=30000, wait_until="domcontentloaded")
-            await asyncio.sleep(0.5)
-            yield sse({"type": "browser_action", "content": [f"Opened result {idx}: {title}"]})
-            if is_pdf_url(new_tab.url):
-                summaries.append({"title": title, "url": new_tab.url, "summary": "PDF detected; skipping text extraction."})
-            else:
-                content = await fetch_page_summary(new_tab)
-                summaries.append({"title": title, "url": new_tab.url, "summary": content[:1000]})
-            await new_tab.close()
-        except Exception as e:
-            yield sse({"type": "error", "content": f"Failed to open result {idx}: {e}"})
+    async def visit(tab: Page, link: Tuple[str, str], remaining: float) -> dict:
+        title, href = link
+        pdf = await _open_or_read_pdf(tab, href, 1000, remaining, 30000)
+        if pdf is not None:
+            return {"title": title, "url": pdf["url"], "summary": _pdf_text(pdf), "pdf": _pdf_info(pdf)}
+        content = await fetch_page_summary(tab, budget=1000)
+        return {"title": title, "url": tab.url, "summary": content}
+
+    # Results are fetched in parallel on pooled tabs; events go out as each source finishes
+    ranked: List[Tuple[int, dict]] = []
+    pool = get_tab_pool(page.context)
+    async for i, (title, _href), summary, err in pool.fetch_many(links, visit, _clamp_concurrency(concurrency), deadline_seconds or 60.0):
+        idx = i + 1
+        if err is not None:
+            yield sse({"type": "error", "content": f"Failed to open result {idx}: {err}"})
+            continue
+        yield sse({"type": "browser_action", "content": [f"Opened result {idx}: {title}"]})
+        ranked.append((i, summary))
+    summaries = [s for _, s in sorted(ranked, key=lambda x: x[0])]
 
     yield sse({"type": "final_response", "content": {"query": query, "summaries": summaries}})
     yield sse({"type": "complete", "content": "Processing completed"})
     yield sse({"type": "end", "content": "Stream completed"})
 
 
-async def stream_deep_research_agent(query: str, page: Page) -> AsyncGenerator[str, None]:
+async def stream_deep_research_agent(query: str, page: Page, concurrency: int = 4, deadline_seconds: Optional[float] = None) -> AsyncGenerator[str, None]:
     # Simple deep-research: follow more links, and attempt to gather more context
     yield sse({"type": "keepalive", "message": "deep-research-start"})
     async for ev in search_google(page, query):
@@ -201,28 +378,33 @@ async def stream_deep_research_agent(query: str, page: Page) -> AsyncGenerator[s
         return
     yield sse({"type": "dom_update", "content": [f"Found {len(links)} results"]})
 
-    compiled: List[dict] = []
-    for idx, (title, href) in enumerate(links, start=1):
+    async def visit(tab: Page, link: Tuple[str, str], remaining: float) -> dict:
+        title, href = link
+        pdf = await _open_or_read_pdf(tab, href, 4500, remaining, 35000)
+        if pdf is not None:
+            text = _pdf_text(pdf)
+            return {"title": title, "url": pdf["url"], "chunks": [text[i:i + 1500] for i in range(0, len(text), 1500)],
+                    "pdf": _pdf_info(pdf)}
+        # One lazy-load trigger, then a single extraction streamed as up to three 1500-char chunks
+        await trigger_lazy_load(tab)
+        chunks: List[str] = []
         try:
-            tab = await page.context.new_page()
-            await tab.goto(href, timeout=35000, wait_until="domcontentloaded")
-            await asyncio.sleep(0.5)
-            yield sse({"type": "browser_action", "content": [f"Opened result {idx}: {title}"]})
-            if is_pdf_url(tab.url):
-                compiled.append({"title": title, "url": tab.url, "chunks": ["PDF detected; skipping text extraction."]})
-            else:
-                # try to scroll and gather more text
-                chunks: List[str] = []
-                for _ in range(3):
-                    txt = await fetch_page_summary(tab)
-                    if txt:
-                        chunks.append(txt[:1500])
-                    await tab.mouse.wheel(0, 1200)
-                    await asyncio.sleep(0.6)
-                compiled.append({"title": title, "url": tab.url, "chunks": chunks})
-            await tab.close()
-        except Exception as e:
-            yield sse({"type": "error", "content": f"Failed to open result {idx}: {e}"})
+            async for blocks in iter_readable_text(tab, budget=4500, chunk_chars=1500):
+                chunks.append(_blocks_text(blocks))
+        except Exception:
+            pass
+        return {"title": title, "url": tab.url, "chunks": chunks}
+
+    ranked: List[Tuple[int, dict]] = []
+    pool = get_tab_pool(page.context)
+    async for i, (title, _href), entry, err in pool.fetch_many(links, visit, _clamp_concurrency(concurrency), deadline_seconds or 90.0):
+        idx = i + 1
+        if err is not None:
+            yield sse({"type": "error", "content": f"Failed to open result {idx}: {err}"})
+            continue
+        yield sse({"type": "browser_action", "content": [f"Opened result {idx}: {title}"]})
+        ranked.append((i, entry))
+    compiled: List[dict] = [c for _, c in sorted(ranked, key=lambda x: x[0])]
 
     # naive synthesize
     synthesis = {
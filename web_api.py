@@ -1,14 +1,20 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Literal
+from typing import Dict, Any, Literal, Optional, AsyncGenerator
 import asyncio
 import json
 import time
 
-from Browser.web_erverywhere_browser import WebErverywhereBrowser
-from web_erverywhere_agents import stream_task_agent, stream_research_agent, stream_deep_research_agent
+from Browser.session_manager import BrowserSessionManager, SessionClosedError, SessionLimitError, DEFAULT_SESSION_ID
+from Browser.web_erverywhere_browser import close_cdp_managers
+from web_erverywhere_agents import stream_task_agent, stream_research_agent, stream_deep_research_agent, wait_dom_quiet
+from core.async_browser import AsyncBrowserSession
+from core.history import SessionStore
+from core.llm import LLMProvider
+from core.navigator import web_navigator
+from core.site_profile import SiteProfileStore
 
 app = FastAPI()
 
@@ -20,57 +26,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-browser_session: Dict[str, Any] = {"browser": None, "page": None}
+# One shared Chrome connection; each client (session id) gets its own context, page and lock
+sessions = BrowserSessionManager()
 browser_events: asyncio.Queue = asyncio.Queue()
+# /api/command runs the same navigator as the voice loop; these are created on first use.
+# browsers keeps one AsyncBrowserSession per session id (rebuilt when the client's page changes)
+site_profiles = SiteProfileStore.from_env()
+_command_state: Dict[str, Any] = {"store": None, "llm": None, "sessions": {}, "browsers": {}}
+
+
+def _forget_client(session_id: str) -> None:
+    """Drop a closed client's command state (its page's AsyncBrowserSession and history session id)."""
+    _command_state["browsers"].pop(session_id, None)
+    _command_state["sessions"].pop(session_id, None)
+
+
+sessions.on_close = _forget_client
 
 
 class BrowserSetupRequest(BaseModel):
     url: str = "https://www.google.com"
+    session_id: Optional[str] = None
 
 
 class QueryRequest(BaseModel):
     query: str
     agent_type: Literal["task", "research", "deep_research"]
+    # Research agents: how many result tabs to load in parallel, and the overall time budget (agent default if unset)
+    concurrency: int = 4
+    deadline_seconds: Optional[float] = None
+    session_id: Optional[str] = None
 
 
-async def cleanup_browser_session(browser: WebErverywhereBrowser) -> None:
-    try:
-        if browser:
-            await browser.close()
-    except Exception:
-        pass
+class CommandRequest(BaseModel):
+    command: str
+    session_id: Optional[str] = None
+
+
+def resolve_session_id(*candidates: Optional[str]) -> str:
+    """First non-empty session id from body/header/query, else the shared default session."""
+    for sid in candidates:
+        if sid and sid.strip():
+            return sid.strip()
+    return DEFAULT_SESSION_ID
+
+
+@app.on_event("startup")
+async def start_session_reaper():
+    asyncio.create_task(sessions.run_reaper())
+
+
+@app.on_event("shutdown")
+async def close_all_sessions():
+    await sessions.close_all()
+    await close_cdp_managers()
 
 
 @app.post("/setup-browser")
-async def setup_browser_endpoint(request: BrowserSetupRequest):
+async def setup_browser_endpoint(request: BrowserSetupRequest, x_session_id: Optional[str] = Header(None)):
+    session_id = resolve_session_id(request.session_id, x_session_id)
     try:
-        if browser_session.get("browser"):
-            await cleanup_browser()
-        wb = WebErverywhereBrowser()
-        browser, context = await wb.connect_to_chrome()
-        page = await context.new_page()
-        try:
-            await page.goto(request.url, timeout=80000, wait_until="domcontentloaded")
-        except Exception:
-            await page.goto("https://www.google.com", timeout=100000, wait_until="domcontentloaded")
-
-        browser_session.update({"browser": wb, "page": page})
-        return {"status": "success", "message": "Browser setup complete"}
+        # Only this client's context is replaced; other sessions keep running
+        async with sessions.acquire(session_id, reset=True) as sess:
+            page = sess.page
+            try:
+                await page.goto(request.url, timeout=80000, wait_until="domcontentloaded")
+            except Exception:
+                await page.goto("https://www.google.com", timeout=100000, wait_until="domcontentloaded")
+        return {"status": "success", "message": "Browser setup complete", "session_id": session_id}
+    except SessionLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to setup browser: {e}")
 
 
 @app.post("/cleanup")
-async def cleanup_browser():
+async def cleanup_browser(session_id: Optional[str] = None, x_session_id: Optional[str] = Header(None)):
     try:
-        if browser_session.get("browser"):
-            await cleanup_browser_session(browser_session["browser"])
-        browser_session.update({"browser": None, "page": None})
+        await sessions.close_session(resolve_session_id(session_id, x_session_id))
         return {"status": "success", "message": "Browser cleanup complete"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to cleanup browser: {e}")
 
 
+@app.get("/sessions")
+async def list_sessions():
+    return sessions.stats()
+
+
 @app.get("/browser-events")
 async def browser_events_endpoint():
     async def event_generator():
@@ -90,67 +133,110 @@ async def stream_keepalive_only():
     yield f"data: {{\n  \"type\": \"complete\", \n  \"content\": \"Processing completed\"\n}}\n\n"
 
 
+async def stream_with_session(session_id: str, make_stream) -> AsyncGenerator[str, None]:
+    # Hold the session lock for the whole SSE stream so one client's agents never interleave
+    try:
+        async with sessions.use(session_id) as sess:
+            async for chunk in make_stream(sess.page):
+                yield chunk
+    except SessionClosedError:
+        yield f"data: {json.dumps({'type': 'error', 'content': 'Browser session closed. Call /setup-browser again'})}\n\n"
+
+
 @app.post("/query")
-async def query_agent(request: QueryRequest):
-    if not browser_session.get("page"):
+async def query_agent(request: QueryRequest, x_session_id: Optional[str] = Header(None)):
+    session_id = resolve_session_id(request.session_id, x_session_id)
+    if not sessions.get(session_id):
         raise HTTPException(status_code=400, detail="Browser not initialized. Call /setup-browser first")
+    headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "Transfer-Encoding": "chunked"}
     if request.agent_type == "task":
         return StreamingResponse(
-            stream_task_agent(request.query, browser_session["page"]),
+            stream_with_session(session_id, lambda page: stream_task_agent(request.query, page)),
             media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "Transfer-Encoding": "chunked"},
+            headers=headers,
         )
     if request.agent_type == "research":
         return StreamingResponse(
-            stream_research_agent(request.query, browser_session["page"]),
+            stream_with_session(session_id, lambda page: stream_research_agent(request.query, page, request.concurrency, request.deadline_seconds)),
             media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "Transfer-Encoding": "chunked"},
+            headers=headers,
         )
     if request.agent_type == "deep_research":
         return StreamingResponse(
-            stream_deep_research_agent(request.query, browser_session["page"]),
+            stream_with_session(session_id, lambda page: stream_deep_research_agent(request.query, page, request.concurrency, request.deadline_seconds)),
             media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "Transfer-Encoding": "chunked"},
+            headers=headers,
         )
     # Fallback keepalive
-    return StreamingResponse(stream_keepalive_only(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "Transfer-Encoding": "chunked"})
+    return StreamingResponse(stream_keepalive_only(), media_type="text/event-stream", headers=headers)
+
+
+@app.post("/api/command")
+async def run_command(request: CommandRequest, x_session_id: Optional[str] = Header(None)):
+    """Run one voice-style command (search, click, write code, export tables, ...) on this client's page."""
+    session_id = resolve_session_id(request.session_id, x_session_id)
+    if not sessions.get(session_id):
+        raise HTTPException(status_code=400, detail="Browser not initialized. Call /setup-browser first")
+    state = _command_state
+    if state["store"] is None:
+        # SessionStore pings Mongo on construction; keep that off the loop
+        state["store"] = await asyncio.to_thread(SessionStore)
+        state["llm"] = LLMProvider()
+    store: SessionStore = state["store"]
+    try:
+        async with sessions.use(session_id) as sess:
+            # Held under the session lock, so closing the session (which prunes these) waits for us
+            if session_id not in state["sessions"]:
+                state["sessions"][session_id] = store.start_session({"app": "web_api", "client": session_id})
+            browser = state["browsers"].get(session_id)
+            if browser is None or browser.page is not sess.page:
+                browser = AsyncBrowserSession(page=sess.page, profiles=site_profiles)
+                state["browsers"][session_id] = browser
+            result = await web_navigator(browser, store, state["sessions"][session_id], request.command, state["llm"])
+        return {"status": "success", "result": result, "session_id": session_id}
+    except SessionClosedError:
+        raise HTTPException(status_code=400, detail="Browser session closed. Call /setup-browser again")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Command failed: {e}")
 
 
 @app.post("/api/docs/type")
-async def type_in_docs(request: Request):
+async def type_in_docs(request: Request, x_session_id: Optional[str] = Header(None)):
     try:
-        if not browser_session.get("page"):
-            return JSONResponse(status_code=400, content={"error": "Browser not initialized. Call /setup-browser first"})
         data = await request.json()
+        session_id = resolve_session_id(data.get("session_id"), x_session_id)
+        if not sessions.get(session_id):
+            return JSONResponse(status_code=400, content={"error": "Browser not initialized. Call /setup-browser first"})
         content = data.get("content")
         if not content:
             return JSONResponse(status_code=400, content={"error": "Content is required"})
-        page = browser_session["page"]
-        await page.goto("https://docs.google.com/document/create")
-        await page.wait_for_load_state("domcontentloaded")
-        await asyncio.sleep(2)
-        editor_selector = ".kix-appview-editor"
-        await page.wait_for_selector(editor_selector, timeout=15000)
-        editor = await page.query_selector(editor_selector)
-        if editor:
-            bbox = await editor.bounding_box()
-            if bbox:
-                x = bbox['x'] + bbox['width'] / 2
-                y = bbox['y'] + bbox['height'] / 2
-                await page.mouse.click(x, y)
-                await asyncio.sleep(1)
-                # select all and type
-                await page.keyboard.press("Control+A")
-                await asyncio.sleep(0.2)
-                await page.keyboard.press("Backspace")
-                await asyncio.sleep(0.2)
-                await page.keyboard.type(content)
-                return JSONResponse(status_code=200, content={"message": "Content typed successfully"})
-        return JSONResponse(status_code=500, content={"error": "Text editor not found"})
+        async with sessions.use(session_id) as sess:
+            return await _type_into_new_doc(sess.page, content)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"Failed to type content: {e}"})
 
 
+async def _type_into_new_doc(page, content: str):
+    await page.goto("https://docs.google.com/document/create", wait_until="domcontentloaded")
+    editor_selector = ".kix-appview-editor"
+    await page.wait_for_selector(editor_selector, timeout=15000)
+    editor = await page.query_selector(editor_selector)
+    if editor:
+        bbox = await editor.bounding_box()
+        if bbox:
+            x = bbox['x'] + bbox['width'] / 2
+            y = bbox['y'] + bbox['height'] / 2
+            await page.mouse.click(x, y)
+            # Docs moves focus into its text-event iframe after the click; wait for the editor to settle
+            await wait_dom_quiet(page, quiet_ms=200, timeout_ms=1000)
+            # select all and type
+            await page.keyboard.press("Control+A")
+            await page.keyboard.press("Backspace")
+            await page.keyboard.type(content)
+            return JSONResponse(status_code=200, content={"message": "Content typed successfully"})
+    return JSONResponse(status_code=500, content={"error": "Text editor not found"})
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,15 +1,20 @@
 # New canonical module name for agents: web_erverywhere_agents
-from . import web_agents  # type: ignore
-
 # Re-export under the new name for compatibility
 from web_agents import (
 	annotate_all,
+	annotate_changes,
+	elements_from_columns,
+	dom_update_event,
 	stream_task_agent,
 	search_google,
 	collect_top_results,
 	fetch_page_summary,
+	iter_readable_text,
+	trigger_lazy_load,
 	is_pdf_url,
 	stream_research_agent,
 	stream_deep_research_agent,
 	sse,
+	wait_dom_quiet,
+	wait_for_url_change,
 )